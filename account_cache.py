@@ -0,0 +1,175 @@
+"""
+Account Data Cache
+
+/api/accounts, /api/accounts/<key>/balance and /api/accounts/<key>/portfolio
+went to E*TRADE on every page load and account switch. The cache sits in
+front of ETradeClient.get_accounts / get_account_balance / get_portfolio:
+
+- fresh (younger than the resource's TTL): served from memory
+- stale (up to ACCOUNT_CACHE_STALE_SECONDS past the TTL): served from memory
+  while one background call refreshes it (stale-while-revalidate), bounded
+  by ACCOUNT_CACHE_REFRESH_DEADLINE; the response's Server-Timing shows it
+- older, missing or invalidated: fetched before answering; concurrent
+  misses for the same entry share one call
+
+A failed background refresh is not hidden behind the stale value: the next
+read of that entry fetches before answering, so the caller gets either
+fresh data or E*TRADE's error. The TTL plus ACCOUNT_CACHE_STALE_SECONDS
+since the last successful fetch is the most stale a value can be served.
+
+Order activity makes balances and positions wrong at once, so an account's
+balance and portfolio are dropped when one of its orders is placed or
+cancelled (ETradeClient) or changes state in the order book - which is how
+OrderMonitor sees fills. The next read fetches them again.
+
+    cache = get_account_cache()
+    balance = cache.balance(client, account_id_key)
+    cache.invalidate(account_id_key)
+"""
+import logging
+import threading
+import time
+
+from config import (
+    ACCOUNTS_CACHE_TTL, BALANCE_CACHE_TTL, PORTFOLIO_CACHE_TTL,
+    ACCOUNT_CACHE_STALE_SECONDS, ACCOUNT_CACHE_REFRESH_DEADLINE
+)
+from metrics import get_metrics
+from order_book import get_order_book
+import request_policy
+import server_timing
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_CACHE_LOOKUPS = get_metrics().counter(
+    'account_cache_lookups_total',
+    'Account data reads served fresh (hit), stale while refreshing (stale) or fetched (miss)',
+    ('resource', 'result'))
+ACCOUNT_CACHE_REFRESH_FAILURES = get_metrics().counter(
+    'account_cache_refresh_failures_total',
+    'Background refreshes of stale account data that failed',
+    ('resource',))
+
+
+class AccountCache:
+    """TTL cache of accounts, balances and portfolios with stale-while-revalidate."""
+
+    def __init__(self, ttls=None, stale_seconds=ACCOUNT_CACHE_STALE_SECONDS,
+                 refresh_deadline=ACCOUNT_CACHE_REFRESH_DEADLINE):
+        self.ttls = ttls or {
+            'accounts': ACCOUNTS_CACHE_TTL,
+            'balance': BALANCE_CACHE_TTL,
+            'portfolio': PORTFOLIO_CACHE_TTL
+        }
+        self.stale_seconds = stale_seconds
+        self.refresh_deadline = refresh_deadline
+        self._lock = threading.Lock()
+        self._entries = {}     # (resource, account_id_key) -> (monotonic time, value)
+        self._loading = {}     # (resource, account_id_key) -> Lock held by the fetching caller
+        self._refreshing = set()
+        self._failed = set()   # keys whose last background refresh failed
+        self._epoch = 0        # invalidate() of everything
+        self._generation = {}  # account_id_key -> invalidate() count
+        get_order_book().add_listener(self._on_orders_changed)
+
+    def accounts(self, client):
+        """client.get_accounts(), cached."""
+        return self._get('accounts', None, client.get_accounts)
+
+    def balance(self, client, account_id_key):
+        """client.get_account_balance(account_id_key, as_model=True), cached."""
+        return self._get('balance', account_id_key,
+                         lambda: client.get_account_balance(account_id_key, as_model=True))
+
+    def portfolio(self, client, account_id_key):
+        """client.get_portfolio(account_id_key, as_model=True), cached."""
+        return self._get('portfolio', account_id_key,
+                         lambda: client.get_portfolio(account_id_key, as_model=True))
+
+    def invalidate(self, account_id_key=None):
+        """Drop an account's balance and portfolio (everything when None)."""
+        with self._lock:
+            if account_id_key is None:
+                self._entries.clear()
+                self._epoch += 1
+                return
+            self._generation[account_id_key] = self._generation.get(account_id_key, 0) + 1
+            self._entries.pop(('balance', account_id_key), None)
+            self._entries.pop(('portfolio', account_id_key), None)
+
+    def _on_orders_changed(self, account_id_key, orders):
+        self.invalidate(account_id_key)
+
+    def _get(self, resource, account_id_key, load):
+        key = (resource, account_id_key)
+        ttl = self.ttls[resource]
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age <= ttl:
+                ACCOUNT_CACHE_LOOKUPS.inc((resource, 'hit'))
+                return entry[1]
+            if age <= ttl + self.stale_seconds and key not in self._failed:
+                ACCOUNT_CACHE_LOOKUPS.inc((resource, 'stale'))
+                server_timing.record(f'{resource}_cache', 0, f'stale {age:.0f}s')
+                self._refresh(key, load)
+                return entry[1]
+
+        ACCOUNT_CACHE_LOOKUPS.inc((resource, 'miss'))
+        with self._lock:
+            loading = self._loading.get(key)
+            if loading is None:
+                loading = self._loading[key] = threading.Lock()
+        with loading:
+            # Another caller may have fetched it while we waited
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= ttl:
+                return entry[1]
+            return self._load(key, load)
+
+    def _version(self, account_id_key):
+        return self._epoch, self._generation.get(account_id_key, 0)
+
+    def _load(self, key, load):
+        version = self._version(key[1])
+        value = load()
+        with self._lock:
+            self._failed.discard(key)
+            # An invalidation during the call means the value may predate it
+            if self._version(key[1]) == version:
+                self._entries[key] = (time.monotonic(), value)
+        return value
+
+    def _refresh(self, key, load):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                with request_policy.deadline(self.refresh_deadline):
+                    self._load(key, load)
+            except Exception as e:
+                # The next read fetches before answering and sees the error
+                with self._lock:
+                    self._failed.add(key)
+                ACCOUNT_CACHE_REFRESH_FAILURES.inc((key[0],))
+                logger.warning(f"Background refresh of {key[0]} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+
+# Singleton instance
+_account_cache = None
+
+
+def get_account_cache():
+    """Get or create the singleton AccountCache instance."""
+    global _account_cache
+    if _account_cache is None:
+        _account_cache = AccountCache()
+    return _account_cache
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+End-to-End Fill-to-Exit Latency Benchmark
+
+Places opening orders through POST /api/orders/place (profit target,
+confirmation stop and trailing stop limit configs) against a simulated
+E*TRADE broker, then measures the time from the simulated fill to the
+matching exit order arriving at the broker.
+
+Everything runs in-process: the Flask app is driven with its test client
+and server._get_authenticated_client is swapped for the simulated broker,
+so the real OrderMonitor threads do the fill detection and exit placement.
+
+Usage:
+    python bench_fill_to_exit.py
+    python bench_fill_to_exit.py --levels 1,10,100 --poll-interval 0.25
+    python bench_fill_to_exit.py --api-latency 0.08 --json bench_output.json
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import etrade_models
+import order_book
+import order_monitor
+import order_stream
+import server
+import trailing_stop_manager
+
+ACCOUNT_ID_KEY = 'BENCH_ACCOUNT'
+STRATEGIES = ('profit_target', 'confirmation_stop', 'tsl')
+EXIT_PRICE_TYPES = ('LIMIT', 'STOP_LIMIT', 'TRAILING_STOP_CNST')
+
+
+class SimulatedBroker:
+    """
+    In-memory stand-in for ETradeClient.
+
+    Opening orders rest as OPEN until fill_delay elapses, then fill at their
+    limit price. The quote for the symbol jumps above every trigger at fill
+    time, so confirmation stops and TSLs go out on their first quote check.
+    """
+
+    def __init__(self, fill_delay=1.0, api_latency=0.0):
+        self.fill_delay = fill_delay
+        self.api_latency = api_latency
+        self._lock = threading.Lock()
+        self._ids = itertools.count(100000)
+        self._orders = {}        # order_id -> order dict (E*TRADE shape)
+        self._opening = {}       # symbol -> opening order_id
+        self._fill_times = {}    # symbol -> perf_counter at fill
+        self._exit_times = {}    # symbol -> perf_counter when exit arrived
+        self._prices = {}        # symbol -> last trade
+        self.calls = {'get_orders': 0, 'get_quote': 0, 'get_quotes': 0, 'preview_order': 0,
+                      'place_order': 0, 'cancel_order': 0}
+
+    def _simulate_latency(self, name):
+        with self._lock:
+            self.calls[name] += 1
+        if self.api_latency:
+            time.sleep(self.api_latency)
+
+    def _fill(self, order_id):
+        with self._lock:
+            order = self._orders.get(order_id)
+            if order is None:
+                return
+            detail = order['OrderDetail'][0]
+            if detail['status'] != 'OPEN':
+                return
+            inst = detail['Instrument'][0]
+            symbol = inst['Product']['symbol']
+            price = float(detail.get('limitPrice') or 100.0)
+            inst['filledQuantity'] = inst['orderedQuantity']
+            inst['averageExecutionPrice'] = price
+            detail['status'] = 'EXECUTED'
+            # Move the market well past any trigger the bench configures
+            self._prices[symbol] = round(price + 5.0, 2)
+            self._fill_times[symbol] = time.perf_counter()
+
+    # ----- ETradeClient surface used by server.py / order_monitor.py -----
+
+    def get_orders(self, account_id_key, status='OPEN', symbol=None, incremental=False,
+                   order_ids=None, as_model=False, **kwargs):
+        if incremental:
+            # Same path ETradeClient takes: the shared incremental order book
+            return order_book.get_order_book().sync(self, account_id_key,
+                                                    order_ids=order_ids, symbol=symbol)
+        self._simulate_latency('get_orders')
+        with self._lock:
+            orders = list(self._orders.values())
+        if status:
+            orders = [o for o in orders if o['OrderDetail'][0]['status'] == status]
+        if symbol:
+            orders = [o for o in orders
+                      if o['OrderDetail'][0]['Instrument'][0]['Product']['symbol'] == symbol.upper()]
+        orders = json.loads(json.dumps(orders))
+        if as_model:
+            return [etrade_models.Order.from_api(o) for o in orders]
+        return orders
+
+    def get_order_fills(self, account_id_key, status=None, symbol=None, order_ids=None, **kwargs):
+        orders = self.get_orders(account_id_key, status=status, symbol=symbol)
+        if order_ids is not None:
+            wanted = {str(o) for o in order_ids}
+            orders = [o for o in orders if str(o['orderId']) in wanted]
+        return [order_stream.fill_from_order(o) for o in orders]
+
+    def get_quote(self, symbol, as_model=False, **kwargs):
+        self._simulate_latency('get_quote')
+        return self._quote(symbol, as_model)
+
+    def get_quotes(self, symbols, as_model=False, **kwargs):
+        self._simulate_latency('get_quotes')
+        return [self._quote(symbol, as_model) for symbol in symbols]
+
+    def _quote(self, symbol, as_model):
+        symbol = symbol.upper()
+        with self._lock:
+            last = self._prices.get(symbol, 100.0)
+        quote = {
+            'Product': {'symbol': symbol},
+            'All': {'lastTrade': last, 'bid': round(last - 0.01, 2),
+                    'ask': round(last + 0.01, 2), 'bidSize': 100, 'askSize': 100}
+        }
+        if as_model:
+            return etrade_models.Quote.from_api(quote, symbol)
+        return quote
+
+    def preview_order(self, account_id_key, order_data, **kwargs):
+        self._simulate_latency('preview_order')
+        preview_id = next(self._ids)
+        return {'preview_id': preview_id, 'client_order_id': str(preview_id),
+                'estimated_commission': 0, 'estimated_total': 0}
+
+    def place_order(self, account_id_key, order_data, preview_id=None,
+                    client_order_id=None, **kwargs):
+        self._simulate_latency('place_order')
+        now = time.perf_counter()
+        symbol = order_data['symbol'].upper()
+        order_id = next(self._ids)
+        order = {
+            'orderId': order_id,
+            'orderType': 'EQ',
+            'OrderDetail': [{
+                'status': 'OPEN',
+                'priceType': order_data.get('priceType'),
+                'limitPrice': order_data.get('limitPrice'),
+                'Instrument': [{
+                    'Product': {'symbol': symbol},
+                    'orderAction': order_data.get('orderAction'),
+                    'orderedQuantity': int(order_data.get('quantity', 1)),
+                    'filledQuantity': 0
+                }]
+            }]
+        }
+        with self._lock:
+            self._orders[order_id] = order
+            is_exit = symbol in self._opening
+            if is_exit:
+                self._exit_times.setdefault(symbol, now)
+            else:
+                self._opening[symbol] = order_id
+        if not is_exit:
+            timer = threading.Timer(self.fill_delay, self._fill, args=(order_id,))
+            timer.daemon = True
+            timer.start()
+        return {'order_id': order_id, 'message': 'Order placed successfully'}
+
+    def cancel_order(self, account_id_key, order_id, **kwargs):
+        self._simulate_latency('cancel_order')
+        with self._lock:
+            order = self._orders.get(int(order_id))
+            if order and order['OrderDetail'][0]['status'] == 'OPEN':
+                order['OrderDetail'][0]['status'] = 'CANCELLED'
+        return {'order_id': order_id, 'message': 'Order cancelled successfully'}
+
+    # ----- Measurements -----
+
+    def latencies(self):
+        """Return {symbol: fill-to-exit seconds} for every completed round trip."""
+        with self._lock:
+            return {s: self._exit_times[s] - self._fill_times[s]
+                    for s in self._exit_times if s in self._fill_times}
+
+
+def _order_request(strategy, symbol):
+    """Build the /api/orders/place body for one strategy."""
+    body = {
+        'account_id_key': ACCOUNT_ID_KEY,
+        'symbol': symbol,
+        'quantity': 10,
+        'side': 'BUY',
+        'priceType': 'LIMIT',
+        'limitPrice': '100.00',
+        'fill_timeout': 60
+    }
+    if strategy == 'profit_target':
+        body.update({'profit_offset_type': 'dollar', 'profit_offset': 0.50})
+    elif strategy == 'confirmation_stop':
+        body.update({
+            'trailing_stop_enabled': True,
+            'trailing_stop_trigger_type': 'dollar',
+            'trailing_stop_trigger_offset': 1.0,
+            'trailing_stop_stop_type': 'dollar',
+            'trailing_stop_stop_offset': 0.5
+        })
+    else:
+        body.update({
+            'trailing_stop_limit_enabled': True,
+            'tsl_trigger_type': 'dollar',
+            'tsl_trigger_offset': 1.0,
+            'tsl_trail_type': 'dollar',
+            'tsl_trail_amount': 0.5
+        })
+    return body
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def _summarize(samples):
+    return {
+        'count': len(samples),
+        'p50_ms': _ms(_percentile(samples, 50)),
+        'p95_ms': _ms(_percentile(samples, 95)),
+        'p99_ms': _ms(_percentile(samples, 99)),
+        'mean_ms': _ms(statistics.fmean(samples)) if samples else None,
+        'max_ms': _ms(max(samples)) if samples else None
+    }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def run_level(concurrency, args):
+    """Run one concurrency level and return its latency summary."""
+    broker = SimulatedBroker(fill_delay=args.fill_delay, api_latency=args.api_latency)
+
+    # Fresh singletons so monitors and state never leak between levels
+    order_monitor._order_monitor = None
+    order_book._order_book = None
+    trailing_stop_manager._trailing_stop_manager = None
+    server._pending_profit_orders.clear()
+    server._pending_trailing_stop_limit_orders.clear()
+    server._get_authenticated_client = lambda: broker
+    order_monitor.OrderMonitor.POLL_INTERVAL = args.poll_interval
+
+    client = server.app.test_client()
+    symbol_strategy = {}
+    for i in range(concurrency):
+        strategy = STRATEGIES[i % len(STRATEGIES)]
+        symbol = f"B{i:05d}"
+        symbol_strategy[symbol] = strategy
+        resp = client.post('/api/orders/place', json=_order_request(strategy, symbol))
+        if resp.status_code != 200 or not resp.get_json().get('success'):
+            raise RuntimeError(f"Order placement failed for {symbol}: {resp.get_data(as_text=True)}")
+
+    deadline = time.perf_counter() + args.fill_delay + args.timeout
+    while time.perf_counter() < deadline:
+        if len(broker.latencies()) >= concurrency:
+            break
+        time.sleep(0.05)
+
+    # Stop any monitors still running before moving to the next level
+    monitor = order_monitor.get_order_monitor()
+    with monitor._lock:
+        keys = list(monitor._monitors.keys())
+    for key in keys:
+        monitor.stop_monitoring(key)
+
+    latencies = broker.latencies()
+    by_strategy = {s: [] for s in STRATEGIES}
+    for symbol, seconds in latencies.items():
+        by_strategy[symbol_strategy[symbol]].append(seconds)
+
+    return {
+        'concurrency': concurrency,
+        'completed': len(latencies),
+        'missing': concurrency - len(latencies),
+        'all': _summarize(list(latencies.values())),
+        'by_strategy': {s: _summarize(v) for s, v in by_strategy.items() if v},
+        'broker_calls': dict(broker.calls)
+    }
+
+
+def _print_report(results, args):
+    print("=" * 78)
+    print("FILL-TO-EXIT LATENCY (simulated fill -> exit order at broker)")
+    print(f"poll_interval={args.poll_interval}s  api_latency={args.api_latency}s  "
+          f"fill_delay={args.fill_delay}s")
+    print("=" * 78)
+    header = f"{'N':>6} {'strategy':<18} {'count':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'max ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        rows = [('all', r['all'])] + sorted(r['by_strategy'].items())
+        for name, s in rows:
+            print(f"{r['concurrency']:>6} {name:<18} {s['count']:>6} "
+                  f"{_fmt(s['p50_ms'])} {_fmt(s['p95_ms'])} {_fmt(s['p99_ms'])} {_fmt(s['max_ms'])}")
+        if r['missing']:
+            print(f"{'':>6} WARNING: {r['missing']} exit(s) never arrived within {args.timeout}s")
+        print(f"{'':>6} broker calls: {r['broker_calls']}")
+    print("=" * 78)
+
+
+def _fmt(value):
+    return f"{value:>10.2f}" if value is not None else f"{'-':>10}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--levels', default='1,10,100,1000',
+                        help='Comma-separated concurrent strategy counts (default: 1,10,100,1000)')
+    parser.add_argument('--poll-interval', type=float, default=order_monitor.OrderMonitor.POLL_INTERVAL,
+                        help='OrderMonitor.POLL_INTERVAL override in seconds (default: production value)')
+    parser.add_argument('--api-latency', type=float, default=0.05,
+                        help='Simulated E*TRADE round trip per call in seconds (default: 0.05)')
+    parser.add_argument('--fill-delay', type=float, default=1.0,
+                        help='Seconds an opening order rests before filling (default: 1.0)')
+    parser.add_argument('--timeout', type=float, default=60.0,
+                        help='Seconds to wait for exits after the fill delay (default: 60)')
+    parser.add_argument('--json', dest='json_path', help='Also write results to this JSON file')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    levels = [int(x) for x in args.levels.split(',') if x.strip()]
+    results = []
+    for level in levels:
+        print(f"Running {level} concurrent strategies...", flush=True)
+        results.append(run_level(level, args))
+
+    _print_report(results, args)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"Results written to {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,605 @@
+#!/usr/bin/env python3
+"""
+Hot-Path Microbenchmarks
+
+Reproducible timings for the pure-Python code that runs on every monitor
+tick or API call, with a stored baseline (bench_baseline.json) and a
+comparison report so optimization PRs can show their gains and
+regressions get caught.
+
+Each benchmark is timed with timeit: autorange picks a loop count, then
+the best per-call time over several repeats is reported (the minimum is
+the least noisy estimate of the code's own cost).
+
+--save-baseline only adds benchmarks the baseline does not have yet. An
+existing entry is never rewritten, so a change can't hide its own
+regression by re-saving; to re-record one on purpose (new machine, a
+benchmark that measures something else now), delete its key first and
+say why in the commit.
+
+Usage:
+    python bench_hot_paths.py                    # run and compare to baseline
+    python bench_hot_paths.py --save-baseline    # add new benchmarks to the baseline
+    python bench_hot_paths.py -k check_order     # run matching benchmarks only
+    python bench_hot_paths.py --fail-over 15     # exit 1 on >15% regression
+    python bench_hot_paths.py -k orders_ --memory  # also report peak memory per call
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import queue
+import random
+import sys
+import timeit
+import tracemalloc
+
+import codec
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from etrade_client import ETradeClient
+from etrade_models import Balance, Order, Position, Quote
+from order_monitor import OrderMonitor
+from order_encoder import OrderRequest, encode_cancel, encode_order
+from pretrade import PretradeChecker
+from order_stream import CHUNK_SIZE, parse_order_fills
+from wire_trace import WireTrace
+from metrics import Counter, Histogram, endpoint_label
+from logging_setup import JSONFormatter, TEXT_FORMAT, _DeferredQueueHandler
+from trailing_stop_manager import PendingTrailingStop, TrailingStopManager, TrailingStopState
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+REPEAT = 5
+
+
+# ==================== Realistic payloads ====================
+
+def make_order(order_id, symbol='AAPL', status='OPEN', filled=False, rng=random):
+    """One E*TRADE Order in the shape returned by /v1/accounts/{key}/orders.json"""
+    qty = rng.choice([1, 5, 10, 25, 100])
+    price = round(rng.uniform(5, 500), 2)
+    inst = {
+        'Product': {'symbol': symbol, 'securityType': 'EQ'},
+        'symbolDescription': f'{symbol} COMMON STOCK',
+        'orderAction': rng.choice(['BUY', 'SELL']),
+        'quantityType': 'QUANTITY',
+        'orderedQuantity': qty,
+        'filledQuantity': qty if filled else 0,
+        'estimatedCommission': 0,
+        'estimatedFees': 0
+    }
+    if filled:
+        inst['averageExecutionPrice'] = price
+    return {
+        'orderId': order_id,
+        'details': f'https://api.etrade.com/v1/accounts/KEY/orders/{order_id}',
+        'orderType': 'EQ',
+        'OrderDetail': [{
+            'placedTime': 1772726400000 + order_id,
+            'executedTime': 1772726460000 + order_id if filled else None,
+            'orderValue': round(price * qty, 2),
+            'status': 'EXECUTED' if filled else status,
+            'orderTerm': 'GOOD_FOR_DAY',
+            'priceType': 'LIMIT',
+            'limitPrice': price,
+            'stopPrice': 0,
+            'marketSession': 'REGULAR',
+            'allOrNone': False,
+            'netPrice': 0,
+            'netBid': 0,
+            'netAsk': 0,
+            'gcd': 0,
+            'ratio': '',
+            'Instrument': [inst]
+        }]
+    }
+
+
+def make_orders(n=200, seed=1234):
+    """A late-session orders list: mostly terminal orders, a few still open."""
+    rng = random.Random(seed)
+    symbols = ['AAPL', 'MSFT', 'NVDA', 'TSLA', 'AMD', 'META', 'AMZN', 'SPY', 'QQQ', 'IWM']
+    orders = []
+    for i in range(n):
+        filled = rng.random() < 0.6
+        status = 'OPEN' if not filled and rng.random() < 0.3 else 'CANCELLED'
+        orders.append(make_order(500000 + i, rng.choice(symbols), status, filled, rng))
+    return orders
+
+
+def make_orders_response(n=200, seed=1234):
+    """Full OrdersResponse body as E*TRADE sends it."""
+    return {'OrdersResponse': {'marker': '', 'next': '', 'Order': make_orders(n, seed)}}
+
+
+def make_quote(symbol='AAPL'):
+    """One QuoteData entry with the default (ALL) detail level."""
+    return {
+        'dateTime': '15:59:59 EST 03-05-2026',
+        'dateTimeUTC': 1772744399,
+        'quoteStatus': 'REALTIME',
+        'ahFlag': 'false',
+        'Product': {'symbol': symbol, 'securityType': 'EQ'},
+        'All': {
+            'adjustedFlag': False, 'ask': 227.52, 'askSize': 300, 'askTime': '15:59:59 EST 03-05-2026',
+            'bid': 227.5, 'bidExchange': '', 'bidSize': 200, 'bidTime': '15:59:59 EST 03-05-2026',
+            'changeClose': 1.23, 'changeClosePercentage': 0.54, 'companyName': 'APPLE INC COM',
+            'daysToExpiration': 0, 'dirLast': '1', 'dividend': 0.26, 'eps': 6.43,
+            'estEarnings': 7.1, 'exDividendDate': 1770000000, 'high': 228.9, 'high52': 260.1,
+            'lastTrade': 227.51, 'low': 225.3, 'low52': 164.08, 'open': 226.0,
+            'openInterest': 0, 'optionStyle': '', 'optionUnderlier': '', 'previousClose': 226.28,
+            'previousDayVolume': 51234000, 'primaryExchange': 'NSDQ', 'symbolDescription': 'APPLE INC COM',
+            'totalVolume': 48211000, 'upc': 0, 'cashDeliverable': 0, 'marketCap': 3400000000000,
+            'sharesOutstanding': 14900000000, 'nextEarningDate': '', 'beta': 1.2, 'yield': 0.45,
+            'declaredDividend': 0, 'dividendPayableDate': 0, 'pe': 35.4, 'week52LowDate': 0,
+            'week52HiDate': 0, 'intrinsicValue': 0, 'timePremium': 0, 'optionMultiplier': 0,
+            'contractSize': 0, 'expirationDate': 0, 'timeOfLastTrade': 1772744399,
+            'averageVolume': 55000000
+        }
+    }
+
+
+def make_intraday_quote(symbol='AAPL'):
+    """One QuoteData entry with detailFlag=INTRADAY (what trigger polling asks for)."""
+    return {
+        'dateTime': '15:59:59 EST 03-05-2026',
+        'dateTimeUTC': 1772744399,
+        'quoteStatus': 'REALTIME',
+        'ahFlag': 'false',
+        'Product': {'symbol': symbol, 'securityType': 'EQ'},
+        'Intraday': {
+            'ask': 227.52, 'bid': 227.5, 'changeClose': 1.23, 'changeClosePercentage': 0.54,
+            'companyName': 'APPLE INC COM', 'high': 228.9, 'lastTrade': 227.51, 'low': 225.3,
+            'totalVolume': 48211000
+        }
+    }
+
+
+def make_trailing_stop(order_id, filled=True):
+    ts = PendingTrailingStop(
+        opening_order_id=order_id, symbol='AAPL', quantity=10, account_id_key='KEY',
+        opening_side='BUY', trigger_type='dollar', trigger_offset=0.5,
+        stop_type='dollar', stop_offset=0.25
+    )
+    if filled:
+        ts.fill_price = 227.51
+        ts.fill_time = ts.created_at
+        ts.state = TrailingStopState.WAITING_CONFIRMATION
+        ts.calculate_trigger_price()
+    return ts
+
+
+# ==================== Benchmarks ====================
+
+def bench_check_order_filled():
+    monitor = OrderMonitor()
+    orders = [Order.from_api(o) for o in make_orders(200)]
+    target = orders[-1].order_id  # worst case: the order is last in the list
+    return lambda: monitor._check_order_filled(orders, target)
+
+
+def bench_order_models_200():
+    orders = make_orders(200)
+    return lambda: [Order.from_api(o) for o in orders]
+
+
+def bench_quote_model():
+    quote = make_quote()
+    return lambda: Quote.from_api(quote, 'AAPL')
+
+
+def bench_quote_model_intraday():
+    quote = make_intraday_quote()
+    return lambda: Quote.from_api(quote, 'AAPL')
+
+
+def bench_build_order_payload_limit():
+    client = ETradeClient()
+    order = {'symbol': 'AAPL', 'quantity': 10, 'orderAction': 'BUY', 'priceType': 'LIMIT',
+             'orderTerm': 'GOOD_FOR_DAY', 'limitPrice': '227.50'}
+    return lambda: client._build_order_payload(order, preview=False, client_order_id='1234567890',
+                                               preview_id='987654321')
+
+
+def bench_build_order_payload_tsl():
+    client = ETradeClient()
+    order = {'symbol': 'AAPL', 'quantity': 10, 'orderAction': 'SELL', 'priceType': 'TRAILING_STOP_CNST',
+             'orderTerm': 'GOOD_FOR_DAY', 'stopPrice': '0.50', 'stopLimitPrice': '0.01'}
+    return lambda: client._build_order_payload(order, preview=True, client_order_id='1234567890')
+
+
+LIMIT_ORDER = {'symbol': 'AAPL', 'quantity': 10, 'orderAction': 'BUY', 'priceType': 'LIMIT',
+               'orderTerm': 'GOOD_FOR_DAY', 'limitPrice': '227.50'}
+
+
+def bench_order_request_validate():
+    return lambda: OrderRequest.from_dict(LIMIT_ORDER)
+
+
+def bench_encode_order_xml_limit():
+    # Validated once, as the monitor does for exits it re-sends
+    order = OrderRequest.from_dict(LIMIT_ORDER)
+    return lambda: encode_order(order, 'place', '1234567890', '987654321')
+
+
+def bench_encode_order_json_limit():
+    order = OrderRequest.from_dict(LIMIT_ORDER)
+    return lambda: encode_order(order, 'place', '1234567890', '987654321', 'json')
+
+
+def bench_encode_cancel_xml():
+    return lambda: encode_cancel(1234)
+
+
+def bench_pretrade_check_stop():
+    # Data never goes stale here, so every rule runs
+    checker = PretradeChecker(snapshot_max_age=float('inf'), quote_max_age=float('inf'), enabled=True)
+    checker.observe_balance('bench', Balance('1', 'bench', 100000.0, 50000.0, None))
+    checker.observe_positions('bench', [Position('AAPL', 'AAPL', 10, 'LONG', 200.0, 2000.0,
+                                                 2275.0, 275.0, 227.5)])
+    checker.observe_quote(Quote.from_api(make_quote(), 'AAPL'))
+    order = {'symbol': 'AAPL', 'quantity': 10, 'orderAction': 'SELL', 'priceType': 'STOP_LIMIT',
+             'orderTerm': 'GOOD_FOR_DAY', 'stopPrice': '226.50', 'limitPrice': '226.49'}
+    return lambda: checker.check('bench', order)
+
+
+def bench_parse_oauth_response():
+    client = ETradeClient()
+    text = ('oauth_token=%2FiQRgQCRGPo7Xdk6G8QDSEzX0Jsy6sKNcULcDavAGgU%3D'
+            '&oauth_token_secret=%7RrC9scEpzcwSEMy4vE7nodSzPLqfRINnTNY4voczyFM%3D'
+            '&oauth_callback_confirmed=true')
+    return lambda: client._parse_oauth_response(text)
+
+
+def bench_trailing_stop_to_dict():
+    ts = make_trailing_stop(1001)
+    return ts.to_dict
+
+
+def bench_trailing_stop_from_dict():
+    data = make_trailing_stop(1001).to_dict()
+    return lambda: PendingTrailingStop.from_dict(data)
+
+
+def bench_manager_to_json():
+    mgr = TrailingStopManager()
+    for i in range(50):
+        mgr.add_trailing_stop(make_trailing_stop(2000 + i))
+    return mgr.to_json
+
+
+def bench_manager_from_json():
+    mgr = TrailingStopManager()
+    for i in range(50):
+        mgr.add_trailing_stop(make_trailing_stop(2000 + i))
+    payload = mgr.to_json()
+    target = TrailingStopManager()
+    return lambda: target.from_json(payload)
+
+
+def _tsl_status_event():
+    return {'type': 'tsl_status', 'order_id': 123456789, 'state': 'waiting_trigger',
+            'current_price': 227.51, 'trigger_price': 228.0,
+            'message': 'Waiting for trigger... (12/300s)', 'elapsed': 12, 'timeout': 300}
+
+
+def bench_stdlib_loads_orders_500():
+    body = _orders_body()
+    return lambda: json.loads(body)
+
+
+def bench_codec_loads_orders_500():
+    body = _orders_body()
+    return lambda: codec.loads(body)
+
+
+def bench_stdlib_loads_quote():
+    body = json.dumps({'QuoteResponse': {'QuoteData': [make_quote()]}}).encode('utf-8')
+    return lambda: json.loads(body)
+
+
+def bench_codec_loads_quote():
+    body = json.dumps({'QuoteResponse': {'QuoteData': [make_quote()]}}).encode('utf-8')
+    return lambda: codec.loads(body)
+
+
+def bench_codec_loads_quote_intraday():
+    body = json.dumps({'QuoteResponse': {'QuoteData': [make_intraday_quote()]}}).encode('utf-8')
+    return lambda: codec.loads(body)
+
+
+def bench_stdlib_dumps_orders_api_200():
+    # GET /api/orders/<account> response body
+    body = {'success': True, 'orders': [Order.from_api(o).to_dict() for o in make_orders(200)]}
+    return lambda: json.dumps(body).encode('utf-8')
+
+
+def bench_codec_dumps_orders_api_200():
+    body = {'success': True, 'orders': [Order.from_api(o).to_dict() for o in make_orders(200)]}
+    return lambda: codec.dumps(body)
+
+
+def bench_stdlib_sse_frame_100_clients():
+    # Before: every client's generator ran json.dumps on the same event
+    event = _tsl_status_event()
+    return lambda: [f"data: {json.dumps(event)}\n\n".encode('utf-8') for _ in range(100)]
+
+
+def bench_codec_sse_frame():
+    # After: encoded once in _emit and shared by every client
+    event = _tsl_status_event()
+    return lambda: codec.sse_frame(event)
+
+
+def bench_sse_emit_100_clients():
+    monitor = OrderMonitor()
+    clients = [monitor.add_sse_client() for _ in range(100)]
+    event = _tsl_status_event()
+
+    def run():
+        monitor._emit(event)
+        # Drain so queues stay at realistic (near-empty) depth
+        for q in clients:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                pass
+    return run
+
+
+def _orders_body(n=500):
+    return json.dumps(make_orders_response(n)).encode('utf-8')
+
+
+def bench_orders_json_parse_500():
+    # What _make_request does: response.text for logging, then response.json()
+    body = _orders_body()
+
+    def run():
+        text = body.decode('utf-8')
+        text[:500]
+        return json.loads(body)['OrdersResponse']['Order']
+    return run
+
+
+def bench_orders_stream_fills_500():
+    body = _orders_body()
+    chunks = [body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)]
+    return lambda: parse_order_fills(chunks)
+
+
+def bench_orders_stream_one_id_500():
+    body = _orders_body()
+    chunks = [body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)]
+    return lambda: parse_order_fills(chunks, order_ids=[500499])
+
+
+def bench_wire_trace_record():
+    trace = WireTrace(capacity=200, body_bytes=2048)
+    body = _orders_body(20)
+    params = {'status': 'OPEN', 'count': 100}
+    return lambda: trace.record('GET', '/v1/accounts/KEY/orders.json', params, 200, 0.081, None, body)
+
+
+def _log_record():
+    return logging.LogRecord('order_monitor', logging.INFO, __file__, 1,
+                             "[Monitor] Order %s filled at %s", (123456789, 227.51), None)
+
+
+def bench_log_sync_stream():
+    # Before: format + write on the calling (monitor) thread
+    handler = logging.StreamHandler(open(os.devnull, 'w'))
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    record = _log_record()
+    return lambda: handler.handle(record)
+
+
+def bench_log_queue_enqueue():
+    # After: the calling thread only enqueues; the listener formats/writes
+    log_queue = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(log_queue)
+    record = _log_record()
+
+    def run():
+        handler.handle(record)
+        log_queue.get_nowait()
+    return run
+
+
+def bench_log_json_format():
+    # Listener-side cost per record
+    formatter = JSONFormatter()
+    record = _log_record()
+    record.order_id = 123456789
+    return lambda: formatter.format(record)
+
+
+def bench_metrics_histogram_observe():
+    # Per-request instrumentation in _make_request (label tuple + observe)
+    hist = Histogram('bench_seconds', 'bench', ('method', 'endpoint', 'status'))
+    endpoint = '/v1/accounts/KEY/orders.json'
+    return lambda: hist.observe(0.182, ('GET', endpoint_label(endpoint), '200'))
+
+
+def bench_metrics_counter_inc():
+    counter = Counter('bench_total', 'bench', ('result',))
+    return lambda: counter.inc(('hit',))
+
+
+def bench_quote_projection():
+    # GET /api/quote: QuoteData -> Quote -> the UI's fields
+    quote = make_quote()
+    return lambda: Quote.from_api(quote, 'AAPL').to_dict()
+
+
+BENCHMARKS = {
+    'check_order_filled_200': bench_check_order_filled,
+    'order_models_200': bench_order_models_200,
+    'quote_model': bench_quote_model,
+    'quote_model_intraday': bench_quote_model_intraday,
+    'build_order_payload_limit': bench_build_order_payload_limit,
+    'build_order_payload_tsl': bench_build_order_payload_tsl,
+    'order_request_validate': bench_order_request_validate,
+    'encode_order_xml_limit': bench_encode_order_xml_limit,
+    'encode_order_json_limit': bench_encode_order_json_limit,
+    'encode_cancel_xml': bench_encode_cancel_xml,
+    'pretrade_check_stop': bench_pretrade_check_stop,
+    'parse_oauth_response': bench_parse_oauth_response,
+    'trailing_stop_to_dict': bench_trailing_stop_to_dict,
+    'trailing_stop_from_dict': bench_trailing_stop_from_dict,
+    'manager_to_json_50': bench_manager_to_json,
+    'manager_from_json_50': bench_manager_from_json,
+    'sse_emit_100_clients': bench_sse_emit_100_clients,
+    'quote_projection': bench_quote_projection,
+    'orders_json_parse_500': bench_orders_json_parse_500,
+    'orders_stream_fills_500': bench_orders_stream_fills_500,
+    'orders_stream_one_id_500': bench_orders_stream_one_id_500,
+    'stdlib_loads_orders_500': bench_stdlib_loads_orders_500,
+    'codec_loads_orders_500': bench_codec_loads_orders_500,
+    'stdlib_loads_quote': bench_stdlib_loads_quote,
+    'codec_loads_quote': bench_codec_loads_quote,
+    'codec_loads_quote_intraday': bench_codec_loads_quote_intraday,
+    'stdlib_dumps_orders_api_200': bench_stdlib_dumps_orders_api_200,
+    'codec_dumps_orders_api_200': bench_codec_dumps_orders_api_200,
+    'stdlib_sse_frame_100_clients': bench_stdlib_sse_frame_100_clients,
+    'codec_sse_frame': bench_codec_sse_frame,
+    'wire_trace_record': bench_wire_trace_record,
+    'log_sync_stream': bench_log_sync_stream,
+    'log_queue_enqueue': bench_log_queue_enqueue,
+    'log_json_format': bench_log_json_format,
+    'metrics_histogram_observe': bench_metrics_histogram_observe,
+    'metrics_counter_inc': bench_metrics_counter_inc,
+}
+
+
+# ==================== Runner ====================
+
+def time_benchmark(fn, repeat=REPEAT):
+    """Return best seconds-per-call for fn over `repeat` autoranged runs."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    runs = timer.repeat(repeat=repeat, number=number)
+    return min(runs) / number
+
+
+def peak_memory(fn):
+    """Return peak bytes allocated during one call of fn (tracemalloc)."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(selected, memory=False):
+    results = {}
+    for name in selected:
+        fn = BENCHMARKS[name]()
+        results[name] = time_benchmark(fn)
+        line = f"  {name:<32} {_fmt_time(results[name]):>12}"
+        if memory:
+            line += f"   peak {peak_memory(fn) / 1024:>9.1f} KiB"
+        print(line, flush=True)
+    return results
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results, baseline=None):
+    """Add results for benchmarks missing from the baseline; existing entries are kept."""
+    data = baseline or {'machine': {'python': platform.python_version(), 'platform': platform.platform()}}
+    stored = data.setdefault('results', {})
+    added = [name for name in results if name not in stored]
+    kept = [name for name in results if name in stored]
+    for name in added:
+        stored[name] = round(results[name] * 1e9, 1)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f"Baseline {path}: added {', '.join(added) or 'nothing'}")
+    if kept:
+        print(f"Kept existing entries (delete a key to re-record it): {', '.join(kept)}")
+
+
+def compare(results, baseline, fail_over=None):
+    """Print a comparison table; return the list of benchmarks over the threshold."""
+    base = baseline.get('results', {})
+    regressions = []
+    print()
+    print(f"{'benchmark':<32} {'baseline':>12} {'current':>12} {'change':>9}")
+    print("-" * 68)
+    for name, seconds in results.items():
+        current_ns = seconds * 1e9
+        base_ns = base.get(name)
+        if base_ns is None:
+            print(f"{name:<32} {'-':>12} {_fmt_time(seconds):>12} {'new':>9}")
+            continue
+        change = (current_ns - base_ns) / base_ns * 100
+        flag = ''
+        if fail_over is not None and change > fail_over:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<32} {_fmt_time(base_ns / 1e9):>12} {_fmt_time(seconds):>12} {change:>+8.1f}%{flag}")
+    machine = baseline.get('machine', {})
+    if machine:
+        print(f"\nBaseline recorded on Python {machine.get('python')} / {machine.get('platform')}")
+    return regressions
+
+
+def _fmt_time(seconds):
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f} ms"
+    if seconds >= 1e-6:
+        return f"{seconds * 1e6:.2f} us"
+    return f"{seconds * 1e9:.0f} ns"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hot-path microbenchmarks')
+    parser.add_argument('-k', dest='pattern', help='Only run benchmarks whose name contains this')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline JSON path')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Add benchmarks missing from the baseline (existing entries are kept)')
+    parser.add_argument('--fail-over', type=float, default=None,
+                        help='Exit 1 if any benchmark regresses by more than this percent')
+    parser.add_argument('--list', action='store_true', help='List benchmark names and exit')
+    parser.add_argument('--memory', action='store_true', help='Also report peak memory of one call')
+    args = parser.parse_args()
+
+    if args.list:
+        print('\n'.join(BENCHMARKS))
+        return 0
+
+    # Keep log formatting/I-O out of the timings
+    logging.disable(logging.CRITICAL)
+
+    selected = [n for n in BENCHMARKS if not args.pattern or args.pattern in n]
+    print(f"Running {len(selected)} benchmark(s) (best of {REPEAT}, JSON codec: {codec.BACKEND}):")
+    results = run(selected, args.memory)
+
+    baseline = load_baseline(args.baseline)
+    if args.save_baseline:
+        save_baseline(args.baseline, results, baseline)
+        return 0
+
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+
+    regressions = compare(results, baseline, args.fail_over)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.fail_over}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
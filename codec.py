@@ -0,0 +1,59 @@
+"""
+JSON Codec
+
+Single entry point for JSON encoding/decoding across the app: upstream
+E*TRADE responses, Flask API responses, SSE frames, token storage and
+trailing stop persistence.
+
+Uses orjson when it is installed (several times faster on both encode
+and decode, and it produces bytes directly) and falls back to the
+standard library otherwise. Output is compact (no whitespace) either way.
+
+    codec.dumps(obj)        -> bytes
+    codec.dumps_str(obj)    -> str
+    codec.loads(data)       -> object (accepts bytes or str)
+    codec.sse_frame(event)  -> bytes ready to write to an SSE stream
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+if orjson is not None:
+    # Integer dict keys (e.g. order IDs) are allowed like in the stdlib
+    _ORJSON_OPTS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj, default=None):
+        """Encode obj to compact JSON bytes."""
+        return orjson.dumps(obj, default=default, option=_ORJSON_OPTS)
+
+    def loads(data):
+        """Decode JSON from bytes or str."""
+        return orjson.loads(data)
+
+else:
+    _encoder = json.JSONEncoder(separators=(',', ':'))
+
+    def dumps(obj, default=None):
+        """Encode obj to compact JSON bytes."""
+        if default is None:
+            return _encoder.encode(obj).encode('utf-8')
+        return json.dumps(obj, separators=(',', ':'), default=default).encode('utf-8')
+
+    def loads(data):
+        """Decode JSON from bytes or str."""
+        return json.loads(data)
+
+
+def dumps_str(obj, default=None):
+    """Encode obj to a compact JSON str (for text-only consumers)."""
+    return dumps(obj, default=default).decode('utf-8')
+
+
+def sse_frame(event):
+    """Encode an event once as a complete SSE 'data:' frame."""
+    return b'data: ' + dumps(event, default=str) + b'\n\n'
@@ -34,6 +34,92 @@ USE_SANDBOX = os.environ.get('ETRADE_USE_SANDBOX', 'true').lower() == 'true'
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379')
 TOKEN_KEY_PREFIX = 'etrade:token:'
 TOKEN_EXPIRY_HOURS = 24  # E*TRADE tokens expire at midnight ET
+# Seconds tokens are served from memory before storage is read again (0 disables)
+TOKEN_CACHE_SECONDS = float(os.environ.get('TOKEN_CACHE_SECONDS', '30'))
+# Order placement journal (order_journal.py): intents outlive a restart for a day
+ORDER_JOURNAL_KEY_PREFIX = 'etrade:journal:'
+ORDER_JOURNAL_TTL_HOURS = 24
+# E*TRADE error code(s) refusing a place whose clientOrderId was already used
+# (comma-separated); only these count as a duplicate place, not the message text
+ETRADE_DUPLICATE_ORDER_CODES = frozenset(
+    int(code) for code in os.environ.get('ETRADE_DUPLICATE_ORDER_CODES', '1063').split(',') if code.strip())
+
+# E*TRADE HTTP timeouts in seconds (connect, read) - no upstream call may hang forever
+ETRADE_CONNECT_TIMEOUT = float(os.environ.get('ETRADE_CONNECT_TIMEOUT', '3.05'))
+ETRADE_READ_TIMEOUT = float(os.environ.get('ETRADE_READ_TIMEOUT', '15'))
+
+# E*TRADE retry policy (see request_policy.py): attempts per call including
+# the first, and the jittered exponential backoff between them
+ETRADE_RETRY_ATTEMPTS = int(os.environ.get('ETRADE_RETRY_ATTEMPTS', '3'))
+ETRADE_RETRY_BASE_DELAY = float(os.environ.get('ETRADE_RETRY_BASE_DELAY', '0.25'))
+ETRADE_RETRY_MAX_DELAY = float(os.environ.get('ETRADE_RETRY_MAX_DELAY', '2'))
+# Overall deadline for the upstream calls made by one API request (seconds)
+API_REQUEST_DEADLINE = float(os.environ.get('API_REQUEST_DEADLINE', '30'))
+
+# E*TRADE request budget (token bucket, requests/second and burst); spare
+# capacity is what hedged requests may spend
+ETRADE_RATE_LIMIT = float(os.environ.get('ETRADE_RATE_LIMIT', '4'))
+ETRADE_RATE_BURST = float(os.environ.get('ETRADE_RATE_BURST', '8'))
+# Hedged fill-detection reads: a second identical GET once the first has been
+# outstanding for the endpoint's observed ETRADE_HEDGE_PERCENTILE latency
+ETRADE_HEDGE_READS = os.environ.get('ETRADE_HEDGE_READS', 'false').lower() == 'true'
+ETRADE_HEDGE_PERCENTILE = float(os.environ.get('ETRADE_HEDGE_PERCENTILE', '0.9'))
+ETRADE_HEDGE_MIN_DELAY = float(os.environ.get('ETRADE_HEDGE_MIN_DELAY', '0.05'))
+
+# Order request body format sent to E*TRADE: 'xml' or 'json' (order_encoder.py)
+ORDER_PAYLOAD_FORMAT = os.environ.get('ORDER_PAYLOAD_FORMAT', 'xml').lower()
+
+# Account data cache (account_cache.py): seconds accounts, balances and
+# portfolios are served from memory, then served stale while refreshing
+ACCOUNTS_CACHE_TTL = float(os.environ.get('ACCOUNTS_CACHE_TTL', '300'))
+BALANCE_CACHE_TTL = float(os.environ.get('BALANCE_CACHE_TTL', '15'))
+PORTFOLIO_CACHE_TTL = float(os.environ.get('PORTFOLIO_CACHE_TTL', '15'))
+ACCOUNT_CACHE_STALE_SECONDS = float(os.environ.get('ACCOUNT_CACHE_STALE_SECONDS', '60'))
+# Deadline for one background refresh of a stale entry (seconds)
+ACCOUNT_CACHE_REFRESH_DEADLINE = float(os.environ.get('ACCOUNT_CACHE_REFRESH_DEADLINE', '10'))
+
+# Most E*TRADE calls one API request runs concurrently (fanout.py)
+FANOUT_WORKERS = int(os.environ.get('FANOUT_WORKERS', '4'))
+# ... for /api/accounts/summary, which makes two calls per account
+ACCOUNT_SUMMARY_WORKERS = int(os.environ.get('ACCOUNT_SUMMARY_WORKERS', '8'))
+
+# Per-client SSE queue bound (0 = unbounded). A client whose queue fills up
+# is evicted instead of growing server memory without limit.
+SSE_QUEUE_MAXSIZE = int(os.environ.get('SSE_QUEUE_MAXSIZE', '0'))
+# Hard limits for one POST /api/debug/sse-load run (only one runs at a time)
+SSE_LOAD_MAX_RATE = float(os.environ.get('SSE_LOAD_MAX_RATE', '1000'))
+SSE_LOAD_MAX_DURATION = float(os.environ.get('SSE_LOAD_MAX_DURATION', '300'))
+SSE_LOAD_MAX_PAYLOAD_BYTES = int(os.environ.get('SSE_LOAD_MAX_PAYLOAD_BYTES', '65536'))
+
+# Seconds between quote hub ticks (quote_hub.py); each tick fetches every
+# watched or monitored symbol in batched multi-symbol quote calls
+QUOTE_HUB_INTERVAL = float(os.environ.get('QUOTE_HUB_INTERVAL', '2'))
+
+# Monitor watchdog (monitor_watchdog.py): check interval, heartbeat age (in poll
+# intervals) before 'lagging', seconds before 'stalled', sleep overshoot that
+# counts as scheduler lag, and whether stalled monitors are restarted
+WATCHDOG_INTERVAL = float(os.environ.get('WATCHDOG_INTERVAL', '5'))
+WATCHDOG_LAG_FACTOR = float(os.environ.get('WATCHDOG_LAG_FACTOR', '5'))
+WATCHDOG_STALL_SECONDS = float(os.environ.get('WATCHDOG_STALL_SECONDS', '60'))
+WATCHDOG_SCHEDULER_LAG_SECONDS = float(os.environ.get('WATCHDOG_SCHEDULER_LAG_SECONDS', '1'))
+WATCHDOG_RESTART = os.environ.get('WATCHDOG_RESTART', 'false').lower() == 'true'
+# Oldest quote (seconds) each consumer accepts from the shared quote cache
+# (quote_cache.py): UI display, BID/ASK limit prices, trigger checks
+QUOTE_MAX_AGE_UI = float(os.environ.get('QUOTE_MAX_AGE_UI', '3'))
+QUOTE_MAX_AGE_ORDER = float(os.environ.get('QUOTE_MAX_AGE_ORDER', '1'))
+QUOTE_MAX_AGE_TRIGGER = float(os.environ.get('QUOTE_MAX_AGE_TRIGGER', '0.5'))
+
+# Local pre-trade checks (pretrade.py) against the last fetched balance and
+# portfolio (trusted for PRETRADE_SNAPSHOT_MAX_AGE seconds) and quote
+PRETRADE_CHECKS = os.environ.get('PRETRADE_CHECKS', 'true').lower() == 'true'
+PRETRADE_SNAPSHOT_MAX_AGE = float(os.environ.get('PRETRADE_SNAPSHOT_MAX_AGE', '60'))
+PRETRADE_QUOTE_MAX_AGE = float(os.environ.get('PRETRADE_QUOTE_MAX_AGE', '5'))
+
+# Diagnostic endpoints (/metrics, /api/debug/*: load testing, traces,
+# profiling) require an X-Admin-Token header matching ADMIN_TOKEN. Without
+# a token they answer 404, unless ADMIN_OPEN_DIAGNOSTICS=true (local dev only)
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+ADMIN_OPEN_DIAGNOSTICS = os.environ.get('ADMIN_OPEN_DIAGNOSTICS', 'false').lower() == 'true'
 
 # Flask configuration
 SECRET_KEY = os.environ.get('FLASK_SECRET_KEY', 'etrade-trading-secret-key-change-in-production')
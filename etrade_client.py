@@ -9,16 +9,31 @@ Wraps all E*TRADE API functionality:
 - Portfolio/positions
 """
 import json
-import random
+import time
 import logging
+from datetime import timedelta
 from urllib.parse import unquote, quote
 from requests import Session
 from requests_oauthlib import OAuth1, OAuth1Session
 from config import (
     get_base_url, get_credentials,
     REQUEST_TOKEN_URL, ACCESS_TOKEN_URL, AUTHORIZE_URL,
-    USE_SANDBOX
+    USE_SANDBOX, ORDER_PAYLOAD_FORMAT
 )
+import codec
+from wire_trace import get_wire_trace
+from metrics import ETRADE_REQUEST_RETRIES, ETRADE_REQUEST_SECONDS, endpoint_label
+import request_policy
+from request_policy import get_retry_policy
+from rate_limiter import get_rate_limiter
+from order_journal import get_order_journal, is_duplicate_error
+from order_encoder import CONTENT_TYPES, encode_cancel, encode_order
+from pretrade import get_pretrade_checker
+from account_cache import get_account_cache
+import server_timing
+from etrade_models import Balance, Order, Position, Quote, QUOTE_DETAIL_ALL, QUOTE_DETAILS, market_now
+from order_book import get_order_book
+from order_stream import CHUNK_SIZE, OrdersStreamParser
 
 logger = logging.getLogger(__name__)
 
@@ -26,9 +41,42 @@ logger = logging.getLogger(__name__)
 CALLBACK_URL = "https://web-production-9f73cd.up.railway.app/api/auth/callback"
 
 
+def _same_price(listed, journaled):
+    """Prices equal to the cent (None/0 means no price)."""
+    try:
+        return round(float(listed or 0), 2) == round(float(journaled or 0), 2)
+    except (TypeError, ValueError):
+        return False
+
+
+def _account_changed(account_id_key):
+    """An order was placed or cancelled: cached balances and positions are out of date."""
+    get_pretrade_checker().invalidate(account_id_key)
+    get_account_cache().invalidate(account_id_key)
+
+
+class ETradeAPIError(Exception):
+    """A non-2xx E*TRADE response; code is the Error body's code, if any."""
+
+    def __init__(self, status, message, code=None):
+        super().__init__(f"API Error ({status}): {message}")
+        self.status = status
+        self.code = code
+
+
+def _close_response(response):
+    """Release a streamed response nobody will read (a hedged request's loser)."""
+    try:
+        response.close()
+    except Exception:
+        pass
+
+
 class ETradeClient:
     """E*TRADE API Client with OAuth 1.0a support using requests-oauthlib"""
 
+    ORDERS_PAGE_SIZE = 100  # E*TRADE max count for list orders
+
     def __init__(self):
         """Initialize the E*TRADE client"""
         self.base_url = get_base_url()
@@ -85,7 +133,8 @@ class ETradeClient:
 
             # Fetch request token (like pyetrade)
             try:
-                self._oauth_session.fetch_request_token(REQUEST_TOKEN_URL)
+                self._oauth_session.fetch_request_token(
+                    REQUEST_TOKEN_URL, timeout=request_policy.timeout())
             except Exception as e:
                 error_msg = str(e)
                 # Check for callback rejection
@@ -161,7 +210,8 @@ class ETradeClient:
                 self._oauth_session._client.client.verifier = verifier_code
 
                 # Fetch access token (like pyetrade)
-                access_token_dict = self._oauth_session.fetch_access_token(ACCESS_TOKEN_URL)
+                access_token_dict = self._oauth_session.fetch_access_token(
+                    ACCESS_TOKEN_URL, timeout=request_policy.timeout())
 
                 self.access_token = access_token_dict.get('oauth_token')
                 self.access_token_secret = access_token_dict.get('oauth_token_secret')
@@ -190,7 +240,8 @@ class ETradeClient:
                 # Get access token - E*TRADE uses GET for access_token
                 response = self.session.get(
                     ACCESS_TOKEN_URL,
-                    auth=oauth
+                    auth=oauth,
+                    timeout=request_policy.timeout()
                 )
 
                 logger.info(f"Access token response status: {response.status_code}")
@@ -247,19 +298,32 @@ class ETradeClient:
         self._setup_oauth()
         logger.info(f"OAuth session configured from stored tokens, base_url: {self.base_url}")
 
-    def _make_request(self, method, endpoint, params=None, data=None, headers=None):
+    def _make_request(self, method, endpoint, params=None, data=None, headers=None, stream=False,
+                      idempotent=None, hedge=False):
         """
         Make an authenticated API request
 
+        Transient failures are retried per the request policy (see
+        request_policy.py), within the caller's deadline if one is set.
+
         Args:
             method: HTTP method (GET, POST, PUT)
             endpoint: API endpoint (without base URL)
             params: Query parameters
             data: Request body (for POST/PUT)
             headers: Additional headers
+            stream: Return the open response (body not read) instead of
+                    decoded JSON; the caller must close it
+            idempotent: Safe to repeat after the request may have reached
+                        E*TRADE. Defaults to True for GET, PUT (cancel) and
+                        order previews; other POSTs (place) are only retried
+                        when they were never sent
+            hedge: (GET only) send a second identical request if the first
+                   is slower than the endpoint's p90, when ETRADE_HEDGE_READS
+                   is enabled (see request_policy.hedged)
 
         Returns:
-            dict response data
+            dict response data (or requests.Response when stream=True)
         """
         if not self._oauth:
             raise Exception("Not authenticated. Please authenticate first.")
@@ -271,13 +335,55 @@ class ETradeClient:
         if headers:
             default_headers.update(headers)
 
+        if idempotent is None:
+            idempotent = method != 'POST' or endpoint.endswith('/preview.json')
+
+        def send(charged=False):
+            return self._send_request(method, endpoint, url, params, data, default_headers, stream, charged)
+
+        if hedge and method == 'GET':
+            label = endpoint_label(endpoint)
+            hedged_send = send
+
+            def send():
+                # A fired hedge has already taken its budget token
+                return request_policy.hedged(hedged_send, label,
+                                             discard=_close_response if stream else None)
+
+        policy = get_retry_policy()
+        attempt = 1
+        while True:
+            try:
+                return send()
+            except Exception as e:
+                if not policy.should_retry(e, attempt, idempotent) or not policy.sleep_before(attempt):
+                    raise
+                ETRADE_REQUEST_RETRIES.inc((method, endpoint_label(endpoint), request_policy.retry_reason(e)))
+                logger.warning(f"Retrying {method} {endpoint} (attempt {attempt + 1}/{policy.attempts}): {e}")
+                attempt += 1
+
+    def _send_request(self, method, endpoint, url, params, data, headers, stream, charged=False):
+        """
+        One attempt of _make_request (traced, timed and bounded by the deadline).
+
+        charged: The call's request-budget token was already taken (a
+        hedge, see request_policy.hedged), so it is not charged again.
+        """
+        trace = get_wire_trace()
+        entry = None
+        status = None
+        if not charged:
+            get_rate_limiter().consume()
+        start = time.perf_counter()
         try:
-            logger.info(f"Making {method} request to {url}")
+            logger.debug(f"Making {method} request to {url}")
 
             request_args = {
                 'params': params,
-                'headers': default_headers,
-                'auth': self._oauth
+                'headers': headers,
+                'auth': self._oauth,
+                'stream': stream,
+                'timeout': request_policy.timeout()
             }
 
             if method == 'GET':
@@ -293,36 +399,59 @@ class ETradeClient:
             if response is None:
                 raise Exception("API returned None response")
 
-            logger.info(f"Response Status: {response.status_code}")
+            status = response.status_code
 
-            # Log response body for debugging
-            logger.info(f"Response text (first 500 chars): {response.text[:500] if response.text else 'Empty'}")
+            if stream and status in [200, 201, 204]:
+                # Body is consumed by the caller; trace the exchange without it
+                entry = trace.record(method, endpoint, params, status, time.perf_counter() - start, data)
+                return response
 
-            if response.status_code == 204:
+            # Response body goes to the wire trace instead of the log
+            body = response.content
+            entry = trace.record(method, endpoint, params, status, time.perf_counter() - start, data, body)
+
+            if status == 204:
                 return {'status': 'success', 'data': None}
 
-            if response.status_code not in [200, 201]:
+            if status not in [200, 201]:
                 error_msg = "Unknown error"
+                error_code = None
                 try:
-                    error_data = response.json()
+                    error_data = codec.loads(body)
                     if error_data is not None and 'Error' in error_data:
                         error_msg = error_data['Error'].get('message', str(error_data))
+                        error_code = error_data['Error'].get('code')
                     elif error_data is not None:
                         error_msg = str(error_data)
                 except Exception as json_err:
                     error_msg = response.text[:200] if response.text else "No error message"
-                raise Exception(f"API Error ({response.status_code}): {error_msg}")
+                raise ETradeAPIError(status, error_msg, error_code)
 
-            result = response.json()
+            result = codec.loads(body)
             if result is None:
-                logger.warning("response.json() returned None")
+                logger.warning("API response decoded to None")
                 return {}
 
             return result
 
         except Exception as e:
-            logger.error(f"API request failed: {e}")
+            logger.error(f"API request failed: {method} {endpoint}: {e}")
+            # Dump the failing exchange (request/response bodies) with the error
+            if entry is None:
+                entry = trace.record(method, endpoint, params, status, time.perf_counter() - start,
+                                     data, error=str(e))
+            if entry is not None:
+                logger.error(f"Wire trace: {trace.to_dict(entry)}")
             raise
+        finally:
+            duration = time.perf_counter() - start
+            label = endpoint_label(endpoint)
+            status_label = str(status) if status else 'error'
+            ETRADE_REQUEST_SECONDS.observe(duration, (method, label, status_label))
+            if status in (200, 201) and method == 'GET':
+                request_policy.observe_latency(label, duration)
+            server_timing.record(server_timing.upstream_name(label), duration,
+                                 f'{method} {status_label}', upstream=True)
 
     # ==================== ACCOUNT APIs ====================
 
@@ -340,8 +469,6 @@ class ETradeClient:
             logger.warning("Accounts API returned None")
             return accounts
 
-        logger.info(f"Accounts API response: {response}")
-
         if 'AccountListResponse' in response and response['AccountListResponse'] is not None:
             if 'Accounts' in response['AccountListResponse'] and response['AccountListResponse']['Accounts'] is not None:
                 account_data = response['AccountListResponse']['Accounts']
@@ -353,17 +480,20 @@ class ETradeClient:
         logger.info(f"Retrieved {len(accounts)} accounts")
         return accounts
 
-    def get_account_balance(self, account_id_key):
+    def get_account_balance(self, account_id_key, as_model=False):
         """
         Get account balance
 
         Args:
             account_id_key: Account ID key from account list
+            as_model: Return a Balance model instead of the raw dict
 
         Returns:
-            dict with balance information
+            dict with balance information (or Balance)
         """
         params = {'instType': 'BROKERAGE', 'realTimeNAV': 'true'}
+        checker = get_pretrade_checker()
+        version = checker.version(account_id_key)
         response = self._make_request(
             'GET',
             f'/v1/accounts/{account_id_key}/balance.json',
@@ -371,20 +501,28 @@ class ETradeClient:
         )
 
         if 'BalanceResponse' in response:
-            return response['BalanceResponse']
+            response = response['BalanceResponse']
 
+        # Recorded for the pre-trade buying power check
+        balance = Balance.from_api(response)
+        checker.observe_balance(account_id_key, balance, version)
+        if as_model:
+            return balance
         return response
 
-    def get_portfolio(self, account_id_key):
+    def get_portfolio(self, account_id_key, as_model=False):
         """
         Get portfolio positions
 
         Args:
             account_id_key: Account ID key
+            as_model: Return Position models instead of raw dicts
 
         Returns:
-            list of position objects
+            list of position objects (or Positions)
         """
+        checker = get_pretrade_checker()
+        version = checker.version(account_id_key)
         response = self._make_request(
             'GET',
             f'/v1/accounts/{account_id_key}/portfolio.json'
@@ -398,55 +536,71 @@ class ETradeClient:
                         positions.extend(portfolio['Position'])
 
         logger.info(f"Retrieved {len(positions)} positions")
+        # Recorded for the pre-trade position check
+        models = [Position.from_api(pos) for pos in positions]
+        checker.observe_positions(account_id_key, models, version)
+        if as_model:
+            return models
         return positions
 
     # ==================== MARKET APIs ====================
 
-    def get_quote(self, symbol):
+    def get_quote(self, symbol, as_model=False, detail=QUOTE_DETAIL_ALL):
         """
         Get market quote for a symbol
 
         Args:
             symbol: Stock symbol (e.g., AAPL)
+            as_model: Return a Quote model (None if no quote data came back)
+            detail: E*TRADE detailFlag (etrade_models.QUOTE_DETAILS); INTRADAY
+                    is enough for trigger checks and a smaller response
 
         Returns:
-            dict with quote data
+            dict with quote data (or Quote)
         """
         response = self._make_request(
             'GET',
-            f'/v1/market/quote/{symbol.upper()}.json'
+            f'/v1/market/quote/{symbol.upper()}.json',
+            params=self._quote_params(detail)
         )
 
         if response is None:
             logger.warning(f"Quote API returned None for {symbol}")
             return None
 
-        logger.info(f"Quote API response for {symbol}: {response}")
-
         if 'QuoteResponse' in response and response['QuoteResponse'] is not None:
             if 'QuoteData' in response['QuoteResponse'] and response['QuoteResponse']['QuoteData'] is not None:
                 quotes = response['QuoteResponse']['QuoteData']
                 if isinstance(quotes, list) and len(quotes) > 0:
+                    quote = Quote.from_api(quotes[0], symbol)
+                    get_pretrade_checker().observe_quote(quote)
+                    if as_model:
+                        return quote
                     return quotes[0]
 
+        if as_model:
+            return None
         return response
 
-    def get_quotes(self, symbols):
+    def get_quotes(self, symbols, as_model=False, detail=QUOTE_DETAIL_ALL):
         """
         Get quotes for multiple symbols
 
         Args:
             symbols: List of stock symbols
+            as_model: Return Quote models instead of raw dicts
+            detail: E*TRADE detailFlag (see get_quote)
 
         Returns:
-            list of quote data
+            list of quote data (or Quotes)
         """
         if isinstance(symbols, list):
             symbols = ','.join(symbols)
 
         response = self._make_request(
             'GET',
-            f'/v1/market/quote/{symbols.upper()}.json'
+            f'/v1/market/quote/{symbols.upper()}.json',
+            params=self._quote_params(detail)
         )
 
         quotes = []
@@ -454,32 +608,65 @@ class ETradeClient:
             if 'QuoteData' in response['QuoteResponse']:
                 quotes = response['QuoteResponse']['QuoteData']
 
+        models = [Quote.from_api(q) for q in quotes]
+        checker = get_pretrade_checker()
+        for quote in models:
+            checker.observe_quote(quote)
+        if as_model:
+            return models
         return quotes
 
+    @staticmethod
+    def _quote_params(detail):
+        # ALL is E*TRADE's default, so full quotes keep their plain URL
+        if detail not in QUOTE_DETAILS:
+            raise ValueError(f"Unknown quote detail: {detail}")
+        return None if detail == QUOTE_DETAIL_ALL else {'detailFlag': detail}
+
     # ==================== ORDER APIs ====================
 
-    def preview_order(self, account_id_key, order_data):
+    def preview_order(self, account_id_key, order_data, intent=None):
         """
         Preview an order before placing
 
         Args:
             account_id_key: Account ID key
             order_data: Order details dict
+            intent: What the order is for, e.g. 'exit:<opening order id>:profit';
+                    the same intent always gets the same clientOrderId
+                    (see order_journal.py)
 
         Returns:
             dict with preview results including previewId and clientOrderId
+
+        Raises:
+            PretradeRejected: The order failed a local pre-trade check
+                              (pretrade.py); nothing was sent
         """
-        # Generate clientOrderId and store it for place_order
-        client_order_id = str(random.randint(1000000000, 9999999999))
+        journal = get_order_journal()
+        placed = journal.placed_entry(account_id_key, intent)
+        if placed is not None:
+            # place_order will return the journaled order without sending
+            logger.info(f"Intent {intent} already placed as order {placed['order_id']}, skipping preview")
+            return {
+                'preview_id': placed['preview_id'],
+                'client_order_id': placed['client_order_id'],
+                'already_placed': True,
+                'order': {},
+                'estimated_commission': 0,
+                'estimated_total': 0
+            }
 
-        # Build XML payload with specific clientOrderId
-        payload = self._build_order_payload(order_data, preview=True, client_order_id=client_order_id)
+        get_pretrade_checker().check(account_id_key, order_data, intent)
+
+        # Deterministic clientOrderId, passed on to place_order
+        client_order_id = journal.client_order_id(account_id_key, intent)
 
-        # DEBUG: Log the preview payload
-        logger.info(f"FULL PREVIEW ORDER PAYLOAD:\n{payload}")
+        # Build payload with specific clientOrderId
+        payload = self._build_order_payload(order_data, preview=True, client_order_id=client_order_id)
 
         headers = {
-            'Content-Type': 'application/xml',
+            'Content-Type': CONTENT_TYPES[ORDER_PAYLOAD_FORMAT],
             'consumerkey': self.consumer_key
         }
 
@@ -491,10 +678,9 @@ class ETradeClient:
         )
 
         if 'PreviewOrderResponse' in response:
-            # DEBUG: Log the full PreviewIds structure
+            # Full PreviewIds structure is in the wire trace
             preview_ids_raw = response['PreviewOrderResponse'].get('PreviewIds')
-            logger.info(f"FULL PreviewIds field: {preview_ids_raw}")
-            logger.info(f"PreviewIds type: {type(preview_ids_raw)}")
+            logger.debug(f"PreviewIds field: {preview_ids_raw}")
 
             # Extract preview_id - PreviewIds array contains equity + CASH items
             # Filter for equity item, skip CASH item
@@ -506,7 +692,7 @@ class ETradeClient:
                         symbol = item.get('symbol', '')
                         if symbol != 'CASH' and 'previewId' in item:
                             preview_id = item.get('previewId')
-                            logger.info(f"Extracted equity preview_id from list: {preview_id} (symbol: {symbol})")
+                            logger.debug(f"Extracted equity preview_id from list: {preview_id} (symbol: {symbol})")
                             break
                     if not preview_id and len(preview_ids_raw) > 0:
                         preview_id = preview_ids_raw[0].get('previewId')
@@ -528,179 +714,248 @@ class ETradeClient:
 
         return response
 
-    def place_order(self, account_id_key, order_data, preview_id=None, client_order_id=None):
+    def place_order(self, account_id_key, order_data, preview_id=None, client_order_id=None,
+                    intent=None):
         """
         Place an order
 
+        The place is journaled (order_journal.py): an intent already placed
+        is not sent again, and after an ambiguous failure (timeout, 5xx) the
+        order is looked up and only sent again if it is absent. Every resend
+        goes through that lookup, so the POST itself is never retried blindly.
+
         Args:
             account_id_key: Account ID key
             order_data: Order details dict
             preview_id: Preview ID from preview_order (required for placing)
             client_order_id: Client order ID from preview_order (must match preview)
+            intent: Same as preview_order's; only used when no
+                    client_order_id is passed
 
         Returns:
             dict with order results
-        """
-        # DEBUG: Log incoming values
-        logger.info(f"place_order called with preview_id={preview_id}, client_order_id={client_order_id}")
 
-        # Generate or use provided clientOrderId
+        Raises:
+            PretradeRejected: Placed without a preview and failed a local
+                              pre-trade check (pretrade.py)
+        """
+        journal = get_order_journal()
         if not client_order_id:
-            client_order_id = str(random.randint(1000000000, 9999999999))
-            logger.warning(f"No client_order_id provided, generated new one: {client_order_id}")
+            client_order_id = journal.client_order_id(account_id_key, intent)
+            if intent is None:
+                logger.warning(f"No client_order_id provided, generated new one: {client_order_id}")
 
-        # Build XML payload with previewId included properly
+        # Validated before the journal records anything; the payload is in
+        # the wire trace (GET /api/debug/wire-trace)
         payload = self._build_order_payload(order_data, preview=False, client_order_id=client_order_id, preview_id=preview_id)
 
-        if preview_id:
-            logger.info(f"Building place order with previewId: {preview_id}")
-        else:
+        if not preview_id:
             logger.error("NO PREVIEW_ID - E*TRADE will reject this order!")
+            # preview_order checks previewed orders
+            get_pretrade_checker().check(account_id_key, order_data, intent)
 
-        # DEBUG: Log the full XML payload with clear marker
-        logger.info("=" * 60)
-        logger.info("DEPLOYMENT MARKER: FIX4-2026-02-18-PREVIEWIDS-WRAPPER")
-        logger.info("=" * 60)
-        logger.info(f"FULL PLACE ORDER PAYLOAD:\n{payload}")
-        logger.info("=" * 60)
+        entry = journal.begin(client_order_id, account_id_key, order_data, intent, preview_id)
+        if entry['status'] == 'placed':
+            return {
+                'order_id': entry['order_id'],
+                'message': 'Order already placed',
+                'duplicate': True
+            }
 
         # NOTE: Removed delay - E*TRADE preview may have very short timeout
         # Placing immediately after preview is more reliable
 
         headers = {
-            'Content-Type': 'application/xml',
+            'Content-Type': CONTENT_TYPES[ORDER_PAYLOAD_FORMAT],
             'consumerkey': self.consumer_key
         }
 
         endpoint = f'/v1/accounts/{account_id_key}/orders/place.json'
 
-        response = self._make_request(
-            'POST',
-            endpoint,
-            data=payload,
-            headers=headers
-        )
+        policy = get_retry_policy()
+        attempt = 1
+        while True:
+            try:
+                response = self._make_request(
+                    'POST',
+                    endpoint,
+                    data=payload,
+                    headers=headers,
+                    idempotent=False
+                )
+                break
+            except Exception as e:
+                duplicate = is_duplicate_error(e)
+                if not duplicate and not (request_policy.is_transient(e) and request_policy.was_sent(e)):
+                    journal.failed(client_order_id, e)
+                    raise
+                # Ambiguous: the order may exist
+                try:
+                    order_id = self.find_placed_order(account_id_key, entry)
+                except Exception as lookup_error:
+                    logger.error(f"Order lookup after failed place {client_order_id} failed: {lookup_error}")
+                    order_id = None
+                if order_id:
+                    logger.warning(f"Place {client_order_id} failed ({e}) but order {order_id} exists")
+                    journal.placed(client_order_id, order_id, recovered=True)
+                    _account_changed(account_id_key)
+                    return {
+                        'order_id': order_id,
+                        'message': 'Order placed successfully (recovered after error)',
+                        'recovered': True
+                    }
+                if (duplicate or not policy.should_retry(e, attempt, True)
+                        or not policy.sleep_before(attempt)):
+                    journal.failed(client_order_id, e, ambiguous=True)
+                    raise
+                logger.warning(f"Place {client_order_id} failed ({e}) and no order was found, sending again")
+                journal.resent(client_order_id)
+                attempt += 1
 
         if 'PlaceOrderResponse' in response:
+            order_id = response['PlaceOrderResponse'].get('OrderIds', [{}])[0].get('orderId')
+            journal.placed(client_order_id, order_id)
+            _account_changed(account_id_key)
             return {
-                'order_id': response['PlaceOrderResponse'].get('OrderIds', [{}])[0].get('orderId'),
+                'order_id': order_id,
                 'message': 'Order placed successfully',
                 'raw_response': response
             }
 
+        journal.failed(client_order_id, 'No PlaceOrderResponse')
         return response
 
+    def find_placed_order(self, account_id_key, entry):
+        """
+        Find the order a journal entry placed, if it exists.
+
+        E*TRADE does not list clientOrderId, so this matches symbol, action,
+        quantity, price type and price among orders placed since the entry
+        was recorded, skipping orders other entries already claimed.
+
+        Args:
+            account_id_key: Account ID key
+            entry: Order journal entry
+
+        Returns:
+            order ID or None
+        """
+        since = entry['created'] - 5000  # allow for clock skew
+        claimed = get_order_journal().claimed_order_ids(account_id_key)
+        orders = self.get_orders(account_id_key, status=None,
+                                 from_date=market_now() - timedelta(days=1),
+                                 to_date=market_now(),
+                                 symbol=entry['symbol'], as_model=True)
+        for order in sorted(orders, key=lambda o: o.placed_time or 0):
+            if str(order.order_id) in claimed or (order.placed_time or 0) < since:
+                continue
+            if (order.action == entry['action'] and order.quantity == entry['quantity']
+                    and order.price_type == entry['price_type']
+                    and _same_price(order.limit_price, entry['limit_price'])
+                    and _same_price(order.stop_price, entry['stop_price'])):
+                return order.order_id
+        return None
+
     def _build_order_payload(self, order_data, preview=True, client_order_id=None, preview_id=None):
         """
-        Build XML payload for order
+        Build the request body for an order (see order_encoder.py)
 
         Args:
             order_data: Order details
                 - symbol: Stock symbol
                 - quantity: Number of shares
                 - orderAction: BUY, SELL, BUY_TO_COVER, SELL_SHORT
-                - priceType: MARKET, LIMIT, STOP_LIMIT
+                - priceType: MARKET, LIMIT, STOP, STOP_LIMIT, TRAILING_STOP_CNST
                 - limitPrice: Limit price (required for LIMIT and STOP_LIMIT)
-                - stopPrice: Stop price (required for STOP_LIMIT)
-                - orderTerm: GOOD_FOR_DAY, GOOD_TILL_CANCEL, etc.
+                - stopPrice: Stop price (trail amount for TRAILING_STOP_CNST)
+                - stopLimitPrice: Limit offset for TRAILING_STOP_CNST
+                - orderTerm: GOOD_FOR_DAY, GOOD_UNTIL_CANCEL, etc.
             preview: Whether this is a preview request
             client_order_id: Optional client order ID (must match between preview and place)
             preview_id: Preview ID from preview response (required for place order)
 
         Returns:
-            XML string payload
+            bytes payload in ORDER_PAYLOAD_FORMAT (XML or JSON)
+
+        Raises:
+            OrderValidationError: Invalid order (symbol, quantity, price precision, ...)
         """
         # Generate clientOrderId if not provided
         if not client_order_id:
-            client_order_id = str(random.randint(1000000000, 9999999999))
-
-        # Determine price type and prices
-        price_type = order_data.get('priceType', 'MARKET')
-        limit_price = order_data.get('limitPrice', '')
-        stop_price = order_data.get('stopPrice', '')
-        stop_limit_price = order_data.get('stopLimitPrice', '')
-
-        if price_type == 'MARKET':
-            limit_price = ''
-            stop_price = ''
-
-        order_term = order_data.get('orderTerm', 'GOOD_FOR_DAY')
-
-        # For sandbox, limit orders need a dummy limit price
-        if price_type in ['LIMIT', 'STOP_LIMIT'] and not limit_price:
-            limit_price = '100.00'  # Will be replaced by actual price in preview
-
-        request_type = 'PreviewOrderRequest' if preview else 'PlaceOrderRequest'
-
-        # Build PreviewIds element for place order
-        # CRITICAL: E*TRADE requires <PreviewIds> wrapper (capital P, capital I, plural)
-        if preview_id:
-            preview_id_element = f'<PreviewIds><previewId>{preview_id}</previewId></PreviewIds>\n    '
-            logger.info(f"DEBUG: Using PreviewIds wrapper format for preview_id={preview_id}")
-        else:
-            preview_id_element = ''
-
-        # Build price elements conditionally - only include when needed
-        # E*TRADE rejects empty elements like <stopPrice></stopPrice>
-        if price_type == 'STOP_LIMIT' and stop_price:
-            stop_price_element = f'<stopPrice>{stop_price}</stopPrice>\n        '
-            logger.info(f"DEBUG: Including stopPrice={stop_price} for STOP_LIMIT order")
-        elif price_type == 'TRAILING_STOP_CNST' and stop_price:
-            # For trailing stop, stopPrice is the trail amount
-            stop_price_element = f'<stopPrice>{stop_price}</stopPrice>\n        '
-            logger.info(f"DEBUG: Including stopPrice={stop_price} for TRAILING_STOP_CNST order")
-        else:
-            stop_price_element = ''
-
-        # stopLimitPrice for trailing stop limit orders
-        if price_type == 'TRAILING_STOP_CNST' and stop_limit_price:
-            stop_limit_price_element = f'<stopLimitPrice>{stop_limit_price}</stopLimitPrice>\n        '
-            logger.info(f"DEBUG: Including stopLimitPrice={stop_limit_price} for TRAILING_STOP_CNST order")
-        else:
-            stop_limit_price_element = ''
-
-        if price_type in ['LIMIT', 'STOP_LIMIT'] and limit_price:
-            limit_price_element = f'<limitPrice>{limit_price}</limitPrice>\n        '
-        else:
-            limit_price_element = ''
-
-        payload = f"""<?xml version="1.0" encoding="UTF-8"?>
-<{request_type}>
-    {preview_id_element}<orderType>EQ</orderType>
-    <clientOrderId>{client_order_id}</clientOrderId>
-    <Order>
-        <allOrNone>false</allOrNone>
-        <priceType>{price_type}</priceType>
-        <orderTerm>{order_term}</orderTerm>
-        <marketSession>REGULAR</marketSession>
-        {stop_price_element}{stop_limit_price_element}{limit_price_element}<Instrument>
-            <Product>
-                <securityType>EQ</securityType>
-                <symbol>{order_data.get('symbol', '').upper()}</symbol>
-            </Product>
-            <orderAction>{order_data.get('orderAction', 'BUY')}</orderAction>
-            <quantityType>QUANTITY</quantityType>
-            <quantity>{order_data.get('quantity', 1)}</quantity>
-        </Instrument>
-    </Order>
-</{request_type}>"""
-
-        return payload
-
-    def get_orders(self, account_id_key, status='OPEN'):
+            client_order_id = get_order_journal().client_order_id(None)
+        return encode_order(order_data, 'preview' if preview else 'place',
+                            client_order_id, preview_id, ORDER_PAYLOAD_FORMAT)
+
+    def get_orders(self, account_id_key, status='OPEN', from_date=None, to_date=None,
+                   symbol=None, count=None, marker=None, incremental=False, order_ids=None,
+                   as_model=False):
         """
         Get orders for an account
 
+        Follows E*TRADE's marker pagination and returns every matching order,
+        unless an explicit marker is passed (then only that page is returned).
+
         Args:
             account_id_key: Account ID key
             status: Order status (OPEN, EXECUTED, CANCELLED, etc.) or None for all orders
+            from_date: Earliest order date (date/datetime or MMDDYYYY string)
+            to_date: Latest order date (date/datetime or MMDDYYYY string)
+            symbol: Only orders for this symbol
+            count: Page size (E*TRADE default 25, max 100)
+            marker: Pagination marker from a previous page
+            incremental: Use the shared OrderBook instead of a full download:
+                         fetches OPEN orders, resolves orders that left OPEN
+                         once, and serves terminal orders from cache.
+                         Always returns Order models.
+            order_ids: (incremental only) order IDs the caller is waiting on
+            as_model: Return Order models instead of raw dicts
 
         Returns:
-            list of orders
+            list of orders (or Orders)
+        """
+        if incremental:
+            return get_order_book().sync(self, account_id_key, order_ids=order_ids, symbol=symbol)
+
+        if marker is not None:
+            orders, _ = self.get_orders_page(account_id_key, status, from_date, to_date,
+                                             symbol, count, marker)
+            return [Order.from_api(o) for o in orders] if as_model else orders
+
+        orders = []
+        page_marker = None
+        while True:
+            page, page_marker = self.get_orders_page(account_id_key, status, from_date, to_date,
+                                                     symbol, count or self.ORDERS_PAGE_SIZE, page_marker)
+            orders.extend(page)
+            if not page_marker:
+                break
+
+        if as_model:
+            return [Order.from_api(o) for o in orders]
+        return orders
+
+    def get_orders_page(self, account_id_key, status=None, from_date=None, to_date=None,
+                        symbol=None, count=None, marker=None):
+        """
+        Get one page of orders
+
+        Returns:
+            (orders, next_marker) - next_marker is None on the last page
         """
         params = {}
         if status:
             params['status'] = status
+        if from_date:
+            params['fromDate'] = self._format_order_date(from_date)
+        if to_date:
+            params['toDate'] = self._format_order_date(to_date)
+        if symbol:
+            params['symbol'] = symbol.upper()
+        if count:
+            params['count'] = min(int(count), self.ORDERS_PAGE_SIZE)
+        if marker:
+            params['marker'] = marker
+
         response = self._make_request(
             'GET',
             f'/v1/accounts/{account_id_key}/orders.json',
@@ -708,11 +963,78 @@ class ETradeClient:
         )
 
         orders = []
+        next_marker = None
         if 'OrdersResponse' in response:
             if 'Order' in response['OrdersResponse']:
                 orders = response['OrdersResponse']['Order']
+                # A page with one order carries it as an object, not a list
+                if isinstance(orders, dict):
+                    orders = [orders]
+            next_marker = response['OrdersResponse'].get('marker') or None
 
-        return orders
+        return orders, next_marker
+
+    def get_order_fills(self, account_id_key, status=None, from_date=None, to_date=None,
+                        symbol=None, order_ids=None, hedge=False):
+        """
+        Get fill status of orders without materializing full order objects
+
+        Same filters and pagination as get_orders, but each page is
+        stream-parsed (see order_stream.py) and only the fill-relevant
+        fields of the requested orders are kept.
+
+        Args:
+            account_id_key: Account ID key
+            status: Order status filter or None for all orders
+            from_date: Earliest order date (date/datetime or MMDDYYYY string)
+            to_date: Latest order date (date/datetime or MMDDYYYY string)
+            symbol: Only orders for this symbol
+            order_ids: Only return these order IDs (None = every order)
+            hedge: Hedge each page request (see _make_request)
+
+        Returns:
+            list of OrderFill
+        """
+        params = {'count': self.ORDERS_PAGE_SIZE}
+        if status:
+            params['status'] = status
+        if from_date:
+            params['fromDate'] = self._format_order_date(from_date)
+        if to_date:
+            params['toDate'] = self._format_order_date(to_date)
+        if symbol:
+            params['symbol'] = symbol.upper()
+
+        fills = []
+        while True:
+            response = self._make_request(
+                'GET',
+                f'/v1/accounts/{account_id_key}/orders.json',
+                params=params,
+                stream=True,
+                hedge=hedge
+            )
+            parser = OrdersStreamParser(order_ids)
+            try:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    parser.feed(chunk)
+            finally:
+                response.close()
+            page, next_marker = parser.close()
+            fills.extend(page)
+
+            if not next_marker:
+                break
+            params['marker'] = next_marker
+
+        return fills
+
+    @staticmethod
+    def _format_order_date(value):
+        """E*TRADE order list dates are MMDDYYYY"""
+        if isinstance(value, str):
+            return value
+        return value.strftime('%m%d%Y')
 
     def cancel_order(self, account_id_key, order_id):
         """
@@ -725,13 +1047,10 @@ class ETradeClient:
         Returns:
             dict with cancellation result
         """
-        payload = f"""<?xml version="1.0" encoding="UTF-8"?>
-<CancelOrderRequest>
-    <orderId>{order_id}</orderId>
-</CancelOrderRequest>"""
+        payload = encode_cancel(order_id, ORDER_PAYLOAD_FORMAT)
 
         headers = {
-            'Content-Type': 'application/xml',
+            'Content-Type': CONTENT_TYPES[ORDER_PAYLOAD_FORMAT],
             'consumerkey': self.consumer_key
         }
 
@@ -743,6 +1062,7 @@ class ETradeClient:
         )
 
         if 'CancelOrderResponse' in response:
+            _account_changed(account_id_key)
             return {
                 'order_id': response['CancelOrderResponse'].get('orderId'),
                 'message': 'Order cancelled successfully'
@@ -0,0 +1,296 @@
+"""
+Compact Response Models for E*TRADE API Data
+
+The E*TRADE JSON responses are deeply nested (quote['All'], order
+['OrderDetail'][..]['Instrument'][..], 'Orders' wrappers, ...). Walking
+them by hand in every endpoint and monitor loop meant repeated lookups on
+every tick and several slightly different fill-price extractions.
+
+Each model here is an immutable namedtuple built in a single pass by
+from_api(). Code that needs the data reads attributes; code that needs
+JSON calls to_dict(), whose keys match what the UI and SSE events expect.
+
+    Quote     - QuoteData entry (All or Intraday section)
+    Order     - Order with its OrderDetail flattened and legs as OrderLeg
+    OrderLeg  - one Instrument of an order
+    Position  - portfolio Position
+    Balance   - BalanceResponse (Computed section)
+"""
+from collections import namedtuple
+from datetime import datetime
+from operator import itemgetter
+from zoneinfo import ZoneInfo
+
+# E*TRADE dates (order list fromDate/toDate, placed/executed days) are US/Eastern
+MARKET_TZ = ZoneInfo('America/New_York')
+
+
+def market_now():
+    """Current time in E*TRADE's timezone (use for fromDate / toDate windows)."""
+    return datetime.now(MARKET_TZ)
+
+
+def _float(value):
+    """Float or None (E*TRADE sends numbers, numeric strings or nothing)."""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _int(value):
+    if value is None or value == '':
+        return 0
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+# ==================== QUOTES ====================
+
+# E*TRADE quote detailFlag values the client requests. ALL (the default) is
+# the full quote; INTRADAY is last trade, bid/ask, change, volume, high/low.
+QUOTE_DETAIL_ALL = 'ALL'
+QUOTE_DETAIL_INTRADAY = 'INTRADAY'
+QUOTE_DETAILS = (QUOTE_DETAIL_ALL, QUOTE_DETAIL_INTRADAY)
+
+# Section keys in Quote field order (after symbol). E*TRADE sends every key,
+# so one itemgetter call reads them all; .get is the fallback.
+_ALL_KEYS = ('lastTrade', 'bid', 'ask', 'bidSize', 'askSize', 'changeClose',
+             'changeClosePercentage', 'totalVolume', 'high', 'low', 'open', 'previousClose')
+_INTRADAY_KEYS = ('lastTrade', 'bid', 'ask', 'changeClose', 'changeClosePercentage',
+                  'totalVolume', 'high', 'low')
+_get_all = itemgetter(*_ALL_KEYS)
+_get_intraday = itemgetter(*_INTRADAY_KEYS)
+_new_tuple = tuple.__new__
+
+
+class Quote(namedtuple('Quote', [
+        'symbol', 'last_price', 'bid', 'ask', 'bid_size', 'ask_size',
+        'change', 'change_percent', 'volume', 'high', 'low', 'open', 'previous_close'])):
+    """Quote fields the UI and monitors use."""
+    __slots__ = ()
+
+    @classmethod
+    def from_api(cls, data, symbol=None):
+        """
+        Build from a QuoteData entry.
+
+        An Intraday section (detailFlag=INTRADAY) has no sizes, open or
+        previous close; those are None.
+
+        Args:
+            data: QuoteData dict from /v1/market/quote
+            symbol: Requested symbol (used if the response has no Product)
+        """
+        data = data or {}
+        product = data.get('Product')
+        symbol = (product and product.get('symbol')) or (symbol.upper() if symbol else None)
+        quote = data.get('All')
+        if quote is None:
+            quote = data.get('Intraday') or {}
+            try:
+                last, bid, ask, change, change_pct, volume, high, low = _get_intraday(quote)
+            except KeyError:
+                last, bid, ask, change, change_pct, volume, high, low = map(quote.get, _INTRADAY_KEYS)
+            return _new_tuple(cls, (symbol, last, bid, ask, None, None, change, change_pct,
+                                    volume, high, low, None, None))
+        try:
+            values = _get_all(quote)
+        except KeyError:
+            values = tuple(map(quote.get, _ALL_KEYS))
+        return _new_tuple(cls, (symbol,) + values)
+
+    @property
+    def price(self):
+        """Last trade, falling back to the bid (0/None means no price)."""
+        return _float(self.last_price) or _float(self.bid)
+
+    def to_dict(self):
+        # A dict display beats _asdict()'s zip on the /api/quote path
+        (symbol, last_price, bid, ask, bid_size, ask_size, change, change_percent,
+         volume, high, low, open_, previous_close) = self
+        return {'symbol': symbol, 'last_price': last_price, 'bid': bid, 'ask': ask,
+                'bid_size': bid_size, 'ask_size': ask_size, 'change': change,
+                'change_percent': change_percent, 'volume': volume, 'high': high, 'low': low,
+                'open': open_, 'previous_close': previous_close}
+
+
+# ==================== ORDERS ====================
+
+class OrderLeg(namedtuple('OrderLeg', [
+        'symbol', 'security_type', 'action', 'ordered_quantity',
+        'filled_quantity', 'average_execution_price'])):
+    """One Instrument of an order."""
+    __slots__ = ()
+
+    @classmethod
+    def from_api(cls, inst):
+        product = inst.get('Product') or {}
+        symbol = product.get('symbol')
+        # executedPrice is the fallback E*TRADE uses on some order types
+        price = inst.get('averageExecutionPrice') or inst.get('executedPrice')
+        return cls(
+            symbol.upper() if symbol else None,
+            product.get('securityType'),
+            inst.get('orderAction'),
+            _int(inst.get('orderedQuantity')),
+            _int(inst.get('filledQuantity')),
+            _float(price)
+        )
+
+    @property
+    def is_filled(self):
+        """True when FULLY filled (partial fills don't count)."""
+        return self.filled_quantity > 0 and self.filled_quantity >= self.ordered_quantity
+
+
+class Order(namedtuple('Order', [
+        'order_id', 'order_type', 'status', 'price_type', 'limit_price', 'stop_price',
+        'order_term', 'executed_price', 'placed_time', 'executed_time', 'legs'])):
+    """An order with OrderDetail flattened (first detail) and all legs."""
+    __slots__ = ()
+
+    @classmethod
+    def from_api(cls, order):
+        """Build from an Order dict (with or without the 'Orders' wrapper)."""
+        if 'Orders' in order:
+            order = order['Orders']
+        details = order.get('OrderDetail') or [{}]
+        detail = details[0]
+        legs = tuple(OrderLeg.from_api(inst)
+                     for d in details for inst in (d.get('Instrument') or []))
+        return cls(
+            order.get('orderId'),
+            order.get('orderType'),
+            detail.get('status') or order.get('status'),
+            detail.get('priceType'),
+            detail.get('limitPrice'),
+            detail.get('stopPrice'),
+            detail.get('orderTerm'),
+            _float(detail.get('executedPrice')),
+            detail.get('placedTime'),
+            detail.get('executedTime'),
+            legs
+        )
+
+    @classmethod
+    def from_fill(cls, fill):
+        """Build from an order_stream.OrderFill (fill fields only)."""
+        leg = OrderLeg(fill.symbol, None, None, fill.ordered_quantity,
+                       fill.filled_quantity, fill.average_execution_price)
+        return cls(fill.order_id, None, fill.status, None, None, None,
+                   None, None, None, fill.executed_time, (leg,))
+
+    @property
+    def symbol(self):
+        return self.legs[0].symbol if self.legs else None
+
+    @property
+    def action(self):
+        return self.legs[0].action if self.legs else None
+
+    @property
+    def quantity(self):
+        return self.legs[0].ordered_quantity if self.legs else None
+
+    @property
+    def is_filled(self):
+        """True when any leg is FULLY filled."""
+        return any(leg.is_filled for leg in self.legs)
+
+    @property
+    def fill_price(self):
+        """
+        Execution price of a filled order, or None.
+
+        averageExecutionPrice (or executedPrice) of the first fully filled
+        leg, else the OrderDetail executedPrice.
+        """
+        for leg in self.legs:
+            if leg.is_filled and leg.average_execution_price:
+                return leg.average_execution_price
+        return self.executed_price
+
+    def to_dict(self):
+        """Summary shape used by GET /api/orders/<account>."""
+        return {
+            'order_id': self.order_id,
+            'order_type': self.order_type,
+            'status': self.status,
+            'symbol': self.symbol,
+            'action': self.action,
+            'quantity': self.quantity,
+            'price_type': self.price_type,
+            'limit_price': self.limit_price
+        }
+
+
+def find_order(orders, order_id):
+    """Find an Order model by id in a list, or None."""
+    order_id = str(order_id)
+    for order in orders:
+        if str(order.order_id) == order_id:
+            return order
+    return None
+
+
+# ==================== ACCOUNTS ====================
+
+class Position(namedtuple('Position', [
+        'symbol', 'description', 'quantity', 'position_type', 'cost_per_share',
+        'total_cost', 'market_value', 'total_gain', 'last_price'])):
+    """Portfolio position."""
+    __slots__ = ()
+
+    @classmethod
+    def from_api(cls, pos):
+        product = pos.get('Product') or {}
+        return cls(
+            product.get('symbol') or pos.get('symbolDescription'),
+            pos.get('symbolDescription'),
+            pos.get('quantity'),
+            pos.get('positionType'),
+            pos.get('costPerShare'),
+            pos.get('totalCost'),
+            pos.get('marketValue'),
+            pos.get('totalGain'),
+            (pos.get('Quick') or {}).get('lastTrade')
+        )
+
+    def to_dict(self):
+        """Shape used by GET /api/accounts/<key>/portfolio."""
+        return {
+            'symbol': self.description,
+            'quantity': self.quantity,
+            'cost_per_share': self.cost_per_share,
+            'total_cost': self.total_cost,
+            'market_value': self.market_value,
+            'total_gain': self.total_gain,
+            'last_price': self.last_price
+        }
+
+
+class Balance(namedtuple('Balance', [
+        'account_id', 'description', 'net_account_value',
+        'cash_available', 'margin_buying_power'])):
+    """Account balance summary."""
+    __slots__ = ()
+
+    @classmethod
+    def from_api(cls, balance):
+        computed = balance.get('Computed') or {}
+        real_time = computed.get('RealTimeValues') or {}
+        return cls(
+            balance.get('accountId'),
+            balance.get('accountDescription'),
+            real_time.get('totalAccountValue'),
+            computed.get('cashBuyingPower'),
+            computed.get('marginBuyingPower')
+        )
+
+    def to_dict(self):
+        return self._asdict()
@@ -0,0 +1,105 @@
+"""
+Concurrent Fan-out for API Requests
+
+A page that needs several independent E*TRADE reads (balance, portfolio,
+orders, quotes) used to make them one after another, so it waited for the
+sum of their latencies. fan_out() runs them on a small pool of threads
+(greenlets under gevent) and waits for the slowest:
+
+    results = fan_out({
+        'balance': lambda: cache.balance(client, account_id_key),
+        'orders': lambda: client.get_orders(account_id_key, as_model=True),
+    })
+    results['balance'].value, results['orders'].error, results['orders'].ms
+
+Each part runs in a copy of the caller's context, so it keeps the request's
+deadline (request_policy) and records its calls into the request's
+Server-Timing. A failing part does not fail the others: its exception is
+returned in .error. That includes BaseExceptions such as a killed
+greenlet's GreenletExit (re-raised in the worker once its result is
+posted), and the caller never waits past the request's deadline plus
+DEADLINE_GRACE for a part that is still running - that part's error is
+DeadlineExceeded.
+"""
+import contextvars
+import logging
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from config import FANOUT_WORKERS
+import request_policy
+from request_policy import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+# Seconds past the deadline to wait for a part's in-flight call to give up
+DEADLINE_GRACE = 1.0
+
+
+class PartResult(namedtuple('PartResult', ['value', 'error', 'ms'])):
+    """Outcome of one fanned-out call (error is None on success)."""
+    __slots__ = ()
+
+
+def fan_out(tasks, workers=FANOUT_WORKERS):
+    """
+    Run zero-argument callables concurrently.
+
+    Args:
+        tasks: {name: callable}
+        workers: Most calls in flight at once
+
+    Returns:
+        {name: PartResult}, in the order of tasks
+    """
+    started = time.perf_counter()
+    pending = queue.Queue()
+    for name, fn in tasks.items():
+        pending.put((name, fn))
+    done = queue.Queue()
+
+    def work():
+        while True:
+            try:
+                name, fn = pending.get_nowait()
+            except queue.Empty:
+                return
+            start = time.perf_counter()
+            try:
+                value = fn()
+            except BaseException as e:
+                # Always post a result, or the caller would wait forever
+                logger.warning(f"Fan-out part {name} failed: {e!r}")
+                done.put((name, PartResult(None, e, _ms(start))))
+                if not isinstance(e, Exception):
+                    raise
+                continue
+            done.put((name, PartResult(value, None, _ms(start))))
+
+    count = min(max(int(workers), 1), len(tasks))
+    for _ in range(count - 1):
+        # Copied per thread: one Context can't be entered by two threads at once
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(work,), daemon=True).start()
+    if count:
+        work()  # the caller is one of the workers
+
+    results = {}
+    while len(results) < len(tasks):
+        left = request_policy.remaining()
+        try:
+            name, result = done.get(timeout=None if left is None else max(left + DEADLINE_GRACE, 0))
+        except queue.Empty:
+            break
+        results[name] = result
+    for name in tasks:
+        if name not in results:
+            logger.warning(f"Fan-out part {name} still running past the deadline")
+            results[name] = PartResult(None, DeadlineExceeded(f"Fan-out part {name} timed out"), _ms(started))
+    return {name: results[name] for name in tasks}
+
+
+def _ms(start):
+    return round((time.perf_counter() - start) * 1000, 1)
@@ -18,3 +18,14 @@ keepalive = 5
 accesslog = "-"
 errorlog = "-"
 loglevel = "info"
+
+
+def post_worker_init(worker):
+    """Start the monitor watchdog in the worker that serves the app.
+
+    Not on import of server.py (tests, scripts and benchmarks import it), and
+    not in post_fork: the gevent worker patches threading only after that
+    hook, and the watchdog's thread must be a greenlet like the monitors'.
+    """
+    from monitor_watchdog import get_monitor_watchdog
+    get_monitor_watchdog().start()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+SSE Fan-Out Load Test
+
+Opens many concurrent /api/events connections against a running server,
+asks the server to emit synthetic 'loadtest' events at a fixed rate
+(POST /api/debug/sse-load), and measures:
+
+    - delivery latency (server emit -> client receive) p50/p95/p99/max
+    - events delivered vs expected per client (dropped events)
+    - clients that failed to connect, were disconnected or evicted
+    - server RSS, CPU and SSE queue depth over time (GET /api/debug/sse-stats)
+
+Latency uses the server's wall clock stamped into each event, so run the
+tool on the same host as the server (or on hosts with synced clocks).
+
+Usage:
+    python loadtest_sse.py --url http://localhost:5001 --clients 200 --rate 20 --duration 30
+    python loadtest_sse.py --url https://host --auth user:pass --admin-token TOKEN --clients 1000
+"""
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+
+import requests
+
+
+class SSEClient(threading.Thread):
+    """One /api/events connection that records loadtest event latencies."""
+
+    def __init__(self, index, url, session_kwargs, stop_event, connect_timeout):
+        super().__init__(daemon=True, name=f"sse-client-{index}")
+        self.index = index
+        self.url = url
+        self.session_kwargs = session_kwargs
+        self.stop_event = stop_event
+        self.connect_timeout = connect_timeout
+        self.connected = threading.Event()
+        self.latencies = []
+        self.seqs = set()
+        self.connect_error = None
+        self.disconnected = False
+        self.keepalives = 0
+
+    def run(self):
+        try:
+            resp = requests.get(
+                f"{self.url}/api/events",
+                stream=True,
+                timeout=(self.connect_timeout, 60),
+                **self.session_kwargs
+            )
+            if resp.status_code != 200:
+                self.connect_error = f"HTTP {resp.status_code}"
+                return
+        except requests.RequestException as e:
+            self.connect_error = type(e).__name__
+            return
+
+        self.connected.set()
+        try:
+            for line in resp.iter_lines(chunk_size=1, decode_unicode=True):
+                if self.stop_event.is_set():
+                    break
+                if not line:
+                    continue
+                if line.startswith(':'):
+                    self.keepalives += 1
+                    continue
+                if not line.startswith('data: '):
+                    continue
+                received = time.time()
+                try:
+                    event = json.loads(line[6:])
+                except ValueError:
+                    continue
+                if event.get('type') != 'loadtest':
+                    continue
+                self.latencies.append(received - event['sent_at'])
+                self.seqs.add(event['seq'])
+        except requests.RequestException:
+            if not self.stop_event.is_set():
+                self.disconnected = True
+        finally:
+            resp.close()
+
+
+class StatsSampler(threading.Thread):
+    """Polls /api/debug/sse-stats once per interval."""
+
+    def __init__(self, url, session_kwargs, stop_event, interval=1.0):
+        super().__init__(daemon=True, name='sse-stats-sampler')
+        self.url = url
+        self.session_kwargs = session_kwargs
+        self.stop_event = stop_event
+        self.interval = interval
+        self.samples = []
+        self.errors = 0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                resp = requests.get(f"{self.url}/api/debug/sse-stats", timeout=5, **self.session_kwargs)
+                if resp.status_code == 200:
+                    self.samples.append(resp.json())
+                else:
+                    self.errors += 1
+            except requests.RequestException:
+                self.errors += 1
+            self.stop_event.wait(self.interval)
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.1f} ms" if seconds is not None else '-'
+
+
+def _mb(num_bytes):
+    return f"{num_bytes / (1024 * 1024):.1f} MB" if num_bytes is not None else '-'
+
+
+def _cpu_percent(samples):
+    """Average server CPU% between the first and last stats samples."""
+    if len(samples) < 2:
+        return None
+    first, last = samples[0], samples[-1]
+    wall = last['timestamp'] - first['timestamp']
+    if wall <= 0:
+        return None
+    cpu = ((last['process']['cpu_user_seconds'] + last['process']['cpu_system_seconds'])
+           - (first['process']['cpu_user_seconds'] + first['process']['cpu_system_seconds']))
+    return cpu / wall * 100
+
+
+def report(clients, sampler, args, emitted_from, emitted_to):
+    connected = [c for c in clients if c.connected.is_set()]
+    failed = [c for c in clients if c.connect_error]
+    disconnected = [c for c in connected if c.disconnected]
+    latencies = [lat for c in connected for lat in c.latencies]
+
+    expected_per_client = emitted_to - emitted_from
+    delivered = sum(len(c.seqs) for c in connected)
+    expected = expected_per_client * len(connected)
+
+    print()
+    print("=" * 70)
+    print("SSE FAN-OUT LOAD TEST")
+    print(f"url={args.url} clients={args.clients} rate={args.rate}/s "
+          f"duration={args.duration}s payload={args.payload_bytes}B")
+    print("=" * 70)
+    print(f"Connected:        {len(connected)}/{len(clients)}")
+    if failed:
+        reasons = {}
+        for c in failed:
+            reasons[c.connect_error] = reasons.get(c.connect_error, 0) + 1
+        print(f"Connect failures: {len(failed)} {reasons}")
+    print(f"Disconnected:     {len(disconnected)} (mid-test)")
+    print(f"Events emitted:   {expected_per_client} (server counter)")
+    print(f"Delivered:        {delivered}/{expected} "
+          f"({(delivered / expected * 100) if expected else 0:.1f}%)")
+    print(f"Dropped:          {max(expected - delivered, 0)}")
+    print()
+    print("Delivery latency (emit -> client):")
+    print(f"  p50 {_ms(_percentile(latencies, 50))}   p95 {_ms(_percentile(latencies, 95))}   "
+          f"p99 {_ms(_percentile(latencies, 99))}   max {_ms(max(latencies) if latencies else None)}")
+    if latencies:
+        print(f"  mean {_ms(statistics.fmean(latencies))} over {len(latencies)} deliveries")
+
+    samples = sampler.samples
+    if samples:
+        rss = [s['process']['rss_bytes'] for s in samples if s['process'].get('rss_bytes')]
+        depth = [s['sse']['queue_depth_max'] for s in samples]
+        last = samples[-1]
+        cpu = _cpu_percent(samples)
+        print()
+        print("Server:")
+        print(f"  RSS start {_mb(rss[0] if rss else None)}  peak {_mb(max(rss) if rss else None)}  "
+              f"end {_mb(rss[-1] if rss else None)}")
+        print(f"  CPU avg {cpu:.1f}%" if cpu is not None else "  CPU avg -")
+        print(f"  SSE clients (server view) peak {max(s['sse']['clients'] for s in samples)}")
+        print(f"  Max per-client queue depth {max(depth)}  (maxsize {last['sse']['queue_maxsize'] or 'unbounded'})")
+        print(f"  Evicted clients {last['sse']['evicted'] - samples[0]['sse']['evicted']}")
+    if sampler.errors:
+        print(f"  ({sampler.errors} stats requests failed)")
+    print("=" * 70)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SSE fan-out load test')
+    parser.add_argument('--url', default='http://localhost:5001', help='Server base URL')
+    parser.add_argument('--clients', type=int, default=100, help='Concurrent /api/events connections')
+    parser.add_argument('--rate', type=float, default=10, help='Synthetic events per second')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to emit events')
+    parser.add_argument('--payload-bytes', type=int, default=200, help='Filler bytes per event')
+    parser.add_argument('--ramp', type=float, default=5, help='Seconds to open all connections over')
+    parser.add_argument('--connect-timeout', type=float, default=10, help='Per-connection connect timeout')
+    parser.add_argument('--auth', help='Basic auth as user:pass')
+    parser.add_argument('--admin-token', help='X-Admin-Token for /api/debug endpoints')
+    args = parser.parse_args()
+
+    session_kwargs = {}
+    if args.auth:
+        user, _, password = args.auth.partition(':')
+        session_kwargs['auth'] = (user, password)
+    if args.admin_token:
+        session_kwargs['headers'] = {'X-Admin-Token': args.admin_token}
+
+    stop_event = threading.Event()
+    sampler = StatsSampler(args.url, session_kwargs, stop_event)
+    sampler.start()
+
+    print(f"Opening {args.clients} SSE connections over {args.ramp}s...", flush=True)
+    clients = []
+    for i in range(args.clients):
+        c = SSEClient(i, args.url, session_kwargs, stop_event, args.connect_timeout)
+        c.start()
+        clients.append(c)
+        if args.ramp:
+            time.sleep(args.ramp / args.clients)
+
+    # Give the stragglers a moment to finish connecting
+    deadline = time.time() + args.connect_timeout
+    while time.time() < deadline and not all(c.connected.is_set() or c.connect_error for c in clients):
+        time.sleep(0.1)
+    print(f"{sum(c.connected.is_set() for c in clients)} connected. Starting emitter...", flush=True)
+
+    def emitted_count():
+        if sampler.samples:
+            return sampler.samples[-1]['sse']['events_emitted']
+        return 0
+
+    emitted_before = emitted_count()
+    resp = requests.post(
+        f"{args.url}/api/debug/sse-load",
+        json={'rate': args.rate, 'duration': args.duration, 'payload_bytes': args.payload_bytes},
+        timeout=10,
+        **session_kwargs
+    )
+    if resp.status_code != 200:
+        print(f"Failed to start emitter: HTTP {resp.status_code} {resp.text[:200]}")
+        stop_event.set()
+        return 1
+
+    # Let the emitter run, then allow in-flight events to drain
+    time.sleep(args.duration + 3)
+    time.sleep(sampler.interval * 1.5)
+    emitted_after = emitted_count()
+    stop_event.set()
+
+    report(clients, sampler, args, emitted_before, emitted_after)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
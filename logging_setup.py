@@ -0,0 +1,184 @@
+"""
+Asynchronous Structured Logging
+
+Log records used to be formatted and written to stdout synchronously on
+whichever thread logged them - including the monitor threads placing exit
+orders. setup_logging() moves all of that off those threads:
+
+1. The root logger has a single QueueHandler: logging a record only
+   enqueues it (message formatting is deferred, see _DeferredQueueHandler)
+2. A QueueListener thread formats and writes records to stdout
+3. Records are JSON objects (or classic text lines with LOG_FORMAT=text),
+   carrying order_id / symbol / account_id_key when passed via extra=
+4. Chatty loggers can be sampled: LOG_SAMPLE="order_monitor.ticks=10"
+   keeps 1 in 10 INFO/DEBUG records from that logger (and its children).
+   WARNING and above are never sampled out.
+
+Configuration (environment):
+    LOG_LEVEL   - root level (default INFO)
+    LOG_FORMAT  - json (default) or text
+    LOG_SAMPLE  - comma separated logger=N pairs
+                  (default: order_monitor.ticks=10,order_monitor.quotes=10)
+
+Use %-style arguments on hot paths so disabled or sampled-out records cost
+almost nothing:
+    logger.info("Order %s filled at %s", order_id, price, extra={'order_id': order_id})
+"""
+import atexit
+import itertools
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+import codec
+
+DEFAULT_SAMPLE = 'order_monitor.ticks=10,order_monitor.quotes=10'
+
+# Structured fields copied from extra= into JSON records
+CONTEXT_FIELDS = ('order_id', 'symbol', 'account_id_key', 'strategy')
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, thread, msg + context fields."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage()
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return codec.dumps_str(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep 1 in N records below WARNING for configured logger prefixes.
+
+    Args:
+        rates: {logger_name: N}; applies to that logger and its children
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = dict(rates)
+        self._counters = {name: itertools.count() for name in self.rates}
+        self._resolved = {}  # record.name -> matching configured name (or None)
+
+    def _match(self, name):
+        if name not in self._resolved:
+            match = None
+            for prefix in self.rates:
+                if name == prefix or name.startswith(prefix + '.'):
+                    if match is None or len(prefix) > len(match):
+                        match = prefix
+            self._resolved[name] = match
+        return self._resolved[name]
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        prefix = self._match(record.name)
+        if prefix is None:
+            return True
+        return next(self._counters[prefix]) % self.rates[prefix] == 0
+
+
+def parse_sample_spec(spec):
+    """'a.b=10,c=5' -> {'a.b': 10, 'c': 5} (invalid pairs are ignored)."""
+    rates = {}
+    for pair in (spec or '').split(','):
+        name, _, n = pair.strip().partition('=')
+        try:
+            n = int(n)
+        except ValueError:
+            continue
+        if name and n > 1:
+            rates[name] = n
+    return rates
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves message formatting to the listener thread.
+
+    The stock prepare() merges msg % args on the calling thread. Here only
+    the traceback is rendered up front (traceback objects must not cross
+    threads); msg/args are formatted by the listener. Pass immutable values
+    (ids, prices, strings) as arguments - they are read later.
+    """
+
+    def prepare(self, record):
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(level=None, fmt=None, sample=None, stream=None):
+    """
+    Install the queue-based logging pipeline on the root logger (idempotent).
+
+    Args:
+        level: Root level name (default LOG_LEVEL or INFO)
+        fmt: 'json' or 'text' (default LOG_FORMAT or json)
+        sample: Sampling spec (default LOG_SAMPLE or DEFAULT_SAMPLE)
+        stream: Output stream (default stdout)
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+
+        level = level or os.environ.get('LOG_LEVEL', 'INFO')
+        fmt = fmt or os.environ.get('LOG_FORMAT', 'json')
+        sample = sample if sample is not None else os.environ.get('LOG_SAMPLE', DEFAULT_SAMPLE)
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(JSONFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+
+        log_queue = queue.SimpleQueue()
+        handler = _DeferredQueueHandler(log_queue)
+        rates = parse_sample_spec(sample)
+        if rates:
+            # Filter before enqueueing so sampled-out records cost nothing downstream
+            handler.addFilter(SamplingFilter(rates))
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(level.upper() if isinstance(level, str) else level)
+
+        _listener = QueueListener(log_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _listener
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
@@ -0,0 +1,266 @@
+"""
+Prometheus-Style Metrics
+
+In-process counters, gauges and histograms exposed in the Prometheus text
+format at GET /metrics. There is no client library dependency: the
+instruments only need to be cheap to update from the request and monitor
+hot paths, and the text format is simple to render at scrape time.
+
+Recording is the only work done on the hot path:
+
+- Labels are passed as a positional tuple (no kwargs, no dict building)
+- Histogram.observe() is one bisect over fixed bucket bounds plus two
+  list increments; Counter.inc() is one list increment
+- Cumulative buckets, label escaping and formatting happen in render()
+
+Updates take no lock (an uncontended acquire/release costs more than the
+update itself). Under the gevent worker monitor threads are greenlets and
+never interleave inside an update; with real threads the GIL makes a lost
+increment possible only when two threads hit the same series in the same
+instant, which is acceptable for monitoring data. New series are created
+with dict.setdefault, so no series is ever lost.
+
+Gauges for state that already lives elsewhere (monitors, SSE clients,
+token cache) are read by callbacks at scrape time, so nothing is updated
+per event at all.
+
+    from metrics import ETRADE_REQUEST_SECONDS
+    ETRADE_REQUEST_SECONDS.observe(0.182, ('GET', '/v1/market/quote/{symbols}.json', '200'))
+"""
+import re
+import threading
+from bisect import bisect_left
+from functools import lru_cache
+
+# Upstream latency buckets (seconds): E*TRADE calls take ~100ms-2s
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.2, 0.35, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0)
+# Fill detection / exit buckets (seconds): bounded by the 2s poll interval
+LAG_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _num(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter per label tuple."""
+
+    kind = 'counter'
+
+    def __init__(self, name, doc, labelnames=()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # labels -> [value]
+
+    def inc(self, labels=(), amount=1):
+        cell = self._values.get(labels)
+        if cell is None:
+            cell = self._values.setdefault(labels, [0])
+        cell[0] += amount
+
+    def value(self, labels=()):
+        cell = self._values.get(labels)
+        return cell[0] if cell else 0
+
+    def samples(self):
+        return [(self.name, labels, cell[0]) for labels, cell in list(self._values.items())]
+
+
+class Gauge:
+    """
+    Point-in-time value per label tuple.
+
+    Args:
+        fn: Optional callable returning {labels: value}, read at scrape
+            time instead of values set by set()
+    """
+
+    kind = 'gauge'
+
+    def __init__(self, name, doc, labelnames=(), fn=None):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+        self._values = {}
+
+    def set(self, value, labels=()):
+        self._values[labels] = value
+
+    def samples(self):
+        values = self.fn() if self.fn is not None else dict(self._values)
+        return [(self.name, labels, value) for labels, value in values.items()]
+
+
+class Histogram:
+    """Fixed-bucket histogram per label tuple (bucket counts, sum, count)."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, doc, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, labels=()):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def snapshot(self, labels=()):
+        """{'count', 'sum', 'buckets': {le: cumulative count}} for one series."""
+        series = list(self._series.get(labels) or [0] * (len(self.buckets) + 1) + [0.0])
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+            cumulative += count
+            buckets[bound] = cumulative
+        return {'count': cumulative, 'sum': series[-1], 'buckets': buckets}
+
+    def samples(self):
+        items = [(labels, list(series)) for labels, series in list(self._series.items())]
+        result = []
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                result.append((self.name + '_bucket', labels, cumulative, f'le="{_num(bound)}"'))
+            result.append((self.name + '_sum', labels, series[-1]))
+            result.append((self.name + '_count', labels, cumulative))
+        return result
+
+
+class MetricsRegistry:
+    """Ordered collection of instruments rendered together by GET /metrics."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, doc, labelnames=()):
+        return self._register(Counter(name, doc, labelnames))
+
+    def gauge(self, name, doc, labelnames=(), fn=None):
+        gauge = self._register(Gauge(name, doc, labelnames, fn))
+        if fn is not None:
+            gauge.fn = fn
+        return gauge
+
+    def histogram(self, name, doc, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, doc, labelnames, buckets))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.samples()
+            except Exception as e:
+                lines.append(f'# {metric.name} collection failed: {_escape(e)}')
+                continue
+            lines.append(f'# HELP {metric.name} {metric.doc}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for sample in samples:
+                name, labels, value = sample[:3]
+                extra = sample[3] if len(sample) > 3 else None
+                lines.append(f'{name}{_labels(metric.labelnames, labels, extra)} {_num(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+# Singleton instance
+_metrics = None
+
+
+def get_metrics():
+    """Get or create the singleton MetricsRegistry instance."""
+    global _metrics
+    if _metrics is None:
+        _metrics = MetricsRegistry()
+    return _metrics
+
+
+# ==================== Endpoint labels ====================
+
+_ACCOUNT_PATH = re.compile(r'^/v1/accounts/(?!list\.json)[^/]+')
+_QUOTE_PATH = re.compile(r'^/v1/market/quote/[^/]+?(\.json)?$')
+
+
+@lru_cache(maxsize=512)
+def endpoint_label(path):
+    """
+    Collapse per-account and per-symbol path segments so the endpoint
+    label has a handful of values:
+        /v1/accounts/abc123/orders/place.json -> /v1/accounts/{account}/orders/place.json
+        /v1/market/quote/AAPL,MSFT.json       -> /v1/market/quote/{symbols}.json
+    """
+    path = _ACCOUNT_PATH.sub('/v1/accounts/{account}', path)
+    return _QUOTE_PATH.sub(r'/v1/market/quote/{symbols}\1', path)
+
+
+# ==================== Application instruments ====================
+
+_registry = get_metrics()
+
+ETRADE_REQUEST_SECONDS = _registry.histogram(
+    'etrade_request_duration_seconds',
+    'E*TRADE API call latency by endpoint and HTTP status (status "error" = no response)',
+    ('method', 'endpoint', 'status'))
+
+ETRADE_REQUEST_RETRIES = _registry.counter(
+    'etrade_request_retries_total',
+    'E*TRADE API calls retried by the request policy, by failure reason',
+    ('method', 'endpoint', 'reason'))
+
+ETRADE_HEDGED_REQUESTS = _registry.counter(
+    'etrade_hedged_requests_total',
+    'Hedged reads: second requests fired, hedges that answered first (won), '
+    'and hedges skipped for lack of request budget (denied)',
+    ('endpoint', 'outcome'))
+
+FILL_DETECTION_SECONDS = _registry.histogram(
+    'order_fill_detection_lag_seconds',
+    'Time from the E*TRADE execution timestamp to the monitor detecting the fill',
+    ('strategy',), LAG_BUCKETS)
+
+EXIT_PLACEMENT_SECONDS = _registry.histogram(
+    'order_exit_latency_seconds',
+    'Time from the exit decision (fill for profit targets, trigger for stops) '
+    'to the exit order being accepted',
+    ('strategy',), LAG_BUCKETS)
+
+TOKEN_CACHE_LOOKUPS = _registry.counter(
+    'etrade_token_cache_lookups_total',
+    'OAuth token lookups served from the in-process cache (hit) or storage (miss)',
+    ('result',))
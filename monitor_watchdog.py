@@ -0,0 +1,187 @@
+"""
+Monitor Health Watchdog
+
+Every monitor loop stamps a heartbeat (flag['progress']) each iteration
+and declares its cadence (the poll interval). If a thread blocks - a hung
+upstream call, a deadlock - nothing in the loop itself can notice, and the
+position sits without its exit. The watchdog checks all heartbeats on its
+own thread:
+
+- lagging: no progress for WATCHDOG_LAG_FACTOR x cadence (slow upstream,
+  retries, CPU starvation)
+- stalled: no progress for WATCHDOG_STALL_SECONDS (longer than any
+  single upstream call may take, see ETRADE_READ_TIMEOUT)
+- scheduler lag: the watchdog's own sleep overshoots by more than
+  WATCHDOG_SCHEDULER_LAG_SECONDS - under gevent this means a greenlet is
+  hogging the CPU and every monitor is delayed
+
+Transitions emit 'monitor_health' SSE events and count in the
+order_monitor_alerts_total metric. With WATCHDOG_RESTART=true a stalled
+monitor is abandoned and restarted from its saved state (pending dicts /
+trailing stop manager); see OrderMonitor.restart_monitor.
+
+The watchdog is started in the serving process (gunicorn's
+post_worker_init hook, or server.py run directly), not on import.
+
+Configuration (environment, read in config.py):
+    WATCHDOG_INTERVAL               - seconds between checks (default 5)
+    WATCHDOG_LAG_FACTOR             - cadences before 'lagging' (default 5)
+    WATCHDOG_STALL_SECONDS          - seconds before 'stalled' (default 60)
+    WATCHDOG_SCHEDULER_LAG_SECONDS  - sleep overshoot alert (default 1)
+    WATCHDOG_RESTART                - restart stalled monitors (default false)
+"""
+import time
+import logging
+import threading
+
+from config import (
+    WATCHDOG_INTERVAL, WATCHDOG_LAG_FACTOR, WATCHDOG_STALL_SECONDS,
+    WATCHDOG_SCHEDULER_LAG_SECONDS, WATCHDOG_RESTART
+)
+from metrics import LAG_BUCKETS, get_metrics
+from order_monitor import get_order_monitor
+
+logger = logging.getLogger(__name__)
+
+_registry = get_metrics()
+MONITOR_ALERTS = _registry.counter(
+    'order_monitor_alerts_total',
+    'Watchdog alerts: lagging / stalled monitors, restarts, scheduler lag',
+    ('alert', 'type'))
+SCHEDULER_LAG_SECONDS = _registry.histogram(
+    'watchdog_scheduler_lag_seconds',
+    'How late the watchdog woke up relative to its interval',
+    (), LAG_BUCKETS)
+
+
+class MonitorWatchdog:
+    """Periodic heartbeat check over OrderMonitor's running monitors."""
+
+    def __init__(self, monitor, interval=WATCHDOG_INTERVAL, lag_factor=WATCHDOG_LAG_FACTOR,
+                 stall_seconds=WATCHDOG_STALL_SECONDS, restart=WATCHDOG_RESTART):
+        self.monitor = monitor
+        self.interval = interval
+        self.lag_factor = lag_factor
+        self.stall_seconds = stall_seconds
+        self.restart = restart
+        self._health = {}  # key -> 'ok' | 'lagging' | 'stalled'
+        self._thread = None
+        self._stop = False
+        self.scheduler_lag = 0.0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True, name='monitor-watchdog')
+        self._thread.start()
+        logger.info(f"[Watchdog] Started (interval {self.interval}s, stall {self.stall_seconds}s, "
+                    f"restart {'on' if self.restart else 'off'})")
+
+    def stop(self):
+        self._stop = True
+
+    def _run(self):
+        expected = time.monotonic() + self.interval
+        while not self._stop:
+            time.sleep(max(expected - time.monotonic(), 0))
+            now = time.monotonic()
+            self.scheduler_lag = max(now - expected, 0.0)
+            SCHEDULER_LAG_SECONDS.observe(self.scheduler_lag)
+            if self.scheduler_lag > WATCHDOG_SCHEDULER_LAG_SECONDS:
+                MONITOR_ALERTS.inc(('scheduler_lag', 'all'))
+                logger.warning("[Watchdog] Scheduler lag %.2fs (woke late; a thread is hogging the CPU?)",
+                               self.scheduler_lag)
+            try:
+                self.check(now)
+            except Exception as e:
+                logger.error(f"[Watchdog] Check failed: {e}")
+            expected = now + self.interval
+
+    def classify(self, flag, now):
+        """(health, seconds since the monitor's last heartbeat)."""
+        age = now - flag.get('progress', now)
+        if age >= self.stall_seconds:
+            return 'stalled', age
+        if age >= flag.get('cadence', 1) * self.lag_factor:
+            return 'lagging', age
+        return 'ok', age
+
+    def check(self, now=None):
+        """Classify every monitor and act on health transitions."""
+        now = time.monotonic() if now is None else now
+        flags = self.monitor.get_monitor_flags()
+        seen = set()
+        for key, flag in flags:
+            seen.add(key)
+            health, age = self.classify(flag, now)
+            previous = self._health.get(key, 'ok')
+            self._health[key] = health
+            if health == previous:
+                continue
+
+            monitor_type = flag.get('type', 'unknown')
+            if health != 'ok':
+                MONITOR_ALERTS.inc((health, monitor_type))
+                logger.warning("[Watchdog] %s monitor %s %s: no progress for %.1fs (state %s)",
+                               monitor_type, key, health, age, flag.get('state'),
+                               extra={'order_id': None if key.startswith('quote:') else key})
+            self._alert(key, flag, health, age)
+
+            if health == 'stalled' and self.restart:
+                restarted = self.monitor.restart_monitor(key)
+                if restarted:
+                    MONITOR_ALERTS.inc(('restarted', monitor_type))
+                    self._health.pop(key, None)
+                self._alert(key, flag, 'restarted' if restarted else 'restart_failed', age)
+
+        for key in list(self._health):
+            if key not in seen:
+                del self._health[key]
+
+    def _alert(self, key, flag, health, age):
+        self.monitor._emit({
+            'type': 'monitor_health',
+            'order_id': None if key.startswith('quote:') else key,
+            'monitor': key,
+            'monitor_type': flag.get('type'),
+            'state': flag.get('state'),
+            'health': health,
+            'seconds_since_progress': round(age, 1)
+        })
+
+    def snapshot(self):
+        """Health of every running monitor, for GET /api/debug/monitors."""
+        now = time.monotonic()
+        result = []
+        for key, flag in self.monitor.get_monitor_flags():
+            health, age = self.classify(flag, now)
+            result.append({
+                'monitor': key,
+                'type': flag.get('type'),
+                'state': flag.get('state'),
+                'cadence': flag.get('cadence'),
+                'seconds_since_progress': round(age, 1),
+                'health': health
+            })
+        return result
+
+    def health_counts(self):
+        """{(health,): count} over running monitors (for the metrics gauge)."""
+        counts = {('ok',): 0, ('lagging',): 0, ('stalled',): 0}
+        now = time.monotonic()
+        for _, flag in self.monitor.get_monitor_flags():
+            health, _ = self.classify(flag, now)
+            counts[(health,)] += 1
+        return counts
+
+
+# Singleton instance
+_watchdog = None
+
+
+def get_monitor_watchdog():
+    """Get or create the singleton MonitorWatchdog (watching the OrderMonitor singleton)."""
+    global _watchdog
+    if _watchdog is None:
+        _watchdog = MonitorWatchdog(get_order_monitor())
+    return _watchdog
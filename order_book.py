@@ -0,0 +1,209 @@
+"""
+Incremental Order Book for E*TRADE Fill Detection
+
+Monitors used to download every order of the day (get_orders(status=None))
+on every poll just to find one orderId. The order book instead keeps a
+per-account cache of orders indexed by orderId and refreshes it
+incrementally:
+
+1. Fetch only OPEN orders (small, and optionally filtered by symbol)
+2. Orders we last saw as non-terminal that dropped out of OPEN - and
+   watched orders we have never seen - are resolved with one date-bounded
+   fetch of recent orders
+3. Terminal orders (EXECUTED, CANCELLED, ...) stay cached and are never
+   downloaded again
+
+Both fetches are stream-parsed (order_stream.py): only the orders being
+resolved are materialized, and the book stores them as etrade_models.Order
+models holding just the fill fields (orderId, status, symbol, quantities
+and average execution price). With ETRADE_HEDGE_READS on, both fetches
+are hedged requests (request_policy.hedged), so one slow orders call does
+not cost a poll cycle.
+
+Concurrent syncs for the same account are coalesced: a caller that had to
+wait for another caller's in-flight sync reuses that result instead of
+issuing its own request, so N monitors on one account cost one fetch.
+"""
+import threading
+import time
+import logging
+from datetime import timedelta
+
+from etrade_models import Order, market_now
+from order_stream import OrderFill
+
+logger = logging.getLogger(__name__)
+
+# Order statuses that never change again once reached
+TERMINAL_STATUSES = frozenset({
+    'EXECUTED', 'CANCELLED', 'REJECTED', 'EXPIRED', 'DONE_TRADE_EXECUTED'
+})
+
+
+def _filled(order):
+    return sum(leg.filled_quantity for leg in order.legs)
+
+
+class OrderBook:
+    """Per-account cache of Order models keyed by str(orderId)"""
+
+    RECENT_DAYS = 1                # look-back for resolving orders that left OPEN
+    MAX_ORDERS_PER_ACCOUNT = 5000  # oldest terminal orders are pruned beyond this
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._orders = {}        # account_id_key -> {order_id: Order}
+        self._sync_locks = {}    # account_id_key -> Lock (one sync in flight per account)
+        self._last_sync = {}     # (account_id_key, symbol) -> monotonic time
+        self._listeners = []     # fn(account_id_key, changed Orders)
+        self.stats = {'syncs': 0, 'coalesced': 0, 'open_fetches': 0, 'recent_fetches': 0}
+
+    def _account_lock(self, account_id_key):
+        with self._lock:
+            lock = self._sync_locks.get(account_id_key)
+            if lock is None:
+                lock = self._sync_locks[account_id_key] = threading.Lock()
+            return lock
+
+    def add_listener(self, fn):
+        """Call fn(account_id_key, orders) after a merge with new or changed orders."""
+        self._listeners.append(fn)
+
+    def merge(self, account_id_key, orders):
+        """Merge fetched orders (dicts, OrderFills or Orders) into the book; newer data wins."""
+        changed = []
+        with self._lock:
+            book = self._orders.setdefault(account_id_key, {})
+            for order in orders:
+                if isinstance(order, OrderFill):
+                    order = Order.from_fill(order)
+                elif not isinstance(order, Order):
+                    order = Order.from_api(order)
+                order_id = order.order_id
+                if order_id is None:
+                    continue
+                key = str(order_id)
+                previous = book.pop(key, None)  # re-insert so dict order tracks recency
+                book[key] = order
+                if (previous is None or previous.status != order.status
+                        or _filled(previous) != _filled(order)):
+                    changed.append(order)
+            self._prune(book)
+        if changed:
+            for fn in self._listeners:
+                try:
+                    fn(account_id_key, changed)
+                except Exception as e:
+                    logger.error(f"Order book listener failed: {e}")
+
+    def _prune(self, book):
+        excess = len(book) - self.MAX_ORDERS_PER_ACCOUNT
+        if excess <= 0:
+            return
+        for key in list(book.keys()):
+            if excess <= 0:
+                break
+            if book[key].status in TERMINAL_STATUSES:
+                del book[key]
+                excess -= 1
+
+    def get(self, account_id_key, order_id):
+        """Cached Order by id, or None."""
+        with self._lock:
+            return self._orders.get(account_id_key, {}).get(str(order_id))
+
+    def orders(self, account_id_key, symbol=None):
+        """All cached Orders for an account (optionally for one symbol)."""
+        with self._lock:
+            orders = list(self._orders.get(account_id_key, {}).values())
+        if symbol:
+            symbol = symbol.upper()
+            orders = [o for o in orders if o.symbol == symbol]
+        return orders
+
+    def clear(self, account_id_key=None):
+        with self._lock:
+            if account_id_key is None:
+                self._orders.clear()
+                self._last_sync.clear()
+            else:
+                self._orders.pop(account_id_key, None)
+                for key in [k for k in self._last_sync if k[0] == account_id_key]:
+                    del self._last_sync[key]
+
+    def sync(self, client, account_id_key, order_ids=None, symbol=None):
+        """
+        Bring the book up to date and return the account's cached orders.
+
+        Args:
+            client: Authenticated ETradeClient
+            account_id_key: Account ID key
+            order_ids: Order IDs the caller is waiting on; forces resolution
+                       if they are not cached yet
+            symbol: Restrict the OPEN fetch (and the returned list) to one symbol
+
+        Returns:
+            list of Order models
+        """
+        symbol = symbol.upper() if symbol else None
+        watched = [str(o) for o in (order_ids or [])]
+        sync_key = (account_id_key, symbol)
+        arrived = time.monotonic()
+
+        with self._account_lock(account_id_key):
+            # A sync that finished after we arrived ran concurrently with us
+            last = self._last_sync.get(sync_key)
+            if (last is not None and last >= arrived
+                    and all(self.get(account_id_key, oid) is not None for oid in watched)):
+                self.stats['coalesced'] += 1
+                return self.orders(account_id_key, symbol)
+
+            self.stats['syncs'] += 1
+            self.stats['open_fetches'] += 1
+            open_fills = client.get_order_fills(account_id_key, status='OPEN', symbol=symbol, hedge=True)
+            open_ids = {str(fill.order_id) for fill in open_fills}
+
+            # Orders cached as live that are no longer OPEN changed state
+            stale_symbols = set()
+            unresolved = []
+            for order in self.orders(account_id_key, symbol):
+                key = str(order.order_id)
+                if key not in open_ids and order.status not in TERMINAL_STATUSES:
+                    unresolved.append(key)
+                    stale_symbols.add(order.symbol)
+            missing = [oid for oid in watched
+                       if oid not in open_ids and self.get(account_id_key, oid) is None]
+            if missing:
+                unresolved.extend(missing)
+                stale_symbols.add(symbol)
+
+            self.merge(account_id_key, open_fills)
+
+            if unresolved:
+                # One filtered fetch when everything unresolved shares a symbol,
+                # otherwise one unfiltered fetch of the recent window
+                recent_symbol = stale_symbols.pop() if len(stale_symbols) == 1 else None
+                today = market_now()
+                from_date = today - timedelta(days=self.RECENT_DAYS)
+                self.stats['recent_fetches'] += 1
+                recent = client.get_order_fills(
+                    account_id_key, status=None,
+                    from_date=from_date, to_date=today,
+                    symbol=recent_symbol, order_ids=unresolved, hedge=True
+                )
+                self.merge(account_id_key, recent)
+
+            self._last_sync[sync_key] = time.monotonic()
+            return self.orders(account_id_key, symbol)
+
+
+# Singleton instance
+_order_book = None
+
+
+def get_order_book():
+    """Get or create the singleton OrderBook instance."""
+    global _order_book
+    if _order_book is None:
+        _order_book = OrderBook()
+    return _order_book
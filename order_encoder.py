@@ -0,0 +1,293 @@
+"""
+Order Payload Encoder
+
+Builds the preview / place / cancel request bodies for E*TRADE as bytes,
+in XML (what the client has always sent) or E*TRADE's JSON request format.
+
+Every order is first validated into an OrderRequest: symbol, action,
+quantity and price precision are checked before anything is sent, so a
+malformed order fails locally instead of after a round trip. The validated
+values are plain ASCII tokens (letters, digits, '.', '/', '-'), so the
+templates need no escaping.
+
+The templates are byte chunks built once at import. The encoded order
+(everything after the clientOrderId) is cached per order fields, request
+type and format, so a repeat order - an exit re-sent by the monitor, the
+place after its preview - is validated and encoded once; after that it
+costs one dict lookup, the ID checks and one join. Validated symbols and
+prices are cached too, for new orders on known symbols and prices.
+
+XML matches what _build_order_payload always sent, except that STOP
+orders now carry their stopPrice (it used to be dropped).
+
+    order = OrderRequest.from_dict({'symbol': 'AAPL', 'quantity': 10,
+                                    'orderAction': 'BUY', 'priceType': 'LIMIT',
+                                    'limitPrice': '227.50'})
+    body = encode_order(order, 'place', client_order_id, preview_id)        # XML
+    body = encode_order(order, 'place', client_order_id, preview_id, 'json')
+"""
+import re
+from collections import namedtuple
+
+ORDER_ACTIONS = frozenset({'BUY', 'SELL', 'BUY_TO_COVER', 'SELL_SHORT'})
+PRICE_TYPES = frozenset({'MARKET', 'LIMIT', 'STOP', 'STOP_LIMIT', 'TRAILING_STOP_CNST'})
+ORDER_TERMS = frozenset({'GOOD_FOR_DAY', 'GOOD_UNTIL_CANCEL', 'IMMEDIATE_OR_CANCEL', 'FILL_OR_KILL'})
+
+CONTENT_TYPES = {'xml': 'application/xml', 'json': 'application/json'}
+
+_SYMBOL = re.compile(r'[A-Z][A-Z0-9]{0,5}([./-][A-Z0-9]{1,2})?\Z')
+_PRICE = re.compile(r'(\d{1,7})(?:\.(\d{1,4}))?\Z')
+
+
+class OrderValidationError(ValueError):
+    """The order can't be sent as given (bad symbol, quantity, price, ...)."""
+
+
+# Sandbox limit orders need a limit price; preview replaces it
+DEFAULT_LIMIT_PRICE = '100.00'
+MAX_QUANTITY = 1000000
+
+# Validated symbols and prices, so repeat orders skip the regex
+_CACHE_SIZE = 4096
+_symbols = {}
+_prices = {}
+# (order fields..., request, fmt) -> encoded order after the clientOrderId
+_order_tails = {}
+
+
+class OrderRequest(namedtuple('OrderRequest', [
+        'symbol', 'action', 'quantity', 'price_type', 'order_term',
+        'limit_price', 'stop_price', 'stop_limit_price'])):
+    """
+    A validated equity order. Prices are canonical decimal strings (None
+    when not part of the order), quantity is an int.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, order_data):
+        """
+        Validate an order_data dict (symbol, quantity, orderAction,
+        priceType, orderTerm, limitPrice, stopPrice, stopLimitPrice).
+
+        Raises:
+            OrderValidationError: The order can't be sent as given
+        """
+        action = order_data.get('orderAction', 'BUY')
+        if action not in ORDER_ACTIONS:
+            raise OrderValidationError(f"Invalid orderAction: {action!r}")
+
+        price_type = order_data.get('priceType', 'MARKET')
+        if price_type not in PRICE_TYPES:
+            raise OrderValidationError(f"Invalid priceType: {price_type!r}")
+
+        order_term = order_data.get('orderTerm', 'GOOD_FOR_DAY')
+        if order_term not in ORDER_TERMS:
+            raise OrderValidationError(f"Invalid orderTerm: {order_term!r}")
+
+        limit_price = stop_price = stop_limit_price = None
+        if price_type == 'LIMIT' or price_type == 'STOP_LIMIT':
+            limit_price = _price(order_data.get('limitPrice') or DEFAULT_LIMIT_PRICE, 'limitPrice')
+        if price_type != 'MARKET' and price_type != 'LIMIT':
+            # For TRAILING_STOP_CNST stopPrice is the trail amount
+            value = order_data.get('stopPrice')
+            if value:
+                stop_price = _price(value, 'stopPrice')
+            if price_type == 'TRAILING_STOP_CNST':
+                value = order_data.get('stopLimitPrice')
+                if value:
+                    stop_limit_price = _price(value, 'stopLimitPrice')
+
+        return cls(_symbol(order_data.get('symbol')), action,
+                   _quantity(order_data.get('quantity', 1)), price_type, order_term,
+                   limit_price, stop_price, stop_limit_price)
+
+
+def _symbol(value):
+    symbol = _symbols.get(value)
+    if symbol is None:
+        symbol = str(value or '').strip().upper()
+        if not _SYMBOL.match(symbol):
+            raise OrderValidationError(f"Invalid symbol: {value!r}")
+        if len(_symbols) >= _CACHE_SIZE:
+            _symbols.clear()
+        _symbols[value] = symbol
+    return symbol
+
+
+def _quantity(value):
+    if value.__class__ is not int:
+        try:
+            number = float(str(value).strip())
+        except ValueError:
+            raise OrderValidationError(f"Invalid quantity: {value!r}")
+        if not number.is_integer():
+            raise OrderValidationError(f"Quantity must be a whole number of shares: {value!r}")
+        value = int(number)
+    if not 0 < value <= MAX_QUANTITY:
+        raise OrderValidationError(f"Quantity must be from 1 to {MAX_QUANTITY}: {value!r}")
+    return value
+
+
+def _price(value, field):
+    """Canonical price string: positive, at most 2 decimals ($1 and up) or 4 (below $1)."""
+    price = _prices.get(value)
+    if price is not None:
+        return price
+    text = value.strip() if value.__class__ is str else repr(float(value))
+    match = _PRICE.match(text)
+    if match is None:
+        raise OrderValidationError(f"Invalid {field}: {value!r}")
+    whole, fraction = match.groups()
+    fraction = (fraction or '').rstrip('0') if value.__class__ is not str else (fraction or '')
+    if int(whole) == 0 and not fraction.strip('0'):
+        raise OrderValidationError(f"{field} must be positive: {value!r}")
+    places = 4 if int(whole) == 0 else 2
+    if len(fraction.rstrip('0')) > places:
+        raise OrderValidationError(f"{field} {value} has more than {places} decimal places")
+    price = f'{int(whole)}.{fraction}' if fraction else str(int(whole))
+    if len(_prices) >= _CACHE_SIZE:
+        _prices.clear()
+    _prices[value] = price
+    return price
+
+
+# ==================== XML ====================
+#
+# The body is joined from byte chunks precompiled per request type and per
+# enum value (priceType, orderTerm, orderAction), so a new order costs a few
+# dict lookups, the variable fields' encode() and one b''.join; encode_order
+# caches the result.
+
+def _xml_chunks():
+    head = {r: (b'<?xml version="1.0" encoding="UTF-8"?>\n<%sOrderRequest>\n    ' % r) for r in (b'Preview', b'Place')}
+    return (
+        {'preview': head[b'Preview'], 'place': head[b'Place']},
+        {'preview': b'\n</PreviewOrderRequest>', 'place': b'\n</PlaceOrderRequest>'},
+        {t: (b'</clientOrderId>\n    <Order>\n        <allOrNone>false</allOrNone>\n'
+             b'        <priceType>%b</priceType>\n        <orderTerm>' % t.encode()) for t in PRICE_TYPES},
+        {t: (b'%b</orderTerm>\n        <marketSession>REGULAR</marketSession>\n        ' % t.encode())
+         for t in ORDER_TERMS},
+        {a: (b'</symbol>\n            </Product>\n            <orderAction>%b</orderAction>\n'
+             b'            <quantityType>QUANTITY</quantityType>\n            <quantity>' % a.encode())
+         for a in ORDER_ACTIONS},
+    )
+
+
+_XML_HEAD, _XML_TAIL, _XML_PRICE_TYPE, _XML_TERM, _XML_ACTION = _xml_chunks()
+_XML_PREVIEW_ID = b'<PreviewIds><previewId>'
+_XML_CLIENT_ORDER_ID = b'</previewId></PreviewIds>\n    <orderType>EQ</orderType>\n    <clientOrderId>'
+_XML_NO_PREVIEW_ID = b'<orderType>EQ</orderType>\n    <clientOrderId>'
+_XML_SYMBOL = b'<Instrument>\n            <Product>\n                <securityType>EQ</securityType>\n                <symbol>'
+_XML_QUANTITY = b'</quantity>\n        </Instrument>\n    </Order>'
+_XML_CANCEL = (b'<?xml version="1.0" encoding="UTF-8"?>\n'
+               b'<CancelOrderRequest>\n'
+               b'    <orderId>%d</orderId>\n'
+               b'</CancelOrderRequest>')
+
+
+def _xml_tail(order, request):
+    parts = [_XML_PRICE_TYPE[order.price_type], _XML_TERM[order.order_term]]
+    # Element order matches what E*TRADE has accepted: stop, stop limit, limit.
+    # E*TRADE rejects empty elements, so absent prices are left out.
+    if order.stop_price is not None:
+        parts.append(b'<stopPrice>%b</stopPrice>\n        ' % order.stop_price.encode())
+    if order.stop_limit_price is not None:
+        parts.append(b'<stopLimitPrice>%b</stopLimitPrice>\n        ' % order.stop_limit_price.encode())
+    if order.limit_price is not None:
+        parts.append(b'<limitPrice>%b</limitPrice>\n        ' % order.limit_price.encode())
+    parts += (_XML_SYMBOL, order.symbol.encode(), _XML_ACTION[order.action],
+              b'%d' % order.quantity, _XML_QUANTITY, _XML_TAIL[request])
+    return b''.join(parts)
+
+
+# ==================== JSON ====================
+
+_JSON_HEAD = {
+    'preview': b'{"PreviewOrderRequest":{',
+    'place': b'{"PlaceOrderRequest":{',
+}
+_JSON_PREVIEW_IDS = b'"PreviewIds":[{"previewId":%b}],'
+_JSON_CLIENT_ORDER_ID = b'"orderType":"EQ","clientOrderId":"'
+_JSON_ORDER = (b'","Order":[{'
+               b'"allOrNone":false,"priceType":"%b","orderTerm":"%b","marketSession":"REGULAR",%b'
+               b'"Instrument":[{"Product":{"securityType":"EQ","symbol":"%b"},'
+               b'"orderAction":"%b","quantityType":"QUANTITY","quantity":%d}]}]}}')
+_JSON_CANCEL = b'{"CancelOrderRequest":{"orderId":%d}}'
+
+
+def _json_tail(order, request):
+    prices = b''
+    if order.stop_price is not None:
+        prices += b'"stopPrice":%b,' % order.stop_price.encode()
+    if order.stop_limit_price is not None:
+        prices += b'"stopLimitPrice":%b,' % order.stop_limit_price.encode()
+    if order.limit_price is not None:
+        prices += b'"limitPrice":%b,' % order.limit_price.encode()
+    return _JSON_ORDER % (order.price_type.encode(), order.order_term.encode(),
+                          prices, order.symbol.encode(), order.action.encode(), order.quantity)
+
+
+# ==================== Entry points ====================
+
+def encode_order(order, request, client_order_id, preview_id=None, fmt='xml'):
+    """
+    Encode a preview or place request body.
+
+    Args:
+        order: OrderRequest (or an order_data dict, validated here)
+        request: 'preview' or 'place'
+        client_order_id: clientOrderId (1-20 letters/digits)
+        preview_id: previewId from the preview response (place only)
+        fmt: 'xml' or 'json'
+
+    Returns:
+        bytes
+
+    Raises:
+        OrderValidationError: Invalid order or IDs
+    """
+    client_order_id = str(client_order_id)
+    if not (0 < len(client_order_id) <= 20 and client_order_id.isascii() and client_order_id.isalnum()):
+        raise OrderValidationError(f"Invalid clientOrderId: {client_order_id!r}")
+    if preview_id is not None:
+        preview_id = str(preview_id)
+        if not (preview_id.isascii() and preview_id.isdigit()):
+            raise OrderValidationError(f"Invalid previewId: {preview_id!r}")
+
+    if order.__class__ is OrderRequest:
+        key = (order, request, fmt)
+    else:
+        get = order.get
+        key = (get('symbol'), get('quantity'), get('orderAction'), get('priceType'), get('orderTerm'),
+               get('limitPrice'), get('stopPrice'), get('stopLimitPrice'), request, fmt)
+    try:
+        tail = _order_tails.get(key)
+    except TypeError:  # unhashable field values: validate and encode uncached
+        key = tail = None
+    if tail is None:
+        if order.__class__ is not OrderRequest:
+            order = OrderRequest.from_dict(order)
+        tail = (_json_tail if fmt == 'json' else _xml_tail)(order, request)
+        if key is not None:
+            if len(_order_tails) >= _CACHE_SIZE:
+                _order_tails.clear()
+            _order_tails[key] = tail
+    if fmt == 'json':
+        if preview_id:
+            return b''.join((_JSON_HEAD[request], _JSON_PREVIEW_IDS % preview_id.encode(),
+                             _JSON_CLIENT_ORDER_ID, client_order_id.encode(), tail))
+        return b''.join((_JSON_HEAD[request], _JSON_CLIENT_ORDER_ID, client_order_id.encode(), tail))
+    if preview_id:
+        return b''.join((_XML_HEAD[request], _XML_PREVIEW_ID, preview_id.encode(),
+                         _XML_CLIENT_ORDER_ID, client_order_id.encode(), tail))
+    return b''.join((_XML_HEAD[request], _XML_NO_PREVIEW_ID, client_order_id.encode(), tail))
+
+
+def encode_cancel(order_id, fmt='xml'):
+    """Encode a cancel request body (bytes)."""
+    try:
+        order_id = int(order_id)
+    except (TypeError, ValueError):
+        raise OrderValidationError(f"Invalid orderId: {order_id!r}")
+    return (_JSON_CANCEL if fmt == 'json' else _XML_CANCEL) % order_id
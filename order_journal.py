@@ -0,0 +1,248 @@
+"""
+Order Placement Journal
+
+A place request that times out (or gets a 5xx back) may or may not have
+created the order. Sending it again risks a duplicate fill; not sending it
+risks a position without its exit. The journal makes the retry safe:
+
+1. Every order gets a deterministic clientOrderId. Orders placed for an
+   intent - 'exit:<opening order id>:profit', ':stop', ':tsl' - always get
+   the same ID, so the frontend check-fill path, the server-side monitor and
+   a restarted monitor all place the same order. Orders without an intent
+   (UI orders) get a unique ID.
+2. The intent is recorded (Redis, like the OAuth tokens, plus memory)
+   before the place request is sent.
+3. After an ambiguous failure the order is looked up; the place is sent
+   again only if it is absent. E*TRADE rejects a second order with the same
+   clientOrderId, which covers orders that are not listed yet.
+
+A place for an intent that is already journaled as placed returns the
+journaled order instead of sending anything. An intent whose place ended in
+'failed' (E*TRADE refused it, so no order exists) gets a new attempt ID -
+the intent with ':attempt<n>' appended - so it can be placed again; one
+that ended in 'unknown' keeps its ID, since that order may exist.
+
+E*TRADE does not return clientOrderId in order listings, so the lookup
+matches the journaled symbol, action, quantity, price type and price
+against orders placed since the intent was recorded (see
+ETradeClient.find_placed_order).
+
+Entry states: pending -> placed | failed | unknown (ambiguous failure the
+lookup could not resolve; check positions).
+"""
+import hashlib
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+import redis
+
+import codec
+from config import (
+    REDIS_URL, ORDER_JOURNAL_KEY_PREFIX, ORDER_JOURNAL_TTL_HOURS, ETRADE_DUPLICATE_ORDER_CODES
+)
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+ORDER_JOURNAL_EVENTS = get_metrics().counter(
+    'order_journal_events_total',
+    'Order placements: deduplicated (intent already placed), recovered '
+    '(ambiguous failure, order found), resent (ambiguous failure, order absent), unknown',
+    ('event',))
+
+
+def _order_fields(order_data):
+    """The fields an order lookup matches on."""
+    price_type = order_data.get('priceType', 'MARKET')
+    market = price_type == 'MARKET'
+    return {
+        'symbol': (order_data.get('symbol') or '').upper(),
+        'action': order_data.get('orderAction'),
+        'quantity': int(float(order_data.get('quantity') or 0)),
+        'price_type': price_type,
+        'limit_price': None if market else order_data.get('limitPrice'),
+        'stop_price': None if market else order_data.get('stopPrice')
+    }
+
+
+class OrderJournal:
+    """clientOrderId assignment and the record of every place attempt."""
+
+    MAX_ENTRIES = 1000
+
+    def __init__(self):
+        self._entries = OrderedDict()  # client_order_id -> entry dict
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self.redis = self._connect_redis()
+
+    def _connect_redis(self):
+        try:
+            client = redis.from_url(REDIS_URL, decode_responses=True)
+            client.ping()
+            return client
+        except Exception as e:
+            logger.warning(f"Redis connection failed, order journal is in memory only: {e}")
+            return None
+
+    def client_order_id(self, account_id_key, intent=None):
+        """
+        clientOrderId for an order (20 hex characters, E*TRADE's limit).
+
+        Args:
+            account_id_key: Account ID key
+            intent: Stable name of what the order is for (same intent ->
+                    same ID, until an attempt with it ends in 'failed');
+                    None for a one-off order (unique ID)
+        """
+        if intent is None:
+            intent = f'once:{time.time_ns()}:{next(self._sequence)}'
+            return self._hash_id(account_id_key, intent)
+        attempt = 1
+        while True:
+            client_order_id = self._hash_id(
+                account_id_key, intent if attempt == 1 else f'{intent}:attempt{attempt}')
+            entry = self.get(client_order_id)
+            if entry is None or entry['status'] != 'failed':
+                return client_order_id
+            attempt += 1
+
+    @staticmethod
+    def _hash_id(account_id_key, intent):
+        return hashlib.blake2b(f'{account_id_key}|{intent}'.encode(), digest_size=10).hexdigest()
+
+    def begin(self, client_order_id, account_id_key, order_data, intent=None, preview_id=None):
+        """
+        Record the intent to place an order, before it is sent.
+
+        Returns:
+            The journal entry; if its status is already 'placed' the order
+            must not be sent again
+        """
+        entry = self.get(client_order_id)
+        if entry is not None and entry['status'] == 'placed':
+            ORDER_JOURNAL_EVENTS.inc(('deduplicated',))
+            logger.warning(f"Order {client_order_id} ({entry.get('intent')}) already placed "
+                           f"as {entry['order_id']}, not sending again")
+            return entry
+        if entry is None:
+            entry = {
+                'client_order_id': client_order_id,
+                'intent': intent,
+                'account_id_key': account_id_key,
+                **_order_fields(order_data),
+                'preview_id': preview_id,
+                'status': 'pending',
+                'order_id': None,
+                'error': None,
+                'attempts': 0,
+                'created': int(time.time() * 1000)
+            }
+        entry['attempts'] += 1
+        self._save(entry)
+        return entry
+
+    def placed_entry(self, account_id_key, intent):
+        """The journaled entry if this intent's order was already placed, else None."""
+        if intent is None:
+            return None
+        entry = self.get(self.client_order_id(account_id_key, intent))
+        return entry if entry is not None and entry['status'] == 'placed' else None
+
+    def placed(self, client_order_id, order_id, recovered=False):
+        """The order exists at E*TRADE (recovered: found by lookup)."""
+        if recovered:
+            ORDER_JOURNAL_EVENTS.inc(('recovered',))
+        self._update(client_order_id, status='placed', order_id=order_id, error=None)
+
+    def resent(self, client_order_id):
+        """An ambiguous failure found no order, so the place is being sent again."""
+        ORDER_JOURNAL_EVENTS.inc(('resent',))
+        entry = self.get(client_order_id)
+        if entry is not None:
+            entry['attempts'] += 1
+            self._save(entry)
+
+    def failed(self, client_order_id, error, ambiguous=False):
+        """The place failed; ambiguous failures end in 'unknown', not 'failed'."""
+        if ambiguous:
+            ORDER_JOURNAL_EVENTS.inc(('unknown',))
+        self._update(client_order_id, status='unknown' if ambiguous else 'failed', error=str(error))
+
+    def get(self, client_order_id):
+        with self._lock:
+            entry = self._entries.get(client_order_id)
+        if entry is None and self.redis:
+            try:
+                data = self.redis.get(f'{ORDER_JOURNAL_KEY_PREFIX}{client_order_id}')
+                if data:
+                    entry = codec.loads(data)
+                    self._remember(entry)
+            except Exception as e:
+                logger.error(f"Failed to read order journal from Redis: {e}")
+        return entry
+
+    def claimed_order_ids(self, account_id_key):
+        """Order IDs already matched to journal entries (a lookup skips them)."""
+        with self._lock:
+            return {str(e['order_id']) for e in self._entries.values()
+                    if e['order_id'] and e['account_id_key'] == account_id_key}
+
+    def recent(self, limit=50):
+        """Newest entries first, for GET /api/debug/order-journal."""
+        with self._lock:
+            entries = list(self._entries.values())[-limit:]
+        return [dict(e) for e in reversed(entries)]
+
+    def _update(self, client_order_id, **fields):
+        entry = self.get(client_order_id)
+        if entry is None:
+            return
+        entry.update(fields)
+        self._save(entry)
+
+    def _remember(self, entry):
+        with self._lock:
+            self._entries[entry['client_order_id']] = entry
+            self._entries.move_to_end(entry['client_order_id'])
+            if len(self._entries) > self.MAX_ENTRIES:
+                self._entries.popitem(last=False)
+
+    def _save(self, entry):
+        entry['updated'] = int(time.time() * 1000)
+        self._remember(entry)
+        if self.redis:
+            try:
+                self.redis.setex(f"{ORDER_JOURNAL_KEY_PREFIX}{entry['client_order_id']}",
+                                 timedelta(hours=ORDER_JOURNAL_TTL_HOURS), codec.dumps(entry))
+            except Exception as e:
+                logger.error(f"Failed to save order journal to Redis: {e}")
+
+
+def is_duplicate_error(error):
+    """
+    E*TRADE refused the place because the clientOrderId was already used.
+
+    Decided by the E*TRADE error code (config.ETRADE_DUPLICATE_ORDER_CODES)
+    the client's ETradeAPIError carries, never by the message text.
+    """
+    try:
+        return int(getattr(error, 'code', None)) in ETRADE_DUPLICATE_ORDER_CODES
+    except (TypeError, ValueError):
+        return False
+
+
+# Singleton instance
+_order_journal = None
+
+
+def get_order_journal():
+    """Get or create the singleton OrderJournal instance."""
+    global _order_journal
+    if _order_journal is None:
+        _order_journal = OrderJournal()
+    return _order_journal
@@ -10,27 +10,57 @@ Emits events via callback for SSE delivery to connected clients.
 import threading
 import time
 import queue
-import json
 import logging
 from datetime import datetime
 
+import codec
+from config import SSE_QUEUE_MAXSIZE
+from etrade_models import QUOTE_DETAIL_ALL, find_order
+from metrics import EXIT_PLACEMENT_SECONDS, FILL_DETECTION_SECONDS
+from order_timeline import get_order_timeline
+from quote_hub import get_quote_hub
+from request_policy import deadline, is_transient
+from trailing_stop_manager import TrailingStopState
+
 logger = logging.getLogger(__name__)
+# Per-tick loggers for chatty paths; sampled by logging_setup (LOG_SAMPLE)
+tick_logger = logging.getLogger(f'{__name__}.ticks')
+quote_logger = logging.getLogger(f'{__name__}.quotes')
+
+# Periodic "still waiting" events, emitted every poll by every monitor
+STATUS_EVENT_TYPES = frozenset({'status', 'ts_status', 'tsl_status'})
+
+# Events whose delivery to each SSE client is recorded on the order's timeline
+TIMELINE_EVENT_TYPES = frozenset({'filled', 'ts_filled', 'tsl_filled', 'ts_stop_placed', 'tsl_stop_placed'})
 
 
 class OrderMonitor:
     """Background order monitoring that survives browser disconnects"""
 
     POLL_INTERVAL = 2  # seconds between checks
+    POLL_DEADLINE = 4  # seconds one fill poll may take, retries included
+    QUOTE_MAX_TICKS = 3  # quote hub ticks before a trigger quote is too old to act on
 
     def __init__(self):
-        self._monitors = {}  # order_id -> thread
+        self._monitors = {}  # order_id / 'quote:SYM' -> control flag (see _new_flag)
         self._lock = threading.Lock()
         self._sse_clients = []  # list of Queue objects for SSE listeners
         self._sse_lock = threading.Lock()
+        self._sse_evicted = 0  # clients dropped because their queue was full
+        self._sse_events_emitted = 0
+        self._sse_load_running = False
+        self._timeline = get_order_timeline()
+        self._quotes = get_quote_hub()
 
     def add_sse_client(self):
-        """Register a new SSE listener. Returns a Queue to read events from."""
-        q = queue.Queue()
+        """
+        Register a new SSE listener.
+
+        Returns a Queue of encoded SSE frames (bytes). Timeline events are
+        queued as (frame, order_id, event_type) so the writer can record
+        when the frame actually went out.
+        """
+        q = queue.Queue(maxsize=SSE_QUEUE_MAXSIZE)
         with self._sse_lock:
             self._sse_clients.append(q)
         logger.info(f"SSE client connected ({len(self._sse_clients)} total)")
@@ -46,43 +76,176 @@ class OrderMonitor:
         logger.info(f"SSE client disconnected ({len(self._sse_clients)} total)")
 
     def _emit(self, event):
-        """Send event to all SSE listeners."""
-        if event.get('type') != 'quote':
-            logger.info(f"Monitor event: {event.get('type')} order={event.get('order_id')}")
+        """Send event to all SSE listeners (encoded once, shared by every client)."""
+        event_type = event.get('type')
+        if event_type in STATUS_EVENT_TYPES:
+            tick_logger.info("Monitor event: %s order=%s", event_type, event.get('order_id'),
+                             extra={'order_id': event.get('order_id')})
+        elif event_type not in ('quote', 'loadtest'):
+            logger.info("Monitor event: %s order=%s", event_type, event.get('order_id'),
+                        extra={'order_id': event.get('order_id'), 'symbol': event.get('symbol')})
+        frame = codec.sse_frame(event)
+        if event_type in TIMELINE_EVENT_TYPES:
+            frame = (frame, event.get('order_id'), event_type)
         with self._sse_lock:
+            self._sse_events_emitted += 1
             dead = []
             for q in self._sse_clients:
                 try:
-                    q.put_nowait(event)
+                    q.put_nowait(frame)
                 except queue.Full:
                     dead.append(q)
             for q in dead:
                 self._sse_clients.remove(q)
+            if dead:
+                self._sse_evicted += len(dead)
+                logger.warning(f"Evicted {len(dead)} SSE client(s) with full queues")
+
+    def get_sse_stats(self):
+        """Snapshot of SSE fan-out state: client count, queue depths, evictions."""
+        with self._sse_lock:
+            depths = [q.qsize() for q in self._sse_clients]
+            return {
+                'clients': len(depths),
+                'queue_maxsize': SSE_QUEUE_MAXSIZE,
+                'queue_depth_total': sum(depths),
+                'queue_depth_max': max(depths) if depths else 0,
+                'evicted': self._sse_evicted,
+                'events_emitted': self._sse_events_emitted
+            }
+
+    def run_sse_load(self, rate, duration, payload_bytes=0):
+        """
+        Emit synthetic 'loadtest' events for SSE load testing.
+
+        Only one run at a time.
+
+        Args:
+            rate: Events per second
+            duration: Seconds to keep emitting
+            payload_bytes: Size of filler string added to each event
+
+        Returns:
+            False if a run is already in progress (nothing started)
+        """
+        with self._sse_lock:
+            if self._sse_load_running:
+                return False
+            self._sse_load_running = True
+        interval = 1.0 / rate
+        pad = 'x' * payload_bytes
+
+        def run():
+            logger.info(f"[SSELoad] Emitting {rate}/s for {duration}s ({payload_bytes}B padding)")
+            start = time.monotonic()
+            seq = 0
+            try:
+                while time.monotonic() - start < duration:
+                    event = {'type': 'loadtest', 'seq': seq, 'sent_at': time.time()}
+                    if pad:
+                        event['pad'] = pad
+                    self._emit(event)
+                    seq += 1
+                    # Schedule against the start time so emit cost doesn't skew the rate
+                    delay = start + seq * interval - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+            finally:
+                self._sse_load_running = False
+            logger.info(f"[SSELoad] Done, emitted {seq} events")
+
+        t = threading.Thread(target=run, daemon=True, name='sse-load')
+        t.start()
+        return True
+
+    def get_monitor_counts(self):
+        """Active monitors as {(type, state): count}."""
+        with self._lock:
+            flags = list(self._monitors.values())
+        counts = {}
+        for flag in flags:
+            labels = (flag.get('type', 'unknown'), flag.get('state', 'unknown'))
+            counts[labels] = counts.get(labels, 0) + 1
+        return counts
 
     def is_monitoring(self, order_id):
         """Check if an order is being monitored."""
         with self._lock:
             return str(order_id) in self._monitors
 
-    def stop_monitoring(self, order_id):
-        """Stop monitoring an order."""
+    def stop_monitoring(self, order_id, flag=None):
+        """
+        Stop monitoring an order.
+
+        Args:
+            flag: The calling monitor's own flag; if the order is now run by
+                  a restarted monitor, that one is left alone
+        """
         with self._lock:
             key = str(order_id)
-            if key in self._monitors:
+            if key in self._monitors and (flag is None or self._monitors[key] is flag):
                 self._monitors[key]['stop'] = True
                 del self._monitors[key]
+                self._quotes.unsubscribe(key)
                 logger.info(f"Stopped monitoring order {order_id}")
 
+    # ==================== Health / Watchdog Support ====================
+
+    def _new_flag(self, monitor_type, state, cadence, restart):
+        """
+        Control record for one monitor thread.
+
+        stop       - set to end the thread (checked every loop)
+        type/state - for metrics and the watchdog
+        cadence    - expected seconds between loop iterations
+        progress   - time.monotonic() of the last loop iteration (heartbeat)
+        restart    - callable that starts a replacement monitor from the
+                     saved state (pending dicts / trailing stop manager)
+        """
+        return {'stop': False, 'type': monitor_type, 'state': state, 'cadence': cadence,
+                'progress': time.monotonic(), 'restart': restart}
+
+    def get_monitor_flags(self):
+        """Snapshot of (key, flag) for every running monitor."""
+        with self._lock:
+            return list(self._monitors.items())
+
+    def restart_monitor(self, key):
+        """
+        Abandon a stuck monitor thread and start a replacement.
+
+        Threads can't be killed: the old one keeps its stop flag set and
+        exits (without placing orders) if its blocked call ever returns.
+
+        Returns:
+            True if a replacement was started
+        """
+        with self._lock:
+            flag = self._monitors.get(key)
+            if flag is None or flag.get('restart') is None:
+                return False
+            flag['stop'] = True
+            del self._monitors[key]
+            self._quotes.unsubscribe(key)
+        logger.warning("[Monitor] Restarting stalled %s monitor %s", flag.get('type'), key)
+        try:
+            return flag['restart']() is not False
+        except Exception as e:
+            logger.error(f"[Monitor] Restart of {key} failed: {e}")
+            return False
+
     # ==================== Quote Streaming ====================
 
-    def start_quote_watch(self, symbol, get_client_fn, interval=3):
+    def start_quote_watch(self, symbol, get_client_fn):
         """
-        Start streaming quotes for a symbol via polling + SSE.
+        Start streaming quotes for a symbol via the quote hub + SSE.
+
+        Any number of symbols can be watched at once; the hub polls them
+        all in batched calls every QUOTE_HUB_INTERVAL seconds.
 
         Args:
             symbol: Ticker symbol to watch
             get_client_fn: Callable returning authenticated ETradeClient
-            interval: Seconds between polls (default 3)
         """
         symbol = symbol.upper()
         key = f"quote:{symbol}"
@@ -92,64 +255,25 @@ class OrderMonitor:
                 logger.info(f"[QuoteWatch] Already watching {symbol}, skipping restart")
                 return
 
-            # Stop any existing quote watch (different symbol)
-            for k in list(self._monitors.keys()):
-                if k.startswith('quote:'):
-                    self._monitors[k]['stop'] = True
-                    del self._monitors[k]
-
-            stop_flag = {'stop': False}
+            stop_flag = self._new_flag('quote', 'watching', self._quotes.interval,
+                                       lambda: self.start_quote_watch(symbol, get_client_fn))
             self._monitors[key] = stop_flag
 
-        logger.info(f"[QuoteWatch] Starting quote stream for {symbol}")
-
-        def run():
-            while not stop_flag['stop']:
-                try:
-                    client = get_client_fn()
-                    quote = client.get_quote(symbol)
-
-                    if quote and 'All' in quote and quote['All'] is not None:
-                        all_data = quote['All']
-                        quote_event = {
-                            'type': 'quote',
-                            'symbol': symbol,
-                            'last_price': all_data.get('lastTrade'),
-                            'bid': all_data.get('bid'),
-                            'ask': all_data.get('ask'),
-                            'bid_size': all_data.get('bidSize'),
-                            'ask_size': all_data.get('askSize'),
-                            'change': all_data.get('changeClose'),
-                            'change_percent': all_data.get('changeClosePercentage'),
-                            'volume': all_data.get('totalVolume'),
-                            'high': all_data.get('high'),
-                            'low': all_data.get('low'),
-                            'open': all_data.get('open'),
-                            'previous_close': all_data.get('previousClose')
-                        }
-                        self._emit(quote_event)
-
-                except Exception as e:
-                    err_msg = str(e)
-                    if '500' in err_msg or 'not currently available' in err_msg:
-                        logger.debug(f"[QuoteWatch] API error for {symbol}, retrying...")
-                    else:
-                        logger.error(f"[QuoteWatch] Error fetching quote for {symbol}: {e}")
+        def on_quote(quote):
+            stop_flag['progress'] = time.monotonic()
+            self._emit({'type': 'quote', **quote.to_dict()})
 
-                time.sleep(interval)
-
-            logger.info(f"[QuoteWatch] Stopped quote stream for {symbol}")
-
-        t = threading.Thread(target=run, daemon=True, name=f"quote-watch-{symbol}")
-        t.start()
+        logger.info(f"[QuoteWatch] Starting quote stream for {symbol}")
+        self._quotes.subscribe(key, symbol, get_client_fn, callback=on_quote, detail=QUOTE_DETAIL_ALL)
 
-    def stop_quote_watch(self):
-        """Stop watching quotes."""
+    def stop_quote_watch(self, symbol=None):
+        """Stop watching a symbol's quotes (every symbol when None)."""
         with self._lock:
             for k in list(self._monitors.keys()):
-                if k.startswith('quote:'):
+                if k.startswith('quote:') and (symbol is None or k == f"quote:{symbol.upper()}"):
                     self._monitors[k]['stop'] = True
                     del self._monitors[k]
+                    self._quotes.unsubscribe(k)
                     logger.info(f"[QuoteWatch] Stopped {k}")
 
     def is_watching_quote(self):
@@ -157,6 +281,11 @@ class OrderMonitor:
         with self._lock:
             return any(k.startswith('quote:') for k in self._monitors)
 
+    def watched_symbols(self):
+        """Symbols with a running quote watch."""
+        with self._lock:
+            return sorted(k[len('quote:'):] for k in self._monitors if k.startswith('quote:'))
+
     # ==================== Order Monitoring ====================
 
     def monitor_profit_target(self, order_id, config, get_client_fn,
@@ -172,10 +301,18 @@ class OrderMonitor:
             pending_orders_dict: Reference to _pending_profit_orders dict
         """
         key = str(order_id)
+
+        def restart():
+            # Only while the exit hasn't been placed (status 'waiting')
+            pending_key = self._find_pending_key(pending_orders_dict, order_id)
+            if pending_key is None or pending_orders_dict[pending_key].get('status') != 'waiting':
+                return False
+            self.monitor_profit_target(order_id, config, get_client_fn, pending_orders_dict)
+
         with self._lock:
             if key in self._monitors:
                 return
-            stop_flag = {'stop': False}
+            stop_flag = self._new_flag('profit_target', 'waiting_fill', self.POLL_INTERVAL, restart)
             self._monitors[key] = stop_flag
 
         fill_timeout = config.get('fill_timeout', 15)
@@ -183,6 +320,7 @@ class OrderMonitor:
         def run():
             elapsed = 0
             logger.info(f"[Monitor] Profit target monitoring started for order {order_id}")
+            self._timeline.mark(order_id, 'monitor_started', 'profit_target')
             self._emit({
                 'type': 'monitoring_started',
                 'order_id': order_id,
@@ -191,15 +329,15 @@ class OrderMonitor:
             })
 
             while elapsed < fill_timeout and not stop_flag['stop']:
+                stop_flag['progress'] = time.monotonic()
                 try:
                     client = get_client_fn()
-                    account_id_key = config['account_id_key']
 
                     try:
-                        all_orders = client.get_orders(account_id_key, status=None)
+                        all_orders = self._fetch_orders(client, config, order_id)
                     except Exception as api_err:
-                        if '500' in str(api_err) or 'not currently available' in str(api_err):
-                            logger.debug(f"[Monitor] API error checking order {order_id}, retrying...")
+                        if is_transient(api_err):
+                            tick_logger.debug("[Monitor] API error checking order %s, retrying...", order_id)
                             elapsed += 1
                             self._emit({
                                 'type': 'status',
@@ -213,10 +351,15 @@ class OrderMonitor:
                         raise
 
                     # Check if order is filled
-                    filled, fill_price = self._check_order_filled(all_orders, order_id)
+                    filled, fill_price = self._check_order_filled(all_orders, order_id, 'profit_target')
 
                     if filled and fill_price:
-                        logger.info(f"[Monitor] Order {order_id} filled at {fill_price}")
+                        if stop_flag['stop']:
+                            return  # replaced by a restarted monitor
+                        filled_at = time.perf_counter()
+                        logger.info("[Monitor] Order %s filled at %s", order_id, fill_price,
+                                    extra={'order_id': order_id, 'symbol': config.get('symbol'),
+                                           'strategy': 'profit_target'})
 
                         # Calculate profit price
                         profit_price = self._calc_profit_price(
@@ -226,8 +369,10 @@ class OrderMonitor:
 
                         # Place profit order
                         exit_result = self._place_exit_limit_order(
-                            client, config, fill_price, profit_price
+                            client, config, fill_price, profit_price, order_id
                         )
+                        if exit_result['placed']:
+                            EXIT_PLACEMENT_SECONDS.observe(time.perf_counter() - filled_at, ('profit_target',))
 
                         # Update pending dict
                         matching_key = self._find_pending_key(pending_orders_dict, order_id)
@@ -243,9 +388,10 @@ class OrderMonitor:
                             'fill_price': fill_price,
                             'profit_price': round(profit_price, 2),
                             'profit_order_placed': exit_result['placed'],
-                            'error': exit_result.get('error')
+                            'error': exit_result.get('error'),
+                            'timeline': self._timeline.compact(order_id)
                         })
-                        self.stop_monitoring(order_id)
+                        self.stop_monitoring(order_id, stop_flag)
                         return
 
                     elapsed += 1
@@ -301,15 +447,15 @@ class OrderMonitor:
                     time.sleep(2)
                     try:
                         client = get_client_fn()
-                        all_orders = client.get_orders(config['account_id_key'], status=None)
+                        all_orders = self._fetch_orders(client, config, order_id)
                         filled, fill_price = self._check_order_filled(all_orders, order_id)
-                        if filled and fill_price:
+                        if filled and fill_price and not stop_flag['stop']:
                             profit_price = self._calc_profit_price(
                                 fill_price, config['profit_offset_type'],
                                 config['profit_offset'], config['opening_side']
                             )
                             exit_result = self._place_exit_limit_order(
-                                client, config, fill_price, profit_price
+                                client, config, fill_price, profit_price, order_id
                             )
                             self._emit({
                                 'type': 'filled',
@@ -317,7 +463,8 @@ class OrderMonitor:
                                 'fill_price': fill_price,
                                 'profit_price': round(profit_price, 2),
                                 'profit_order_placed': exit_result['placed'],
-                                'error': exit_result.get('error')
+                                'error': exit_result.get('error'),
+                                'timeline': self._timeline.compact(order_id)
                             })
                             return
                     except Exception:
@@ -334,7 +481,7 @@ class OrderMonitor:
                         'message': f'Failed to cancel: {error_msg}'
                     })
 
-            self.stop_monitoring(order_id)
+            self.stop_monitoring(order_id, stop_flag)
 
         t = threading.Thread(target=run, daemon=True, name=f"monitor-profit-{order_id}")
         t.start()
@@ -350,18 +497,26 @@ class OrderMonitor:
         with self._lock:
             if key in self._monitors:
                 return
-            stop_flag = {'stop': False}
+            stop_flag = self._new_flag(
+                'trailing_stop', 'waiting_fill', self.POLL_INTERVAL,
+                lambda: self.monitor_trailing_stop(order_id, config, get_client_fn, trailing_stop_mgr))
             self._monitors[key] = stop_flag
 
         fill_timeout = config.get('fill_timeout', 15)
         confirm_timeout = config.get('confirmation_timeout', 300)
 
         def run():
-            state = 'waiting_fill'
+            # Resume from the manager's state when restarted after a fill
+            saved = trailing_stop_mgr.get_trailing_stop(order_id)
+            if saved and saved.state == TrailingStopState.WAITING_CONFIRMATION:
+                state = 'waiting_confirmation'
+            else:
+                state = 'waiting_fill'
             fill_elapsed = 0
             confirm_elapsed = 0
 
             logger.info(f"[Monitor] Trailing stop monitoring started for order {order_id}")
+            self._timeline.mark(order_id, 'monitor_started', 'trailing_stop')
             self._emit({
                 'type': 'monitoring_started',
                 'order_id': order_id,
@@ -370,6 +525,8 @@ class OrderMonitor:
             })
 
             while not stop_flag['stop']:
+                stop_flag['state'] = state
+                stop_flag['progress'] = time.monotonic()
                 try:
                     client = get_client_fn()
                     ts = trailing_stop_mgr.get_trailing_stop(order_id)
@@ -380,9 +537,9 @@ class OrderMonitor:
 
                     if state == 'waiting_fill':
                         try:
-                            all_orders = client.get_orders(config['account_id_key'], status=None)
+                            all_orders = self._fetch_orders(client, config, order_id)
                         except Exception as api_err:
-                            if '500' in str(api_err) or 'not currently available' in str(api_err):
+                            if is_transient(api_err):
                                 self._emit({
                                     'type': 'ts_status',
                                     'order_id': order_id,
@@ -393,7 +550,7 @@ class OrderMonitor:
                                 continue
                             raise
 
-                        filled, fill_price = self._check_order_filled(all_orders, order_id)
+                        filled, fill_price = self._check_order_filled(all_orders, order_id, 'trailing_stop')
 
                         if filled and fill_price:
                             trailing_stop_mgr.mark_filled(order_id, fill_price)
@@ -460,31 +617,32 @@ class OrderMonitor:
                             })
                             break
 
-                        try:
-                            quote = client.get_quote(ts.symbol)
-                        except Exception as api_err:
-                            if '500' in str(api_err) or 'not currently available' in str(api_err):
-                                confirm_elapsed += 1
-                                self._emit({
-                                    'type': 'ts_status',
-                                    'order_id': order_id,
-                                    'state': 'waiting_confirmation',
-                                    'message': f'Waiting for trigger... ({confirm_elapsed}s)'
-                                })
-                                time.sleep(self.POLL_INTERVAL)
-                                continue
-                            raise
+                        quote = self._latest_quote(key, ts.symbol, get_client_fn)
+                        if quote is None:
+                            confirm_elapsed += 1
+                            self._emit({
+                                'type': 'ts_status',
+                                'order_id': order_id,
+                                'state': 'waiting_confirmation',
+                                'message': f'Waiting for trigger... ({confirm_elapsed}s)'
+                            })
+                            time.sleep(self.POLL_INTERVAL)
+                            continue
 
-                        current_price = None
-                        if quote and 'All' in quote:
-                            current_price = quote['All'].get('lastTrade')
+                        current_price = quote.last_price
 
                         if not current_price:
                             time.sleep(self.POLL_INTERVAL)
                             continue
 
                         if ts.check_confirmation(current_price):
-                            logger.info(f"[Monitor] Confirmation reached for {order_id} at {current_price}")
+                            if stop_flag['stop']:
+                                break  # replaced by a restarted monitor
+                            triggered_at = time.perf_counter()
+                            self._timeline.mark(order_id, 'trigger_reached', current_price)
+                            logger.info("[Monitor] Confirmation reached for %s at %s", order_id, current_price,
+                                        extra={'order_id': order_id, 'symbol': ts.symbol,
+                                               'strategy': 'confirmation_stop'})
                             stop_price, stop_limit_price = ts.calculate_stop_prices(current_price)
 
                             try:
@@ -497,13 +655,18 @@ class OrderMonitor:
                                     'stopPrice': str(stop_price),
                                     'limitPrice': str(stop_limit_price)
                                 }
-                                preview = client.preview_order(ts.account_id_key, stop_order_data)
+                                self._timeline.mark(order_id, 'exit_preview_sent')
+                                preview = client.preview_order(ts.account_id_key, stop_order_data,
+                                                               intent=f'exit:{order_id}:stop')
+                                self._timeline.mark(order_id, 'exit_preview_returned')
                                 result = client.place_order(
                                     ts.account_id_key, stop_order_data,
                                     preview_id=preview.get('preview_id'),
                                     client_order_id=preview.get('client_order_id')
                                 )
                                 stop_order_id = result.get('order_id')
+                                self._timeline.mark(order_id, 'exit_placed', stop_order_id)
+                                EXIT_PLACEMENT_SECONDS.observe(time.perf_counter() - triggered_at, ('trailing_stop',))
                                 trailing_stop_mgr.mark_stop_placed(order_id, stop_order_id)
 
                                 self._emit({
@@ -511,11 +674,14 @@ class OrderMonitor:
                                     'order_id': order_id,
                                     'stop_order_id': stop_order_id,
                                     'stop_price': stop_price,
-                                    'current_price': current_price
+                                    'current_price': current_price,
+                                    'timeline': self._timeline.compact(order_id)
                                 })
                                 break  # Done monitoring
                             except Exception as e:
-                                logger.error(f"[Monitor] Failed to place stop: {e}")
+                                logger.error("[Monitor] Failed to place stop: %s", e,
+                                             extra={'order_id': order_id, 'symbol': ts.symbol,
+                                                    'strategy': 'confirmation_stop'})
                                 trailing_stop_mgr.mark_error(order_id, str(e))
                                 self._emit({
                                     'type': 'ts_error',
@@ -547,7 +713,7 @@ class OrderMonitor:
 
                 time.sleep(self.POLL_INTERVAL)
 
-            self.stop_monitoring(order_id)
+            self.stop_monitoring(order_id, stop_flag)
 
         t = threading.Thread(target=run, daemon=True, name=f"monitor-ts-{order_id}")
         t.start()
@@ -562,7 +728,10 @@ class OrderMonitor:
         with self._lock:
             if key in self._monitors:
                 return
-            stop_flag = {'stop': False}
+            # pending_tsl_dict keeps the status, so a restart resumes where it was
+            stop_flag = self._new_flag(
+                'tsl', 'waiting_fill', self.POLL_INTERVAL,
+                lambda: self.monitor_tsl(order_id, config, get_client_fn, pending_tsl_dict))
             self._monitors[key] = stop_flag
 
         fill_timeout = config.get('fill_timeout', 15)
@@ -574,6 +743,7 @@ class OrderMonitor:
             trigger_elapsed = 0
 
             logger.info(f"[Monitor] TSL monitoring started for order {order_id}")
+            self._timeline.mark(order_id, 'monitor_started', 'tsl')
             self._emit({
                 'type': 'monitoring_started',
                 'order_id': order_id,
@@ -582,6 +752,8 @@ class OrderMonitor:
             })
 
             while not stop_flag['stop']:
+                stop_flag['state'] = state
+                stop_flag['progress'] = time.monotonic()
                 try:
                     tsl = pending_tsl_dict.get(order_id)
                     if not tsl:
@@ -598,9 +770,9 @@ class OrderMonitor:
                             continue
 
                         try:
-                            all_orders = client.get_orders(config['account_id_key'], status=None)
+                            all_orders = self._fetch_orders(client, config, order_id)
                         except Exception as api_err:
-                            if '500' in str(api_err) or 'not currently available' in str(api_err):
+                            if is_transient(api_err):
                                 fill_elapsed += 1
                                 self._emit({
                                     'type': 'tsl_status',
@@ -664,7 +836,7 @@ class OrderMonitor:
                                 continue
                             raise
 
-                        filled, fill_price = self._check_order_filled(all_orders, order_id)
+                        filled, fill_price = self._check_order_filled(all_orders, order_id, 'tsl')
 
                         if filled and fill_price:
                             # Calculate trigger price
@@ -756,34 +928,27 @@ class OrderMonitor:
                             })
                             break
 
-                        try:
-                            quote = client.get_quote(tsl['symbol'])
-                        except Exception as api_err:
-                            if '500' in str(api_err) or 'not currently available' in str(api_err):
-                                trigger_elapsed += 1
+                        quote = self._latest_quote(key, tsl['symbol'], get_client_fn)
+                        if quote is None:
+                            trigger_elapsed += 1
+                            self._emit({
+                                'type': 'tsl_status',
+                                'order_id': order_id,
+                                'state': 'waiting_trigger',
+                                'message': f'Waiting for trigger... ({trigger_elapsed}/{trigger_timeout}s)'
+                            })
+                            if trigger_elapsed >= trigger_timeout:
                                 self._emit({
-                                    'type': 'tsl_status',
+                                    'type': 'tsl_timeout',
                                     'order_id': order_id,
                                     'state': 'waiting_trigger',
-                                    'message': f'Waiting for trigger... ({trigger_elapsed}/{trigger_timeout}s)'
+                                    'message': 'Trigger timeout. Position open without trailing stop.'
                                 })
-                                if trigger_elapsed >= trigger_timeout:
-                                    self._emit({
-                                        'type': 'tsl_timeout',
-                                        'order_id': order_id,
-                                        'state': 'waiting_trigger',
-                                        'message': 'Trigger timeout. Position open without trailing stop.'
-                                    })
-                                    break
-                                time.sleep(self.POLL_INTERVAL)
-                                continue
-                            raise
+                                break
+                            time.sleep(self.POLL_INTERVAL)
+                            continue
 
-                        current_price = None
-                        if 'All' in quote:
-                            current_price = float(quote['All'].get('lastTrade', 0))
-                            if current_price == 0:
-                                current_price = float(quote['All'].get('bid', 0))
+                        current_price = quote.price
 
                         if not current_price:
                             time.sleep(self.POLL_INTERVAL)
@@ -792,7 +957,13 @@ class OrderMonitor:
                         trigger_price = tsl.get('trigger_price')
 
                         if current_price >= trigger_price:
-                            logger.info(f"[Monitor] TSL trigger reached for {order_id}: {current_price} >= {trigger_price}")
+                            if stop_flag['stop']:
+                                break  # replaced by a restarted monitor
+                            triggered_at = time.perf_counter()
+                            self._timeline.mark(order_id, 'trigger_reached', current_price)
+                            logger.info("[Monitor] TSL trigger reached for %s: %s >= %s",
+                                        order_id, current_price, trigger_price,
+                                        extra={'order_id': order_id, 'symbol': tsl['symbol'], 'strategy': 'tsl'})
 
                             # Calculate trail amount
                             trail_type = tsl.get('trail_type', 'dollar')
@@ -813,13 +984,18 @@ class OrderMonitor:
                                     'stopPrice': str(trail_amount),
                                     'stopLimitPrice': str(limit_offset)
                                 }
-                                preview = client.preview_order(tsl['account_id_key'], stop_order_data)
+                                self._timeline.mark(order_id, 'exit_preview_sent')
+                                preview = client.preview_order(tsl['account_id_key'], stop_order_data,
+                                                               intent=f'exit:{order_id}:tsl')
+                                self._timeline.mark(order_id, 'exit_preview_returned')
                                 result = client.place_order(
                                     tsl['account_id_key'], stop_order_data,
                                     preview_id=preview.get('preview_id'),
                                     client_order_id=preview.get('client_order_id')
                                 )
                                 stop_order_id = result.get('order_id')
+                                self._timeline.mark(order_id, 'exit_placed', stop_order_id)
+                                EXIT_PLACEMENT_SECONDS.observe(time.perf_counter() - triggered_at, ('tsl',))
 
                                 tsl['stop_order_id'] = stop_order_id
                                 tsl['trail_amount_used'] = trail_amount
@@ -832,11 +1008,13 @@ class OrderMonitor:
                                     'stop_order_id': stop_order_id,
                                     'current_price': current_price,
                                     'trigger_price': trigger_price,
-                                    'trail_amount': trail_amount
+                                    'trail_amount': trail_amount,
+                                    'timeline': self._timeline.compact(order_id)
                                 })
                                 break
                             except Exception as e:
-                                logger.error(f"[Monitor] Failed to place TSL stop: {e}")
+                                logger.error("[Monitor] Failed to place TSL stop: %s", e,
+                                             extra={'order_id': order_id, 'symbol': tsl['symbol'], 'strategy': 'tsl'})
                                 tsl['status'] = 'error'
                                 tsl['error'] = str(e)
                                 self._emit({
@@ -878,39 +1056,70 @@ class OrderMonitor:
 
                 time.sleep(self.POLL_INTERVAL)
 
-            self.stop_monitoring(order_id)
+            self.stop_monitoring(order_id, stop_flag)
 
         t = threading.Thread(target=run, daemon=True, name=f"monitor-tsl-{order_id}")
         t.start()
 
     # ==================== Helper Methods ====================
 
-    def _check_order_filled(self, all_orders, order_id):
+    def _fetch_orders(self, client, config, order_id):
+        """
+        Fetch orders for fill detection.
+
+        Uses the incremental order book: only OPEN orders (for the config's
+        symbol when known) are downloaded each poll, and the order is
+        resolved with one recent-orders fetch when it leaves OPEN.
+
+        The poll (upstream retries included) is bounded by POLL_DEADLINE so
+        one slow poll cannot hold up the next.
+        """
+        start = time.perf_counter()
+        try:
+            with deadline(self.POLL_DEADLINE):
+                orders = client.get_orders(
+                    config['account_id_key'], status=None, incremental=True,
+                    order_ids=[order_id], symbol=config.get('symbol')
+                )
+        except Exception:
+            self._timeline.mark(order_id, 'fill_poll_error', round((time.perf_counter() - start) * 1000, 1))
+            raise
+        self._timeline.mark(order_id, 'fill_poll', round((time.perf_counter() - start) * 1000, 1))
+        return orders
+
+    def _latest_quote(self, key, symbol, get_client_fn):
+        """
+        The symbol's latest quote from the quote hub, for a trigger check.
+
+        Subscribes the monitor (idempotent; stop_monitoring unsubscribes it)
+        and waits up to POLL_DEADLINE for the first quote. A quote older than
+        QUOTE_MAX_TICKS hub ticks counts as none, so a trigger never fires
+        on a price the hub stopped refreshing.
+
+        Returns:
+            Quote or None
+        """
+        self._quotes.subscribe(key, symbol, get_client_fn)
+        return self._quotes.latest(symbol, max_age=self._quotes.interval * self.QUOTE_MAX_TICKS,
+                                   wait=self.POLL_DEADLINE)
+
+    def _check_order_filled(self, all_orders, order_id, strategy=None):
         """
         Check if an order is fully filled.
         Returns (filled: bool, fill_price: float or None)
-        """
-        for order in all_orders:
-            if 'Orders' in order:
-                order = order['Orders']
-            if str(order.get('orderId')) != str(order_id):
-                continue
-
-            if 'OrderDetail' in order:
-                for detail in order['OrderDetail']:
-                    if 'Instrument' in detail:
-                        for inst in detail['Instrument']:
-                            filled_qty = int(inst.get('filledQuantity', 0))
-                            ordered_qty = int(inst.get('orderedQuantity', 0))
-                            if filled_qty > 0 and filled_qty >= ordered_qty:
-                                fill_price = None
-                                if inst.get('averageExecutionPrice'):
-                                    fill_price = float(inst['averageExecutionPrice'])
-                                elif inst.get('executedPrice'):
-                                    fill_price = float(inst['executedPrice'])
-                                return True, fill_price
-            break
 
+        With a strategy, a detected fill is marked on the order's timeline
+        and its detection lag (time since E*TRADE's executedTime) is
+        recorded in the fill detection histogram.
+        """
+        order = find_order(all_orders, order_id)
+        if order is not None and order.is_filled:
+            if strategy:
+                self._timeline.mark(order_id, 'fill_detected', order.fill_price)
+                if order.executed_time:
+                    lag = time.time() - order.executed_time / 1000
+                    FILL_DETECTION_SECONDS.observe(max(lag, 0.0), (strategy,))
+            return True, order.fill_price
         return False, None
 
     def _calc_profit_price(self, fill_price, offset_type, offset, opening_side):
@@ -926,8 +1135,8 @@ class OrderMonitor:
             else:
                 return fill_price * (1 - offset / 100)
 
-    def _place_exit_limit_order(self, client, config, fill_price, profit_price):
-        """Place a limit exit order (for profit targets)."""
+    def _place_exit_limit_order(self, client, config, fill_price, profit_price, order_id=None):
+        """Place a limit exit order (for profit targets), marking order_id's timeline."""
         opening_side = config['opening_side']
         closing_side = 'SELL' if opening_side in ['BUY', 'BUY_TO_COVER'] else 'BUY'
 
@@ -941,7 +1150,10 @@ class OrderMonitor:
         }
 
         try:
-            preview = client.preview_order(config['account_id_key'], order_data)
+            self._timeline.mark(order_id, 'exit_preview_sent')
+            preview = client.preview_order(config['account_id_key'], order_data,
+                                           intent=f'exit:{order_id}:profit' if order_id else None)
+            self._timeline.mark(order_id, 'exit_preview_returned')
             preview_id = preview.get('preview_id')
             if not preview_id:
                 return {'placed': False, 'error': 'Preview failed - no preview_id'}
@@ -951,10 +1163,15 @@ class OrderMonitor:
                 preview_id=preview_id,
                 client_order_id=preview.get('client_order_id')
             )
-            logger.info(f"[Monitor] Placed profit order for {config['symbol']} @ ${round(profit_price, 2)}")
+            self._timeline.mark(order_id, 'exit_placed', result.get('order_id'))
+            logger.info("[Monitor] Placed profit order for %s @ $%.2f", config['symbol'], profit_price,
+                        extra={'symbol': config['symbol'], 'account_id_key': config['account_id_key'],
+                               'strategy': 'profit_target'})
             return {'placed': True, 'order_id': result.get('order_id')}
         except Exception as e:
-            logger.error(f"[Monitor] Failed to place profit order: {e}")
+            logger.error("[Monitor] Failed to place profit order: %s", e,
+                         extra={'symbol': config['symbol'], 'account_id_key': config['account_id_key'],
+                                'strategy': 'profit_target'})
             return {'placed': False, 'error': str(e)}
 
     def _cancel_and_recheck(self, client, config, order_id, get_client_fn):
@@ -970,7 +1187,7 @@ class OrderMonitor:
                     time.sleep(2)
                     try:
                         c = get_client_fn()
-                        all_orders = c.get_orders(config['account_id_key'], status=None)
+                        all_orders = self._fetch_orders(c, config, order_id)
                         filled, fill_price = self._check_order_filled(all_orders, order_id)
                         if filled and fill_price:
                             return {'filled': True, 'fill_price': fill_price}
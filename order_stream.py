@@ -0,0 +1,186 @@
+"""
+Streaming Order Parsing for E*TRADE Orders Responses
+
+Fill detection only needs a handful of fields per order, but a full
+OrdersResponse (hundreds of orders late in the session, each with
+OrderDetail/Instrument/Product sub-objects) used to be decoded twice -
+once as response.text for logging and once by response.json() - and kept
+in memory as nested dicts.
+
+OrdersStreamParser consumes the body chunk by chunk as it arrives:
+
+1. Text before the "Order" array (marker, next) is buffered - it is tiny
+2. Each element of the array is decoded on its own, reduced to an
+   OrderFill tuple (or dropped if it is not one of the requested order
+   IDs), and released before the next one is read
+3. Text after the array is buffered for the pagination marker
+
+A page holding a single order may carry it as an object instead of a
+one-element array ("Order": {...}); it is read the same way.
+
+Peak memory is therefore one network chunk plus one order, regardless of
+how many orders the account has.
+"""
+import codecs
+import json
+import re
+from collections import namedtuple
+
+CHUNK_SIZE = 16384
+
+_ORDER_ARRAY = re.compile(r'"Order"\s*:\s*([\[{])')
+_MARKER = re.compile(r'"marker"\s*:\s*"([^"]*)"')
+_SEPARATORS = re.compile(r'[\s,]*')
+
+
+class OrderFill(namedtuple('OrderFill', [
+        'order_id', 'status', 'symbol',
+        'filled_quantity', 'ordered_quantity', 'average_execution_price',
+        'executed_time'])):
+    """Fill-relevant fields of one order (first leg only; executed_time in epoch ms)."""
+    __slots__ = ()
+
+    @property
+    def is_filled(self):
+        """True when the order is FULLY filled (partial fills don't count)."""
+        return bool(self.filled_quantity) and self.filled_quantity >= (self.ordered_quantity or 0)
+
+
+def fill_from_order(order):
+    """Reduce an order dict from the orders API to an OrderFill."""
+    if 'Orders' in order:
+        order = order['Orders']
+    details = order.get('OrderDetail') or [{}]
+    detail = details[0]
+    instruments = detail.get('Instrument') or [{}]
+    inst = instruments[0]
+    symbol = (inst.get('Product') or {}).get('symbol')
+
+    # executedPrice is the fallback E*TRADE uses on some order types
+    price = inst.get('averageExecutionPrice') or inst.get('executedPrice')
+
+    return OrderFill(
+        order.get('orderId'),
+        detail.get('status') or order.get('status'),
+        symbol.upper() if symbol else None,
+        int(inst.get('filledQuantity') or 0),
+        int(inst.get('orderedQuantity') or 0),
+        float(price) if price else None,
+        detail.get('executedTime')
+    )
+
+
+class OrdersStreamParser:
+    """
+    Incremental parser for an OrdersResponse body.
+
+    Usage:
+        parser = OrdersStreamParser(order_ids=[123])
+        for chunk in response.iter_content(CHUNK_SIZE):
+            parser.feed(chunk)
+        fills, marker = parser.close()
+    """
+
+    def __init__(self, order_ids=None):
+        self.order_ids = {str(o) for o in order_ids} if order_ids else None
+        self.fills = []
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._state = 'head'   # head -> orders | single -> tail
+        self._outside = []     # text outside the Order array (marker lives here)
+
+    def feed(self, chunk):
+        if isinstance(chunk, bytes):
+            chunk = self._utf8.decode(chunk)
+        self._buf += chunk
+
+        if self._state == 'head':
+            match = _ORDER_ARRAY.search(self._buf)
+            if not match:
+                return
+            self._outside.append(self._buf[:match.start()])
+            if match.group(1) == '[':
+                self._buf = self._buf[match.end():]
+                self._state = 'orders'
+            else:
+                self._buf = self._buf[match.start(1):]
+                self._state = 'single'
+
+        if self._state == 'orders':
+            self._read_orders()
+        elif self._state == 'single':
+            self._read_single()
+
+        if self._state == 'tail':
+            self._outside.append(self._buf)
+            self._buf = ''
+
+    def _read_orders(self):
+        buf = self._buf
+        pos = 0
+        while True:
+            pos = _SEPARATORS.match(buf, pos).end()
+            if pos >= len(buf):
+                self._buf = ''
+                return
+            if buf[pos] == ']':
+                self._buf = buf[pos + 1:]
+                self._state = 'tail'
+                return
+            try:
+                order, pos = self._decoder.raw_decode(buf, pos)
+            except ValueError:
+                # Element continues in the next chunk
+                self._buf = buf[pos:]
+                return
+            self._add(order)
+
+    def _read_single(self):
+        try:
+            order, pos = self._decoder.raw_decode(self._buf)
+        except ValueError:
+            # Order continues in the next chunk
+            return
+        self._add(order)
+        self._buf = self._buf[pos:]
+        self._state = 'tail'
+
+    def _add(self, order):
+        if 'Orders' in order:
+            order = order['Orders']
+        if self.order_ids is not None and str(order.get('orderId')) not in self.order_ids:
+            return
+        self.fills.append(fill_from_order(order))
+
+    def close(self):
+        """
+        Finish parsing.
+
+        Returns:
+            (fills, marker) - marker is None on the last page
+        """
+        self.feed(self._utf8.decode(b'', final=True))
+        if self._state == 'orders' or self._state == 'single':
+            raise ValueError("Truncated OrdersResponse: Order not terminated")
+        if self._state == 'head':
+            self._outside.append(self._buf)
+        match = _MARKER.search(''.join(self._outside))
+        return self.fills, (match.group(1) if match else None) or None
+
+
+def parse_order_fills(chunks, order_ids=None):
+    """
+    Stream-parse an OrdersResponse body.
+
+    Args:
+        chunks: Iterable of bytes/str pieces of the response body
+        order_ids: Only materialize these order IDs (None = all orders)
+
+    Returns:
+        (list of OrderFill, next_marker)
+    """
+    parser = OrdersStreamParser(order_ids)
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
@@ -0,0 +1,118 @@
+"""
+Per-Order Latency Timelines
+
+Records when each hop of an opening order's life happened, so a late
+exit can be explained from one place instead of grepping logs:
+
+    request_received -> preview_sent -> preview_returned -> place_sent ->
+    place_returned -> monitor_started -> fill_poll (each) -> fill_detected ->
+    [trigger_reached] -> exit_preview_sent -> exit_preview_returned ->
+    exit_placed -> sse_delivered
+
+Each hop is a (timestamp, event, detail) tuple appended to the order's
+list; detail is a small scalar (poll duration in ms, fill price, exit
+order id, SSE event type). Timelines are kept for the most recent
+MAX_ORDERS orders, each capped at MAX_EVENTS hops (a long confirmation
+wait keeps its first and most recent polls).
+
+Exposed at GET /api/orders/<id>/timeline and attached (as compact
+[event, offset_ms, detail] triples) to the filled / stop placed SSE events.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class OrderTimeline:
+    """Bounded store of per-order hop timestamps."""
+
+    MAX_ORDERS = 500
+    MAX_EVENTS = 128
+
+    def __init__(self):
+        self._timelines = OrderedDict()  # str(order_id) -> [(ts, event, detail)]
+        self._lock = threading.Lock()
+
+    def mark(self, order_id, event, detail=None, ts=None):
+        """Record one hop for an order (ts defaults to now)."""
+        self.extend(order_id, [(ts or time.time(), event, detail)])
+
+    def extend(self, order_id, hops):
+        """
+        Record several hops at once, e.g. the request-side hops collected
+        before E*TRADE assigned the order ID.
+
+        Args:
+            order_id: Opening order ID
+            hops: Iterable of (ts, event, detail) tuples
+        """
+        if order_id is None:
+            return
+        key = str(order_id)
+        with self._lock:
+            events = self._timelines.get(key)
+            if events is None:
+                events = self._timelines[key] = []
+                if len(self._timelines) > self.MAX_ORDERS:
+                    self._timelines.popitem(last=False)
+            events.extend(hops)
+            if len(events) > self.MAX_EVENTS:
+                # Keep the opening hops; drop the oldest of the rest
+                keep = self.MAX_EVENTS // 4
+                del events[keep:len(events) - (self.MAX_EVENTS - keep)]
+
+    def get(self, order_id):
+        """Copy of an order's hops, oldest first (None if unknown)."""
+        with self._lock:
+            events = self._timelines.get(str(order_id))
+            return list(events) if events is not None else None
+
+    def to_dict(self, order_id):
+        """Timeline with per-hop offsets from the first hop and from the previous one."""
+        events = self.get(order_id)
+        if not events:
+            return None
+        events.sort(key=lambda e: e[0])
+        start = prev = events[0][0]
+        hops = []
+        for ts, event, detail in events:
+            hops.append({
+                'event': event,
+                'timestamp': ts,
+                'since_start_ms': round((ts - start) * 1000, 1),
+                'since_prev_ms': round((ts - prev) * 1000, 1),
+                'detail': detail
+            })
+            prev = ts
+        return {
+            'order_id': str(order_id),
+            'started_at': start,
+            'total_ms': round((events[-1][0] - start) * 1000, 1),
+            'events': hops
+        }
+
+    def compact(self, order_id):
+        """[[event, offset_ms, detail], ...] for embedding in SSE events."""
+        events = self.get(order_id)
+        if not events:
+            return []
+        events.sort(key=lambda e: e[0])
+        start = events[0][0]
+        return [[event, round((ts - start) * 1000), detail] for ts, event, detail in events]
+
+    def stats(self):
+        with self._lock:
+            return {'orders': len(self._timelines),
+                    'events': sum(len(e) for e in self._timelines.values())}
+
+
+# Singleton instance
+_order_timeline = None
+
+
+def get_order_timeline():
+    """Get or create the singleton OrderTimeline instance."""
+    global _order_timeline
+    if _order_timeline is None:
+        _order_timeline = OrderTimeline()
+    return _order_timeline
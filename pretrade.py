@@ -0,0 +1,250 @@
+"""
+Pre-trade Checks
+
+Orders that E*TRADE is certain to reject (more shares than the buying power
+covers, selling more than is held, a stop on the wrong side of the market,
+bad price precision) used to be found out only after a preview round trip.
+The checker rejects them locally, in microseconds, before any network call:
+
+- format: symbol, action, term, quantity and price precision
+  (order_encoder.OrderRequest)
+- buying_power: a BUY costing more (quantity x limit price, else the ask)
+  than the account's buying power
+- position: SELL more than the long position, BUY_TO_COVER more than the
+  short position
+- stop_side: a sell stop at or above the last price, a buy stop at or below
+
+The data is what ETradeClient last fetched - balances, portfolio and quotes
+are recorded as they pass through, the checker makes no calls of its own.
+A rule whose data is missing or older than PRETRADE_SNAPSHOT_MAX_AGE /
+PRETRADE_QUOTE_MAX_AGE passes: stale data must never block an exit. Any
+order activity on an account (a place, a cancel, an order changing state in
+the order book) drops its snapshot, since balances and positions no longer
+match it. A balance or portfolio fetch that was in flight when that happened
+is not recorded (callers pass the version() taken before the fetch). For
+exit orders (intent 'exit:...') the position and stop_side rules only log
+a warning, since E*TRADE's portfolio can itself lag a fill.
+
+ETradeClient runs check() in preview_order and in place_order when there is
+no preview, so the order routes and every monitor exit path are covered.
+Rejections raise PretradeRejected (an OrderValidationError, 400 from the
+order routes) and are counted in pretrade_rejections_total{rule}.
+"""
+import logging
+import threading
+import time
+
+from config import PRETRADE_CHECKS, PRETRADE_SNAPSHOT_MAX_AGE, PRETRADE_QUOTE_MAX_AGE
+from etrade_models import _float
+from metrics import get_metrics
+from order_book import get_order_book
+from order_encoder import OrderRequest, OrderValidationError
+
+logger = logging.getLogger(__name__)
+
+PRETRADE_REJECTIONS = get_metrics().counter(
+    'pretrade_rejections_total',
+    'Orders rejected locally before any E*TRADE call',
+    ('rule',))
+
+# Rules that only warn for exits (intent 'exit:<order id>:<kind>'): a
+# position snapshot that lags a fill, or a price gap through the stop, must
+# not keep a monitor from closing or protecting a position
+_EXIT_ADVISORY_RULES = frozenset({'position', 'stop_side'})
+
+_BUYS = frozenset({'BUY', 'BUY_TO_COVER'})
+_STOPS = frozenset({'STOP', 'STOP_LIMIT'})
+
+
+class PretradeRejected(OrderValidationError):
+    """An order failed a pre-trade rule (see .rule)."""
+
+    def __init__(self, rule, message):
+        super().__init__(message)
+        self.rule = rule
+
+
+class PretradeChecker:
+    """Latest balance, positions and quotes, and the rules checked against them."""
+
+    def __init__(self, snapshot_max_age=PRETRADE_SNAPSHOT_MAX_AGE,
+                 quote_max_age=PRETRADE_QUOTE_MAX_AGE, enabled=PRETRADE_CHECKS):
+        self.snapshot_max_age = snapshot_max_age
+        self.quote_max_age = quote_max_age
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._buying_power = {}  # account_id_key -> (monotonic time, buying power)
+        self._positions = {}     # account_id_key -> (monotonic time, {symbol: (long, short)})
+        self._quotes = {}        # symbol -> (monotonic time, Quote)
+        self._generation = {}    # account_id_key -> invalidate() count
+        self.stats = {'checked': 0, 'rejected': 0, 'invalidated': 0, 'discarded': 0, 'advisory': 0}
+        get_order_book().add_listener(self._on_orders_changed)
+
+    # ==================== Data ====================
+
+    def version(self, account_id_key):
+        """Snapshot version to take before fetching a balance or portfolio (see observe_*)."""
+        return self._generation.get(account_id_key, 0)
+
+    def observe_balance(self, account_id_key, balance, version=None):
+        """
+        Record a Balance; margin buying power when the account has it, else cash.
+
+        Args:
+            version: version() from before the fetch; the balance is dropped if
+                     the account was invalidated since
+        """
+        buying_power = _float(balance.margin_buying_power)
+        if buying_power is None:
+            buying_power = _float(balance.cash_available)
+        with self._lock:
+            if self._outdated(account_id_key, version):
+                return
+            if buying_power is None:
+                self._buying_power.pop(account_id_key, None)
+            else:
+                self._buying_power[account_id_key] = (time.monotonic(), buying_power)
+
+    def observe_positions(self, account_id_key, positions, version=None):
+        """Record the account's Positions (the whole portfolio); version as for observe_balance."""
+        held = {}
+        for position in positions:
+            if not position.symbol:
+                continue
+            symbol = position.symbol.upper()
+            quantity = abs(_float(position.quantity) or 0)
+            long, short = held.get(symbol, (0, 0))
+            if position.position_type == 'SHORT':
+                short += quantity
+            else:
+                long += quantity
+            held[symbol] = (long, short)
+        with self._lock:
+            if self._outdated(account_id_key, version):
+                return
+            self._positions[account_id_key] = (time.monotonic(), held)
+
+    def observe_quote(self, quote):
+        """Record a Quote as the symbol's latest."""
+        if quote is not None and quote.symbol:
+            self._quotes[quote.symbol.upper()] = (time.monotonic(), quote)
+
+    def invalidate(self, account_id_key):
+        """Drop an account's balance and positions (its orders changed)."""
+        with self._lock:
+            self._generation[account_id_key] = self._generation.get(account_id_key, 0) + 1
+            dropped = (self._buying_power.pop(account_id_key, None) is not None,
+                       self._positions.pop(account_id_key, None) is not None)
+        if any(dropped):
+            self.stats['invalidated'] += 1
+
+    def _on_orders_changed(self, account_id_key, orders):
+        self.invalidate(account_id_key)
+
+    def _outdated(self, account_id_key, version):
+        # Under self._lock: the fetch started before an invalidate()
+        if version is None or self._generation.get(account_id_key, 0) == version:
+            return False
+        self.stats['discarded'] += 1
+        logger.debug(f"Discarded pre-trade snapshot for {account_id_key} fetched before an invalidation")
+        return True
+
+    def _fresh(self, entry, max_age):
+        if entry is None or time.monotonic() - entry[0] > max_age:
+            return None
+        return entry[1]
+
+    # ==================== Rules ====================
+
+    def check(self, account_id_key, order_data, intent=None):
+        """
+        Validate an order against the rules.
+
+        Args:
+            account_id_key: Account ID key
+            order_data: order_data dict (see ETradeClient._build_order_payload)
+            intent: The order's journal intent; for 'exit:...' the position
+                    and stop_side rules only warn
+
+        Returns:
+            The validated OrderRequest
+
+        Raises:
+            PretradeRejected: The order fails a rule
+        """
+        try:
+            order = OrderRequest.from_dict(order_data)
+        except OrderValidationError as e:
+            self._reject('format', str(e))
+        if not self.enabled:
+            return order
+        self.stats['checked'] += 1
+        exit_order = bool(intent) and intent.startswith('exit:')
+
+        quote = self._fresh(self._quotes.get(order.symbol), self.quote_max_age)
+        if order.action == 'BUY':
+            self._check_buying_power(account_id_key, order, quote)
+        elif order.action != 'SELL_SHORT':
+            self._check_position(account_id_key, order, exit_order)
+        if order.price_type in _STOPS and order.stop_price is not None and quote is not None:
+            self._check_stop_side(order, quote, exit_order)
+        return order
+
+    def _check_buying_power(self, account_id_key, order, quote):
+        buying_power = self._fresh(self._buying_power.get(account_id_key), self.snapshot_max_age)
+        if buying_power is None:
+            return
+        if order.limit_price is not None:
+            price = float(order.limit_price)
+        elif quote is not None:
+            price = quote.ask or quote.last_price
+        else:
+            return
+        if price and order.quantity * price > buying_power:
+            self._reject('buying_power', f"{order.quantity} {order.symbol} at ${price:.2f} "
+                                         f"(${order.quantity * price:,.2f}) exceeds buying power "
+                                         f"${buying_power:,.2f}")
+
+    def _check_position(self, account_id_key, order, exit_order=False):
+        positions = self._fresh(self._positions.get(account_id_key), self.snapshot_max_age)
+        if positions is None:
+            return
+        long, short = positions.get(order.symbol, (0, 0))
+        held, side = (short, 'short') if order.action == 'BUY_TO_COVER' else (long, 'long')
+        if order.quantity > held:
+            self._reject('position', f"{order.action} {order.quantity} {order.symbol} "
+                                     f"exceeds the {held:g} shares held {side}", exit_order)
+
+    def _check_stop_side(self, order, quote, exit_order=False):
+        last = quote.last_price
+        if not last:
+            return
+        stop = float(order.stop_price)
+        if order.action in _BUYS and stop <= last:
+            self._reject('stop_side', f"Buy stop {stop:.2f} must be above the last price {last:.2f}",
+                         exit_order)
+        if order.action not in _BUYS and stop >= last:
+            self._reject('stop_side', f"Sell stop {stop:.2f} must be below the last price {last:.2f}",
+                         exit_order)
+
+    def _reject(self, rule, message, exit_order=False):
+        if exit_order and rule in _EXIT_ADVISORY_RULES:
+            self.stats['advisory'] += 1
+            logger.warning(f"Pre-trade check ({rule}) failed for an exit order, sending it anyway: {message}")
+            return
+        self.stats['rejected'] += 1
+        PRETRADE_REJECTIONS.inc((rule,))
+        logger.warning(f"Pre-trade check rejected order ({rule}): {message}")
+        raise PretradeRejected(rule, message)
+
+
+# Singleton instance
+_pretrade_checker = None
+
+
+def get_pretrade_checker():
+    """Get or create the singleton PretradeChecker instance."""
+    global _pretrade_checker
+    if _pretrade_checker is None:
+        _pretrade_checker = PretradeChecker()
+    return _pretrade_checker
@@ -0,0 +1,204 @@
+"""
+On-Demand Sampling Profiler
+
+Statistical CPU profiler for production: a sampler snapshots the stack of
+every thread (sys._current_frames) at a fixed interval for N seconds and
+counts identical stacks. Nothing is instrumented and nothing runs between
+captures, so the app only pays while a capture is in progress (one stack
+walk per thread per sample).
+
+Output:
+    collapsed  - "thread;file:func;file:func count" lines, for flamegraph.pl,
+                 speedscope or inferno
+    speedscope - speedscope.app JSON, one sampled profile per thread
+
+Under gunicorn's gevent worker, threading is monkey-patched: the monitor-*
+and quote threads are greenlets sharing the main OS thread. The sampler
+therefore runs on a real OS thread (gevent's original start_new_thread),
+so it keeps sampling while a greenlet hogs the CPU; the main thread's stack
+is whichever greenlet is running, and its bottom frames (e.g.
+OrderMonitor.monitor_tsl.<locals>.run) identify the monitor.
+
+Served by GET /api/debug/profile (admin only).
+"""
+import os
+import sys
+import threading
+import time
+import _thread
+
+try:
+    from gevent import monkey
+except ImportError:
+    monkey = None
+
+MAX_SECONDS = 60          # stay well inside gunicorn's 120s worker timeout
+MIN_INTERVAL = 0.001
+DEFAULT_INTERVAL = 0.01   # 100 Hz
+
+
+def _native(module, name, default):
+    """The unpatched function when gevent has monkey-patched module."""
+    if monkey is not None and monkey.is_module_patched(module):
+        return monkey.get_original(module, name)
+    return default
+
+
+_start_native_thread = _native('_thread', 'start_new_thread', _thread.start_new_thread)
+_native_sleep = _native('time', 'sleep', time.sleep)
+_native_get_ident = _native('_thread', 'get_ident', _thread.get_ident)
+_MAIN_IDENT = _native_get_ident()  # imported by server.py on the main thread
+
+
+def _frame_name(code):
+    qualname = getattr(code, 'co_qualname', code.co_name)
+    return f'{os.path.basename(code.co_filename)}:{qualname}'
+
+
+class SamplingProfiler:
+    """
+    One capture of stack samples across all threads.
+
+    Usage:
+        profiler = SamplingProfiler(seconds=10)
+        profiler.start()
+        ... wait until profiler.done ...
+        text = profiler.collapsed()
+    """
+
+    def __init__(self, seconds, interval=DEFAULT_INTERVAL):
+        self.seconds = min(max(float(seconds), interval), MAX_SECONDS)
+        self.interval = max(float(interval), MIN_INTERVAL)
+        self.samples = 0
+        self.elapsed = 0.0
+        self.done = False
+        self.error = None
+        self._stacks = {}  # (thread name, (code, ...)) -> count
+
+    def start(self):
+        # Thread names are read here, not on the sampler: under gevent the
+        # threading module's locks must not be touched from a native thread
+        names = {t.ident: t.name for t in threading.enumerate()}
+        names[_MAIN_IDENT] = 'MainThread'
+        _start_native_thread(self._run, (names,))
+
+    def _run(self, names):
+        me = _native_get_ident()
+        stacks = self._stacks
+        start = time.perf_counter()
+        deadline = start + self.seconds
+        try:
+            while True:
+                now = time.perf_counter()
+                if now >= deadline:
+                    break
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    codes = []
+                    while frame is not None:
+                        codes.append(frame.f_code)
+                        frame = frame.f_back
+                    key = (names.get(ident, f'thread-{ident}'), tuple(reversed(codes)))
+                    stacks[key] = stacks.get(key, 0) + 1
+                self.samples += 1
+                # Schedule against the start time so walk cost doesn't skew the rate
+                delay = start + self.samples * self.interval - time.perf_counter()
+                if delay > 0:
+                    _native_sleep(delay)
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.elapsed = time.perf_counter() - start
+            self.done = True
+
+    def wait(self, poll=0.1):
+        """Block (cooperatively under gevent) until the capture finishes."""
+        while not self.done:
+            time.sleep(poll)
+
+    def _named_stacks(self):
+        names = {}
+        result = []
+        for (thread, codes), count in self._stacks.items():
+            frames = []
+            for code in codes:
+                name = names.get(code)
+                if name is None:
+                    name = names[code] = _frame_name(code)
+                frames.append(name)
+            result.append((thread, frames, count))
+        return result
+
+    def collapsed(self):
+        """Collapsed-stack text (Brendan Gregg format), heaviest stacks first."""
+        lines = [f"{';'.join([thread.replace(';', '_')] + frames)} {count}"
+                 for thread, frames, count in self._named_stacks()]
+        lines.sort(key=lambda line: -int(line.rsplit(' ', 1)[1]))
+        return '\n'.join(lines) + '\n'
+
+    def speedscope(self, name='etrade-trading'):
+        """speedscope.app file (sampled profiles, one per thread)."""
+        frames, index = [], {}
+        by_thread = {}
+        for thread, stack, count in self._named_stacks():
+            ids = []
+            for frame in stack:
+                i = index.get(frame)
+                if i is None:
+                    i = index[frame] = len(frames)
+                    file, _, func = frame.partition(':')
+                    frames.append({'name': func, 'file': file})
+                ids.append(i)
+            samples, weights = by_thread.setdefault(thread, ([], []))
+            samples.append(ids)
+            weights.append(count * self.interval)
+
+        profiles = []
+        for thread, (samples, weights) in sorted(by_thread.items()):
+            profiles.append({
+                'type': 'sampled',
+                'name': thread,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': samples,
+                'weights': weights
+            })
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'etrade-trading profiler.py',
+            'activeProfileIndex': 0,
+            'shared': {'frames': frames},
+            'profiles': profiles
+        }
+
+    def stats(self):
+        return {
+            'seconds': round(self.elapsed, 3),
+            'interval': self.interval,
+            'samples': self.samples,
+            'unique_stacks': len(self._stacks),
+            'error': self.error
+        }
+
+
+_capture_lock = threading.Lock()
+
+
+def capture(seconds, interval=DEFAULT_INTERVAL):
+    """
+    Run one capture and return the finished SamplingProfiler.
+
+    Returns None if another capture is already running (one at a time).
+    """
+    if not _capture_lock.acquire(blocking=False):
+        return None
+    try:
+        profiler = SamplingProfiler(seconds, interval)
+        profiler.start()
+        profiler.wait()
+        return profiler
+    finally:
+        _capture_lock.release()
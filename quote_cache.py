@@ -0,0 +1,105 @@
+"""
+Shared Quote Cache
+
+/api/quote/<symbol>, the BID/ASK limit price lookup in the order routes and
+the confirmation stop / TSL check-trigger routes each fetched the quote
+again, often for a symbol fetched well under a second before. The cache is
+shared by all of them, and every read states how old a quote it accepts:
+
+    cache = get_quote_cache()
+    quote = cache.get(client, 'AAPL', max_age=QUOTE_MAX_AGE_TRIGGER, consumer='trigger',
+                      detail=QUOTE_DETAIL_INTRADAY)
+
+A quote young enough, with at least the detail asked for (an ALL quote
+serves an INTRADAY read, not the other way round), is served from memory;
+otherwise it is fetched (and concurrent misses for the same symbol share
+one call). The quote hub stores every quote it polls, so symbols being
+watched or monitored are usually fresh already. Reads are counted in
+quote_cache_lookups_total{consumer,result}.
+"""
+import threading
+import time
+
+from etrade_models import QUOTE_DETAIL_ALL
+from metrics import get_metrics
+
+QUOTE_CACHE_LOOKUPS = get_metrics().counter(
+    'quote_cache_lookups_total',
+    'Quote reads served from the shared cache (hit) or fetched (miss)',
+    ('consumer', 'result'))
+
+
+class QuoteCache:
+    """Latest quote per symbol, read with a per-call staleness bound."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # symbol -> (monotonic time, Quote, detail)
+        self._loading = {}  # symbol -> Lock held by the fetching caller
+
+    def get(self, client, symbol, max_age, consumer, detail=QUOTE_DETAIL_ALL):
+        """
+        The symbol's quote, at most max_age seconds old.
+
+        Args:
+            client: ETradeClient used on a miss
+            symbol: Ticker symbol
+            max_age: Oldest quote (seconds) the caller accepts
+            consumer: Label for quote_cache_lookups_total ('ui', 'order', 'trigger')
+            detail: Quote detailFlag the caller needs (etrade_models.QUOTE_DETAILS)
+
+        Returns:
+            Quote or None
+        """
+        symbol = symbol.upper()
+        quote = self._fresh(symbol, max_age, detail)
+        if quote is not None:
+            QUOTE_CACHE_LOOKUPS.inc((consumer, 'hit'))
+            return quote
+
+        QUOTE_CACHE_LOOKUPS.inc((consumer, 'miss'))
+        with self._lock:
+            loading = self._loading.get(symbol)
+            if loading is None:
+                loading = self._loading[symbol] = threading.Lock()
+        with loading:
+            # Another caller may have fetched it while we waited
+            quote = self._fresh(symbol, max_age, detail)
+            if quote is not None:
+                return quote
+            # Stamped when the call is sent, so a quote's age is never understated
+            sent = time.monotonic()
+            quote = client.get_quote(symbol, as_model=True, detail=detail)
+            self.put(symbol, quote, sent, detail)
+            return quote
+
+    def put(self, symbol, quote, at=None, detail=QUOTE_DETAIL_ALL):
+        """Record a quote fetched elsewhere (the quote hub) as the symbol's latest."""
+        if quote is None:
+            return
+        at = time.monotonic() if at is None else at
+        symbol = symbol.upper()
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is None or entry[0] <= at:
+                self._entries[symbol] = (at, quote, detail)
+
+    def _fresh(self, symbol, max_age, detail):
+        entry = self._entries.get(symbol)
+        if entry is None or time.monotonic() - entry[0] > max_age:
+            return None
+        if entry[2] != detail and entry[2] != QUOTE_DETAIL_ALL:
+            return None
+        return entry[1]
+
+
+# Singleton instance
+_quote_cache = None
+
+
+def get_quote_cache():
+    """Get or create the singleton QuoteCache instance."""
+    global _quote_cache
+    if _quote_cache is None:
+        _quote_cache = QuoteCache()
+    return _quote_cache
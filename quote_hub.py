@@ -0,0 +1,231 @@
+"""
+Quote Subscription Hub
+
+The UI quote watch and the trailing stop / TSL monitors used to poll
+get_quote for their own symbol on their own threads (and the UI could
+watch only one symbol). The hub keeps reference-counted subscriptions
+instead: any number of owners (a UI watch, a monitor) subscribe to
+symbols, and one poller thread fetches every subscribed symbol with
+multi-symbol quote calls, BATCH_SIZE symbols per call, every
+QUOTE_HUB_INTERVAL seconds. Upstream calls scale with the number of symbol
+batches, not with the number of subscribers.
+
+Each quote is pushed to the subscribers' callbacks, stored in the shared
+quote cache (quote_cache.py) and kept as the symbol's latest, which
+monitors read with a staleness bound:
+
+    hub = get_quote_hub()
+    hub.subscribe('quote:AAPL', 'AAPL', get_client_fn, callback=on_quote, detail='ALL')
+    hub.subscribe(order_id, 'AAPL', get_client_fn)
+    quote = hub.latest('AAPL', max_age=6, wait=4)   # None if nothing that fresh
+    hub.unsubscribe(order_id)
+
+Monitors only need the last trade and bid/ask, so a subscription asks for
+INTRADAY detail unless it says otherwise (the UI watch asks for ALL). A
+symbol is fetched with ALL while any of its subscribers wants it, and each
+detail level is batched separately.
+
+The poller starts with the first subscription and exits when the last one
+is gone. A new symbol wakes it up, so the first quote doesn't wait a tick.
+"""
+import logging
+import threading
+import time
+
+from config import QUOTE_HUB_INTERVAL
+from etrade_models import QUOTE_DETAIL_ALL, QUOTE_DETAIL_INTRADAY
+from metrics import get_metrics
+from quote_cache import get_quote_cache
+from request_policy import deadline, is_transient
+
+logger = logging.getLogger(__name__)
+# The quote watch's sampled logger (LOG_SAMPLE), which the hub replaces
+quote_logger = logging.getLogger('order_monitor.quotes')
+
+QUOTE_HUB_CALLS = get_metrics().counter(
+    'quote_hub_calls_total',
+    'Multi-symbol quote calls made by the quote hub',
+    ('result',))
+
+
+class QuoteHub:
+    """Reference-counted quote subscriptions served by one batching poller."""
+
+    BATCH_SIZE = 25    # E*TRADE's limit of symbols per quote call
+    POLL_DEADLINE = 4  # seconds one tick's calls may take, retries included
+
+    def __init__(self, interval=QUOTE_HUB_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._updated = threading.Condition(self._lock)
+        self._subscribers = {}  # symbol -> {owner: (callback or None, detail)}
+        self._latest = {}       # symbol -> (monotonic time, Quote)
+        self._get_client = None
+        self._thread = None
+        self._wakeup = threading.Event()
+        self.stats = {'ticks': 0, 'calls': 0, 'errors': 0}
+
+    def subscribe(self, owner, symbol, get_client_fn, callback=None, detail=QUOTE_DETAIL_INTRADAY):
+        """
+        Subscribe owner to symbol (again: replaces its callback and detail).
+
+        Args:
+            owner: Who holds the subscription (a 'quote:SYM' watch, an order ID)
+            symbol: Ticker symbol
+            get_client_fn: Callable returning an authenticated ETradeClient
+            callback: Called with each new Quote (from the poller thread)
+            detail: Quote detailFlag the owner needs (etrade_models.QUOTE_DETAILS)
+        """
+        symbol = symbol.upper()
+        with self._lock:
+            owners = self._subscribers.setdefault(symbol, {})
+            # A new symbol, or one now wanting more detail, is fetched at once
+            wake = all(wanted != detail and wanted != QUOTE_DETAIL_ALL for _, wanted in owners.values())
+            owners[owner] = (callback, detail)
+            self._get_client = get_client_fn
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name='quote-hub')
+                self._thread.start()
+        if wake:
+            self._wakeup.set()
+
+    def unsubscribe(self, owner, symbol=None):
+        """Drop owner's subscription to symbol (all of its subscriptions when None)."""
+        with self._lock:
+            symbols = [symbol.upper()] if symbol else list(self._subscribers)
+            for sym in symbols:
+                owners = self._subscribers.get(sym)
+                if owners is None or owner not in owners:
+                    continue
+                del owners[owner]
+                if not owners:
+                    del self._subscribers[sym]
+                    self._latest.pop(sym, None)
+
+    def subscriptions(self):
+        """{symbol: subscriber count}."""
+        with self._lock:
+            return {symbol: len(owners) for symbol, owners in self._subscribers.items()}
+
+    def owned_symbols(self, owner):
+        """Symbols owner is subscribed to."""
+        with self._lock:
+            return sorted(symbol for symbol, owners in self._subscribers.items() if owner in owners)
+
+    def latest(self, symbol, max_age=None, wait=0):
+        """
+        The symbol's latest quote.
+
+        Args:
+            symbol: Ticker symbol (subscribed)
+            max_age: Seconds; an older quote counts as none
+            wait: Seconds to wait for a fresh enough quote if there is none yet
+
+        Returns:
+            Quote or None
+        """
+        symbol = symbol.upper()
+        expires = time.monotonic() + wait
+        with self._updated:
+            while True:
+                entry = self._latest.get(symbol)
+                if entry is not None and (max_age is None or time.monotonic() - entry[0] <= max_age):
+                    return entry[1]
+                left = expires - time.monotonic()
+                if left <= 0:
+                    return None
+                self._updated.wait(left)
+
+    def _run(self):
+        while True:
+            # Cleared before reading the symbols, so a subscription that
+            # arrives during the tick still wakes the next one
+            self._wakeup.clear()
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    return
+                batches = {}
+                for symbol in sorted(self._subscribers):
+                    wants = {detail for _, detail in self._subscribers[symbol].values()}
+                    detail = QUOTE_DETAIL_ALL if QUOTE_DETAIL_ALL in wants else QUOTE_DETAIL_INTRADAY
+                    batches.setdefault(detail, []).append(symbol)
+                get_client = self._get_client
+            self.stats['ticks'] += 1
+            try:
+                self._tick(get_client(), batches)
+            except Exception as e:
+                self.stats['errors'] += 1
+                quote_logger.error("[QuoteHub] Quote tick failed: %s", e)
+            self._wakeup.wait(self.interval)
+
+    def _tick(self, client, batches):
+        for detail, symbols in batches.items():
+            for i in range(0, len(symbols), self.BATCH_SIZE):
+                self._fetch(client, symbols[i:i + self.BATCH_SIZE], detail)
+
+    def _fetch(self, client, batch, detail):
+        self.stats['calls'] += 1
+        sent = time.monotonic()
+        try:
+            with deadline(self.POLL_DEADLINE):
+                quotes = client.get_quotes(batch, as_model=True, detail=detail)
+        except Exception as e:
+            self.stats['errors'] += 1
+            QUOTE_HUB_CALLS.inc(('error',))
+            if is_transient(e):
+                quote_logger.debug("[QuoteHub] API error for %s, retrying next tick", ','.join(batch))
+            else:
+                quote_logger.error("[QuoteHub] Error fetching quotes for %s: %s", ','.join(batch), e)
+            return
+        QUOTE_HUB_CALLS.inc(('ok',))
+        self._publish(batch, quotes, sent, detail)
+
+    def _publish(self, batch, quotes, sent, detail):
+        # Keyed by the symbol E*TRADE returned: a dropped, substituted or
+        # reordered symbol must never file one ticker's price under another.
+        # Position is only used for a quote without a Product symbol.
+        requested = set(batch)
+        positional = len(quotes) == len(batch)
+        pairs = []
+        for i, quote in enumerate(quotes):
+            if quote.symbol:
+                symbol = quote.symbol.upper()
+            elif positional:
+                symbol = batch[i]
+                quote = quote._replace(symbol=symbol)
+            else:
+                continue
+            if symbol not in requested:
+                quote_logger.warning("[QuoteHub] Got a quote for %s, which was not requested (%s)",
+                                     symbol, ','.join(batch))
+                continue
+            pairs.append((symbol, quote))
+        cache = get_quote_cache()
+        deliveries = []
+        with self._updated:
+            for symbol, quote in pairs:
+                cache.put(symbol, quote, sent, detail)
+                owners = self._subscribers.get(symbol)
+                if not owners:
+                    continue
+                self._latest[symbol] = (sent, quote)
+                deliveries.extend((callback, quote) for callback, _ in owners.values() if callback)
+            self._updated.notify_all()
+        for callback, quote in deliveries:
+            try:
+                callback(quote)
+            except Exception as e:
+                logger.error(f"[QuoteHub] Subscriber callback failed for {quote.symbol}: {e}")
+
+
+# Singleton instance
+_quote_hub = None
+
+
+def get_quote_hub():
+    """Get or create the singleton QuoteHub instance."""
+    global _quote_hub
+    if _quote_hub is None:
+        _quote_hub = QuoteHub()
+    return _quote_hub
@@ -0,0 +1,76 @@
+"""
+E*TRADE Request Budget
+
+Token bucket over all upstream calls: tokens refill at ETRADE_RATE_LIMIT per
+second up to ETRADE_RATE_BURST. Regular calls never wait - they are charged
+with consume() (the bucket may go into debt) so the bucket reflects real
+traffic. Optional extra traffic (hedged requests, see request_policy.py)
+uses try_acquire() and only goes out when there is spare capacity.
+
+    limiter = get_rate_limiter()
+    limiter.consume()              # before each regular call
+    if limiter.try_acquire():      # before each optional call
+        ...
+"""
+import threading
+import time
+
+from config import ETRADE_RATE_LIMIT, ETRADE_RATE_BURST
+
+
+class RateLimiter:
+    """
+    Token bucket.
+
+    Args:
+        rate: Tokens added per second
+        burst: Bucket capacity (and the most debt consume() can build up)
+    """
+
+    def __init__(self, rate=ETRADE_RATE_LIMIT, burst=ETRADE_RATE_BURST):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.stats = {'consumed': 0, 'acquired': 0, 'denied': 0}
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def consume(self, tokens=1):
+        """Charge a call that goes out regardless of the budget."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = max(self._tokens - tokens, -self.burst)
+            self.stats['consumed'] += 1
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available; False (nothing taken) when over budget."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < tokens:
+                self.stats['denied'] += 1
+                return False
+            self._tokens -= tokens
+            self.stats['acquired'] += 1
+            return True
+
+    def tokens(self):
+        """Tokens currently available (negative while in debt)."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+
+# Singleton instance
+_rate_limiter = None
+
+
+def get_rate_limiter():
+    """Get or create the singleton RateLimiter (configured from the environment)."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
@@ -0,0 +1,386 @@
+"""
+E*TRADE Request Policy
+
+One place decides how long an upstream call may take and whether a failed
+call is tried again, instead of each caller sleeping and looping on its own:
+
+- Timeouts: every call gets (connect, read) timeouts; the read timeout is
+  cut down to whatever is left of the caller's deadline
+- Deadlines: a caller bounds all the calls it makes, retries and backoff
+  included, with `with deadline(seconds):` (fill polls get their poll
+  budget, API requests get API_REQUEST_DEADLINE). Deadlines nest - the
+  inner one can only shorten the outer. A call that would start past the
+  deadline raises DeadlineExceeded instead
+- Retries: transient failures (connection errors, timeouts, 429, 5xx,
+  "not currently available") are retried with full-jitter exponential
+  backoff, never sleeping past the deadline. Only idempotent calls are
+  retried on any transient failure: GETs, cancels and previews. A place
+  may already have been executed when its response was lost, so it is
+  retried only if the request never reached E*TRADE (connect failures) -
+  unless the caller marks it idempotent
+- Hedging (opt-in, ETRADE_HEDGE_READS): a hedged read whose first request
+  has not answered by the endpoint's observed p90 (ETRADE_HEDGE_PERCENTILE)
+  sends a second identical request and takes whichever answers first. A
+  hedge is only sent while the request budget (rate_limiter.py) has spare
+  tokens; fired / won / denied hedges are counted in
+  etrade_hedged_requests_total
+
+The deadline lives in a ContextVar like server_timing's request timing:
+monitor threads (greenlets under gevent) start without one. A hedged read's
+calls run on pooled worker threads in a copy of the caller's context, so
+they see its deadline and record into its Server-Timing.
+
+    with deadline(4):
+        orders = client.get_orders(...)   # retried within 4s total
+"""
+import contextvars
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from requests.exceptions import ConnectionError, ConnectTimeout, Timeout
+
+from config import (
+    ETRADE_CONNECT_TIMEOUT, ETRADE_READ_TIMEOUT,
+    ETRADE_RETRY_ATTEMPTS, ETRADE_RETRY_BASE_DELAY, ETRADE_RETRY_MAX_DELAY,
+    ETRADE_HEDGE_READS, ETRADE_HEDGE_PERCENTILE, ETRADE_HEDGE_MIN_DELAY
+)
+from metrics import ETRADE_HEDGED_REQUESTS
+from rate_limiter import get_rate_limiter
+
+_deadline = contextvars.ContextVar('request_deadline', default=None)
+
+_TRANSIENT_STATUS = re.compile(r'API Error \((429|5\d\d)\)')
+# Connection failures raised before anything was sent
+_NOT_SENT = ('NewConnectionError', 'NameResolutionError', 'Failed to establish a new connection')
+
+# Never start a call with less than this left of the deadline
+MIN_CALL_SECONDS = 0.05
+
+
+class DeadlineExceeded(Exception):
+    """The caller's deadline passed before the call could (re)start."""
+
+
+# ==================== Deadlines ====================
+
+@contextmanager
+def deadline(seconds):
+    """Bound every upstream call made inside the block to `seconds` from now."""
+    expires = time.monotonic() + seconds
+    outer = _deadline.get()
+    if outer is not None and outer < expires:
+        expires = outer
+    token = _deadline.set(expires)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def begin(seconds):
+    """Start a deadline for the current request (see server.py's request hooks)."""
+    _deadline.set(time.monotonic() + seconds)
+
+
+def finish():
+    """Clear the current request's deadline."""
+    _deadline.set(None)
+
+
+def remaining():
+    """Seconds left before the current deadline (None when there is none)."""
+    expires = _deadline.get()
+    if expires is None:
+        return None
+    return expires - time.monotonic()
+
+
+def timeout():
+    """
+    (connect, read) timeouts for the next call, shortened to the deadline.
+
+    Raises:
+        DeadlineExceeded: Less than MIN_CALL_SECONDS left
+    """
+    left = remaining()
+    if left is None:
+        return ETRADE_CONNECT_TIMEOUT, ETRADE_READ_TIMEOUT
+    if left < MIN_CALL_SECONDS:
+        raise DeadlineExceeded(f"Deadline exceeded ({-left:.2f}s ago)" if left < 0
+                               else "Deadline exceeded")
+    return min(ETRADE_CONNECT_TIMEOUT, left), min(ETRADE_READ_TIMEOUT, left)
+
+
+# ==================== Error classification ====================
+
+def is_transient(error):
+    """True for failures worth trying again later (upstream or network trouble)."""
+    if isinstance(error, (ConnectionError, Timeout, DeadlineExceeded)):
+        return True
+    message = str(error)
+    return bool(_TRANSIENT_STATUS.search(message)) or 'not currently available' in message
+
+
+def was_sent(error):
+    """False only when the request certainly never reached E*TRADE."""
+    if isinstance(error, ConnectTimeout):
+        return False
+    if isinstance(error, ConnectionError):
+        message = str(error)
+        return not any(marker in message for marker in _NOT_SENT)
+    return True
+
+
+def retry_reason(error):
+    """Short label for the retries metric."""
+    if isinstance(error, Timeout):
+        return 'timeout'
+    if isinstance(error, ConnectionError):
+        return 'connection'
+    match = _TRANSIENT_STATUS.search(str(error))
+    if match:
+        return match.group(1)
+    return 'unavailable'
+
+
+# ==================== Retries ====================
+
+class RetryPolicy:
+    """
+    Jittered exponential backoff over a bounded number of attempts.
+
+    Args:
+        attempts: Tries per call, the first included
+        base_delay: Backoff ceiling before the first retry (seconds)
+        max_delay: Largest backoff ceiling (seconds)
+    """
+
+    def __init__(self, attempts=ETRADE_RETRY_ATTEMPTS, base_delay=ETRADE_RETRY_BASE_DELAY,
+                 max_delay=ETRADE_RETRY_MAX_DELAY):
+        self.attempts = max(int(attempts), 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt):
+        """Full jitter: uniform in [0, min(max_delay, base_delay * 2**(attempt - 1))]."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def should_retry(self, error, attempt, idempotent):
+        """Whether to try again after attempt number `attempt` failed with error."""
+        if attempt >= self.attempts or isinstance(error, DeadlineExceeded):
+            return False
+        if not is_transient(error):
+            return False
+        return idempotent or not was_sent(error)
+
+    def sleep_before(self, attempt):
+        """
+        Back off before retry number `attempt`.
+
+        Returns:
+            False (without sleeping) if the backoff would end past the deadline
+        """
+        delay = self.backoff(attempt)
+        left = remaining()
+        if left is not None and delay + MIN_CALL_SECONDS > left:
+            return False
+        time.sleep(delay)
+        return True
+
+
+# Singleton instance
+_policy = None
+
+
+def get_retry_policy():
+    """Get or create the singleton RetryPolicy (configured from the environment)."""
+    global _policy
+    if _policy is None:
+        _policy = RetryPolicy()
+    return _policy
+
+
+# ==================== Hedging ====================
+
+class LatencyTracker:
+    """
+    Recent successful call latencies per endpoint label, and the hedge
+    delay derived from them (recomputed every RECOMPUTE_EVERY samples so
+    recording stays one deque append).
+    """
+
+    WINDOW = 256
+    MIN_SAMPLES = 20
+    RECOMPUTE_EVERY = 16
+
+    def __init__(self, percentile=ETRADE_HEDGE_PERCENTILE, min_delay=ETRADE_HEDGE_MIN_DELAY):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self._samples = {}  # label -> deque of seconds
+        self._delays = {}   # label -> cached hedge delay
+        self._counts = {}   # label -> samples since the last recompute
+
+    def observe(self, label, seconds):
+        samples = self._samples.get(label)
+        if samples is None:
+            samples = self._samples.setdefault(label, deque(maxlen=self.WINDOW))
+        samples.append(seconds)
+        count = self._counts.get(label, 0) + 1
+        if count >= self.RECOMPUTE_EVERY and len(samples) >= self.MIN_SAMPLES:
+            ordered = sorted(samples)
+            index = min(int(len(ordered) * self.percentile), len(ordered) - 1)
+            self._delays[label] = max(ordered[index], self.min_delay)
+            count = 0
+        self._counts[label] = count
+
+    def hedge_delay(self, label):
+        """Seconds to wait before hedging (None until enough samples are seen)."""
+        return self._delays.get(label)
+
+    def snapshot(self):
+        return {label: {'samples': len(samples), 'hedge_delay_ms': round(self._delays[label] * 1000, 1)
+                        if label in self._delays else None}
+                for label, samples in list(self._samples.items())}
+
+
+_latency = LatencyTracker()
+
+
+def observe_latency(label, seconds):
+    """Record a successful call's latency (feeds the hedge delay)."""
+    _latency.observe(label, seconds)
+
+
+def get_latency_tracker():
+    return _latency
+
+
+class _WorkerPool:
+    """
+    Reusable daemon threads for hedged calls.
+
+    A task goes to an idle worker, or to a new one when none is idle - it
+    never waits in a queue behind other calls. Workers idle for
+    IDLE_SECONDS exit.
+    """
+
+    IDLE_SECONDS = 60
+
+    def __init__(self):
+        self._idle = []  # inboxes of idle workers
+        self._lock = threading.Lock()
+        self.stats = {'started': 0, 'reused': 0}
+
+    def submit(self, fn, *args):
+        # Copied per task: one Context can't be entered by two threads at once
+        task = (contextvars.copy_context(), fn, args)
+        with self._lock:
+            inbox = self._idle.pop() if self._idle else None
+        if inbox is None:
+            self.stats['started'] += 1
+            inbox = queue.Queue()
+            threading.Thread(target=self._work, args=(inbox,), daemon=True, name='hedge-worker').start()
+        else:
+            self.stats['reused'] += 1
+        inbox.put(task)
+
+    def _work(self, inbox):
+        while True:
+            try:
+                context, fn, args = inbox.get(timeout=self.IDLE_SECONDS)
+            except queue.Empty:
+                with self._lock:
+                    if inbox in self._idle:
+                        self._idle.remove(inbox)
+                        return
+                # Handed a task just as the wait timed out
+                continue
+            context.run(fn, *args)
+            with self._lock:
+                self._idle.append(inbox)
+
+
+_workers = _WorkerPool()
+
+
+def hedged(fn, label, discard=None, enabled=ETRADE_HEDGE_READS):
+    """
+    Call fn(), sending an identical second call if the first is slow.
+
+    Only for idempotent reads: both calls may reach E*TRADE.
+
+    Args:
+        fn: Callable making one upstream call. The hedge is called as
+            fn(True): hedged() has already taken its request-budget token,
+            so fn must not charge it again. The first call is fn(False)
+        label: Endpoint label (metrics.endpoint_label) for the hedge delay
+        discard: Called with the losing call's result (e.g. close a
+                 streamed response)
+        enabled: Hedge at all (defaults to ETRADE_HEDGE_READS)
+
+    Returns:
+        The first successful result; raises the last error if both fail
+    """
+    delay = _latency.hedge_delay(label) if enabled else None
+    if delay is None:
+        return fn(False)
+
+    results = queue.Queue()
+    lock = threading.Lock()
+    claimed = [False]
+
+    def run(is_hedge):
+        try:
+            value, error = fn(is_hedge), None
+        except BaseException as e:
+            value, error = None, e
+        with lock:
+            lost = claimed[0]
+            if not lost and error is None:
+                claimed[0] = True
+        if lost:
+            if error is None and discard is not None:
+                discard(value)
+            return
+        results.put((is_hedge, value, error))
+
+    _workers.submit(run, False)
+    pending = 1
+    left = remaining()
+    try:
+        first = results.get(timeout=delay if left is None else max(min(delay, left), 0))
+    except queue.Empty:
+        first = None
+        if get_rate_limiter().try_acquire():
+            ETRADE_HEDGED_REQUESTS.inc((label, 'fired'))
+            _workers.submit(run, True)
+            pending = 2
+        else:
+            ETRADE_HEDGED_REQUESTS.inc((label, 'denied'))
+
+    # Each call is bounded by its own timeouts, so these gets return
+    while True:
+        is_hedge, value, error = first if first is not None else results.get()
+        first = None
+        pending -= 1
+        if error is None:
+            if is_hedge:
+                ETRADE_HEDGED_REQUESTS.inc((label, 'won'))
+            return value
+        if pending == 0:
+            raise error
+
+
+def hedge_stats():
+    """{endpoint: {fired, won, denied, win_ratio}} for diagnostics."""
+    stats = {}
+    for _, (label, outcome), count in ETRADE_HEDGED_REQUESTS.samples():
+        stats.setdefault(label, {'fired': 0, 'won': 0, 'denied': 0})[outcome] = count
+    for entry in stats.values():
+        entry['win_ratio'] = round(entry['won'] / entry['fired'], 3) if entry['fired'] else 0.0
+    return stats
@@ -5,27 +5,101 @@ A simple web-based trading interface for E*TRADE
 """
 import os
 import json
+import time
 import logging
 import secrets
+import resource
+from functools import wraps
 from datetime import datetime
 from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response
-from config import SECRET_KEY, USE_SANDBOX
+from flask.json.provider import DefaultJSONProvider
+import codec
+import server_timing
+from config import (SECRET_KEY, USE_SANDBOX, API_REQUEST_DEADLINE, ACCOUNT_SUMMARY_WORKERS,
+                    QUOTE_MAX_AGE_UI, QUOTE_MAX_AGE_ORDER, QUOTE_MAX_AGE_TRIGGER,
+                    ADMIN_TOKEN, ADMIN_OPEN_DIAGNOSTICS, SSE_LOAD_MAX_RATE, SSE_LOAD_MAX_DURATION,
+                    SSE_LOAD_MAX_PAYLOAD_BYTES)
 from etrade_client import ETradeClient
+from etrade_models import QUOTE_DETAIL_INTRADAY, find_order, _float
 from token_manager import get_token_manager
 from trailing_stop_manager import get_trailing_stop_manager, PendingTrailingStop, TrailingStopState
 from order_monitor import get_order_monitor
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+from quote_hub import get_quote_hub
+from quote_cache import get_quote_cache
+from order_timeline import get_order_timeline
+from order_journal import get_order_journal
+from order_encoder import OrderValidationError
+from account_cache import get_account_cache
+from fanout import fan_out
+from monitor_watchdog import get_monitor_watchdog
+from wire_trace import get_wire_trace
+from metrics import TOKEN_CACHE_LOOKUPS, get_metrics
+import request_policy
+from request_policy import is_transient
+from rate_limiter import get_rate_limiter
+from logging_setup import setup_logging
+import profiler
+
+# Configure logging (queue-based: formatting and I/O happen on a listener thread)
+setup_logging()
 logger = logging.getLogger(__name__)
 
+
+class CodecJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by codec (orjson when installed).
+
+    jsonify() bodies are encoded straight to bytes in one call. Keys are not
+    sorted and output is compact; types the codec doesn't know natively
+    (Decimal, date, ...) still go through Flask's default handler.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return codec.dumps_str(obj, default=self.default)
+
+    def loads(self, s, **kwargs):
+        return codec.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        start = time.perf_counter()
+        body = codec.dumps(obj, default=self.default)
+        server_timing.record('serialize', time.perf_counter() - start)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = CodecJSONProvider(app)
 app.secret_key = SECRET_KEY
 
+
+@app.before_request
+def start_server_timing():
+    """Collect per-step timings for this request's Server-Timing header."""
+    server_timing.begin()
+
+
+@app.after_request
+def add_server_timing(response):
+    """Server-Timing: token, client, each E*TRADE call, serialize, upstream count, total."""
+    timing = server_timing.finish()
+    if timing is not None:
+        response.headers['Server-Timing'] = timing.header()
+    return response
+
+
+@app.before_request
+def start_request_deadline():
+    """Bound the E*TRADE calls (retries included) made on behalf of one request."""
+    request_policy.begin(API_REQUEST_DEADLINE)
+
+
+@app.teardown_request
+def clear_request_deadline(exc):
+    request_policy.finish()
+
+
 # Basic Auth protection (set AUTH_USERNAME and AUTH_PASSWORD env vars to enable)
 AUTH_USERNAME = os.environ.get('AUTH_USERNAME')
 AUTH_PASSWORD = os.environ.get('AUTH_PASSWORD')
@@ -46,6 +120,26 @@ def require_basic_auth():
         {'WWW-Authenticate': 'Basic realm="Trading System"'}
     )
 
+
+def require_admin(view):
+    """
+    Require X-Admin-Token on diagnostic endpoints.
+
+    Fails closed: with no ADMIN_TOKEN configured the endpoints answer 404,
+    unless ADMIN_OPEN_DIAGNOSTICS opts out for local development.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if ADMIN_TOKEN:
+            supplied = request.headers.get('X-Admin-Token', '')
+            if not secrets.compare_digest(supplied, ADMIN_TOKEN):
+                return jsonify({'success': False, 'error': 'Admin token required'}), 403
+        elif not ADMIN_OPEN_DIAGNOSTICS:
+            return jsonify({'success': False, 'error': 'Not found'}), 404
+        return view(*args, **kwargs)
+    return wrapper
+
+
 # Store request tokens temporarily during auth flow
 _request_tokens = {}
 
@@ -305,6 +399,8 @@ def logout():
     """Logout and clear tokens"""
     token_manager = get_token_manager()
     token_manager.delete_tokens()
+    # The next session may be another E*TRADE user
+    get_account_cache().invalidate()
 
     return jsonify({
         'success': True,
@@ -321,17 +417,27 @@ def sse_events():
     Browser connects once and receives push events instead of polling.
     """
     monitor = get_order_monitor()
+    timeline = get_order_timeline()
 
     def generate():
         q = monitor.add_sse_client()
         try:
+            # Flush headers right away so the client sees the stream open
+            yield b": connected\n\n"
             while True:
                 try:
-                    event = q.get(timeout=30)
-                    yield f"data: {json.dumps(event)}\n\n"
+                    # Frames are encoded once in OrderMonitor._emit
+                    item = q.get(timeout=30)
                 except Exception:
                     # Send keepalive to prevent connection timeout
-                    yield ": keepalive\n\n"
+                    yield b": keepalive\n\n"
+                    continue
+                if isinstance(item, tuple):
+                    frame, order_id, event_type = item
+                    yield frame
+                    timeline.mark(order_id, 'sse_delivered', event_type)
+                else:
+                    yield item
         except GeneratorExit:
             pass
         finally:
@@ -355,7 +461,7 @@ def get_accounts():
     """Get list of accounts"""
     try:
         client = _get_authenticated_client()
-        accounts = client.get_accounts()
+        accounts = get_account_cache().accounts(client)
 
         # Simplify response
         result = []
@@ -375,30 +481,90 @@ def get_accounts():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/accounts/summary')
+def get_accounts_summary():
+    """
+    Balance and positions of every open account, with totals across them.
+
+    Balances and portfolios are fetched concurrently (fanout.py) through the
+    account cache. An account whose fetch fails is listed with its errors
+    and left out of the totals ('partial' is then true).
+    """
+    try:
+        client = _get_authenticated_client()
+        cache = get_account_cache()
+        accounts = [acc for acc in cache.accounts(client) if acc.get('accountIdKey')]
+
+        tasks = {}
+        for acc in accounts:
+            key = acc['accountIdKey']
+            tasks[(key, 'balance')] = lambda key=key: cache.balance(client, key)
+            tasks[(key, 'positions')] = lambda key=key: cache.portfolio(client, key)
+        parts = fan_out(tasks, workers=ACCOUNT_SUMMARY_WORKERS)
+
+        totals = {'net_account_value': 0.0, 'cash_available': 0.0, 'buying_power': 0.0,
+                  'market_value': 0.0}
+        exposure = {}
+        result = []
+        for acc in accounts:
+            key = acc['accountIdKey']
+            balance, positions = parts[(key, 'balance')], parts[(key, 'positions')]
+            errors = {name: str(part.error) for name, part in
+                      (('balance', balance), ('positions', positions)) if part.error is not None}
+            result.append({
+                'account_id': acc.get('accountId'),
+                'account_id_key': key,
+                'description': acc.get('accountDesc', '').strip(),
+                'balance': balance.value.to_dict() if balance.value is not None else None,
+                'positions': [pos.to_dict() for pos in positions.value or []],
+                'errors': errors
+            })
+            if errors:
+                continue
+
+            bal = balance.value
+            totals['net_account_value'] += _float(bal.net_account_value) or 0.0
+            totals['cash_available'] += _float(bal.cash_available) or 0.0
+            buying_power = _float(bal.margin_buying_power)
+            totals['buying_power'] += buying_power if buying_power is not None else (_float(bal.cash_available) or 0.0)
+            for pos in positions.value:
+                if not pos.symbol:
+                    continue
+                quantity = _float(pos.quantity) or 0.0
+                if pos.position_type == 'SHORT':
+                    quantity = -abs(quantity)
+                market_value = _float(pos.market_value) or 0.0
+                entry = exposure.setdefault(pos.symbol.upper(), {
+                    'symbol': pos.symbol.upper(), 'quantity': 0.0, 'market_value': 0.0, 'accounts': 0})
+                entry['quantity'] += quantity
+                entry['market_value'] += market_value
+                entry['accounts'] += 1
+                totals['market_value'] += market_value
+
+        partial = any(acc['errors'] for acc in result)
+        return jsonify({
+            'success': not result or not all(acc['errors'] for acc in result),
+            'partial': partial,
+            'accounts': result,
+            'totals': {name: round(value, 2) for name, value in totals.items()},
+            'exposure': sorted(({**e, 'market_value': round(e['market_value'], 2)} for e in exposure.values()),
+                               key=lambda e: -abs(e['market_value'])),
+            'timings_ms': {f'{key}:{name}': part.ms for (key, name), part in parts.items()}
+        })
+
+    except Exception as e:
+        logger.error(f"Get accounts summary failed: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @app.route('/api/accounts/<account_id_key>/balance')
 def get_balance(account_id_key):
     """Get account balance"""
     try:
         client = _get_authenticated_client()
-        balance = client.get_account_balance(account_id_key)
-
-        # Extract key balance info
-        result = {
-            'account_id': balance.get('accountId'),
-            'description': balance.get('accountDescription'),
-            'net_account_value': None,
-            'cash_available': None,
-            'margin_buying_power': None
-        }
-
-        if 'Computed' in balance:
-            comp = balance['Computed']
-            if 'RealTimeValues' in comp:
-                result['net_account_value'] = comp['RealTimeValues'].get('totalAccountValue')
-            result['cash_available'] = comp.get('cashBuyingPower')
-            result['margin_buying_power'] = comp.get('marginBuyingPower')
+        balance = get_account_cache().balance(client, account_id_key)
 
-        return jsonify({'success': True, 'balance': result})
+        return jsonify({'success': True, 'balance': balance.to_dict()})
 
     except Exception as e:
         logger.error(f"Get balance failed: {e}")
@@ -410,23 +576,11 @@ def get_portfolio(account_id_key):
     """Get portfolio positions"""
     try:
         client = _get_authenticated_client()
-        positions = client.get_portfolio(account_id_key)
+        positions = get_account_cache().portfolio(client, account_id_key)
 
-        # Simplify positions
-        result = []
-        for pos in positions:
-            # E*TRADE returns costPerShare directly - use it!
-            # pricePaid is actually the same as costPerShare (per-share cost)
-            # totalCost is the actual total cost
-            result.append({
-                'symbol': pos.get('symbolDescription'),
-                'quantity': pos.get('quantity'),
-                'cost_per_share': pos.get('costPerShare'),  # E*TRADE's field
-                'total_cost': pos.get('totalCost'),
-                'market_value': pos.get('marketValue'),
-                'total_gain': pos.get('totalGain'),
-                'last_price': pos.get('Quick', {}).get('lastTrade') if 'Quick' in pos else None
-            })
+        # E*TRADE returns costPerShare directly (pricePaid is the same per-share
+        # cost); totalCost is the actual total cost
+        result = [pos.to_dict() for pos in positions]
 
         return jsonify({'success': True, 'positions': result})
 
@@ -435,6 +589,51 @@ def get_portfolio(account_id_key):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/dashboard/<account_id_key>')
+def get_dashboard(account_id_key):
+    """
+    Balance, positions, open orders and quotes for held symbols in one call.
+
+    The parts are fetched concurrently (fanout.py); the quotes part waits
+    for the portfolio fetch it shares with the positions part. A part that
+    fails is reported in 'errors' and the others are still returned.
+    """
+    try:
+        client = _get_authenticated_client()
+        cache = get_account_cache()
+
+        def quotes():
+            symbols = sorted({pos.symbol.upper() for pos in cache.portfolio(client, account_id_key)
+                              if pos.symbol})
+            result = {}
+            # E*TRADE quotes up to 25 symbols per call
+            for i in range(0, len(symbols), 25):
+                for quote in client.get_quotes(symbols[i:i + 25], as_model=True):
+                    result[quote.symbol] = quote.to_dict()
+            return result
+
+        parts = fan_out({
+            'balance': lambda: cache.balance(client, account_id_key).to_dict(),
+            'positions': lambda: [pos.to_dict() for pos in cache.portfolio(client, account_id_key)],
+            'orders': lambda: [order.to_dict() for order in
+                               client.get_orders(account_id_key, 'OPEN', as_model=True)],
+            'quotes': quotes
+        })
+
+        errors = {name: str(part.error) for name, part in parts.items() if part.error is not None}
+        return jsonify({
+            'success': len(errors) < len(parts),
+            'account_id_key': account_id_key,
+            **{name: part.value for name, part in parts.items()},
+            'timings_ms': {name: part.ms for name, part in parts.items()},
+            'errors': errors
+        })
+
+    except Exception as e:
+        logger.error(f"Get dashboard failed: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 # ==================== MARKET API ====================
 
 @app.route('/api/quote/<symbol>')
@@ -442,58 +641,13 @@ def get_quote(symbol):
     """Get market quote for a symbol"""
     try:
         client = _get_authenticated_client()
-        quote = client.get_quote(symbol)
-
-        # Extract useful quote data
-        result = {
-            'symbol': symbol.upper(),
-            'last_price': None,
-            'bid': None,
-            'ask': None,
-            'bid_size': None,
-            'ask_size': None,
-            'change': None,
-            'change_percent': None,
-            'volume': None,
-            'high': None,
-            'low': None,
-            'open': None,
-            'previous_close': None
-        }
+        quote = get_quote_cache().get(client, symbol, QUOTE_MAX_AGE_UI, 'ui')
 
-        # Handle None response
+        # Handle None response (no QuoteData, e.g. an unknown symbol)
         if quote is None:
             return jsonify({'success': False, 'error': 'No quote data returned from API'}), 500
 
-        # Check for error in response
-        if isinstance(quote, dict):
-            if 'QuoteResponse' in quote and quote['QuoteResponse'] is not None:
-                qr = quote['QuoteResponse']
-                if 'Messages' in qr and qr['Messages'] is not None:
-                    if 'Message' in qr['Messages']:
-                        msg = qr['Messages']['Message']
-                        if isinstance(msg, list) and len(msg) > 0:
-                            return jsonify({'success': False, 'error': msg[0].get('description', 'Quote error')}), 500
-
-            if 'All' in quote and quote['All'] is not None:
-                all_data = quote['All']
-                result['last_price'] = all_data.get('lastTrade')
-                result['bid'] = all_data.get('bid')
-                result['ask'] = all_data.get('ask')
-                result['bid_size'] = all_data.get('bidSize')
-                result['ask_size'] = all_data.get('askSize')
-                result['change'] = all_data.get('changeClose')
-                result['change_percent'] = all_data.get('changeClosePercentage')
-                result['volume'] = all_data.get('totalVolume')
-                result['high'] = all_data.get('high')
-                result['low'] = all_data.get('low')
-                result['open'] = all_data.get('open')
-                result['previous_close'] = all_data.get('previousClose')
-
-            if 'Product' in quote and quote['Product'] is not None:
-                result['symbol'] = quote['Product'].get('symbol', symbol.upper())
-
-        return jsonify({'success': True, 'quote': result})
+        return jsonify({'success': True, 'quote': quote.to_dict()})
 
     except Exception as e:
         logger.error(f"Get quote failed: {e}")
@@ -513,12 +667,13 @@ def start_quote_watch(symbol):
 
 
 @app.route('/api/quote/watch', methods=['DELETE'])
-def stop_quote_watch():
-    """Stop streaming quotes."""
+@app.route('/api/quote/<symbol>/watch', methods=['DELETE'])
+def stop_quote_watch(symbol=None):
+    """Stop streaming quotes for a symbol (every watched symbol without one)."""
     try:
         monitor = get_order_monitor()
-        monitor.stop_quote_watch()
-        return jsonify({'success': True, 'watching': False})
+        monitor.stop_quote_watch(symbol)
+        return jsonify({'success': True, 'watching': monitor.watched_symbols()})
     except Exception as e:
         logger.error(f"Stop quote watch failed: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -553,12 +708,10 @@ def preview_order():
         # If using BID/ASK, fetch current quote
         limit_price_source = data.get('limitPriceSource', 'manual')
         if price_type == 'LIMIT' and limit_price_source in ['bid', 'ask']:
-            quote = client.get_quote(symbol)
-            if 'All' in quote:
-                if limit_price_source == 'bid':
-                    limit_price = quote['All'].get('bid')
-                else:
-                    limit_price = quote['All'].get('ask')
+            quote = get_quote_cache().get(client, symbol, QUOTE_MAX_AGE_ORDER, 'order',
+                                         QUOTE_DETAIL_INTRADAY)
+            if quote is not None:
+                limit_price = quote.bid if limit_price_source == 'bid' else quote.ask
 
             if not limit_price:
                 return jsonify({
@@ -594,6 +747,8 @@ def preview_order():
             }
         })
 
+    except OrderValidationError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Preview order failed: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -602,6 +757,8 @@ def preview_order():
 @app.route('/api/orders/place', methods=['POST'])
 def place_order():
     """Place an order (with automatic preview as required by E*TRADE)"""
+    # Request-side hops, recorded on the order's timeline once it has an ID
+    hops = [(time.time(), 'request_received', None)]
     try:
         client = _get_authenticated_client()
         data = request.get_json()
@@ -634,12 +791,10 @@ def place_order():
 
         # Fetch price if using BID/ASK
         if price_type == 'LIMIT' and limit_price_source in ['bid', 'ask']:
-            quote = client.get_quote(symbol)
-            if 'All' in quote:
-                if limit_price_source == 'bid':
-                    limit_price = quote['All'].get('bid')
-                else:
-                    limit_price = quote['All'].get('ask')
+            quote = get_quote_cache().get(client, symbol, QUOTE_MAX_AGE_ORDER, 'order',
+                                         QUOTE_DETAIL_INTRADAY)
+            if quote is not None:
+                limit_price = quote.bid if limit_price_source == 'bid' else quote.ask
 
             if not limit_price:
                 return jsonify({
@@ -663,17 +818,21 @@ def place_order():
         if skip_preview:
             # Place directly without preview
             logger.info(f"Placing order WITHOUT preview: {symbol} {side} {quantity} @ {price_type}")
+            hops.append((time.time(), 'place_sent', None))
             result = client.place_order(
                 account_id_key,
                 order_data,
                 preview_id=None,
                 client_order_id=None
             )
+            hops.append((time.time(), 'place_returned', None))
             preview_result = {}  # No preview data
         else:
             # STEP 1: Preview the order first (E*TRADE requirement)
             logger.info(f"Previewing order: {symbol} {side} {quantity} @ {price_type}")
+            hops.append((time.time(), 'preview_sent', None))
             preview_result = client.preview_order(account_id_key, order_data)
+            hops.append((time.time(), 'preview_returned', None))
 
             preview_id = preview_result.get('preview_id')
             client_order_id = preview_result.get('client_order_id')
@@ -685,14 +844,18 @@ def place_order():
 
             # STEP 2: Place the order with preview data
             logger.info(f"Placing order with preview_id={preview_id}")
+            hops.append((time.time(), 'place_sent', None))
             result = client.place_order(
                 account_id_key,
                 order_data,
                 preview_id=preview_id,
                 client_order_id=client_order_id
             )
+            hops.append((time.time(), 'place_returned', None))
 
         order_id = result.get('order_id')
+        # Before any monitor starts, so the timeline reads in order
+        get_order_timeline().extend(order_id, hops)
 
         # If profit offset is set, store the pending profit order
         if profit_offset_type and profit_offset and order_id:
@@ -771,6 +934,7 @@ def place_order():
                 order_id,
                 {
                     'account_id_key': account_id_key,
+                    'symbol': symbol,
                     'fill_timeout': trailing_stop.fill_timeout,
                     'confirmation_timeout': trailing_stop.confirmation_timeout
                 },
@@ -830,6 +994,7 @@ def place_order():
                 order_id,
                 {
                     'account_id_key': account_id_key,
+                    'symbol': symbol,
                     'fill_timeout': tsl_fill_timeout,
                     'trigger_timeout': tsl_trigger_timeout
                 },
@@ -855,6 +1020,8 @@ def place_order():
             }
         })
 
+    except OrderValidationError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Place order failed: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -867,35 +1034,10 @@ def get_orders(account_id_key):
         client = _get_authenticated_client()
         status = request.args.get('status', 'OPEN')
 
-        orders = client.get_orders(account_id_key, status)
+        orders = client.get_orders(account_id_key, status, as_model=True)
 
         # Simplify orders
-        result = []
-        for order in orders:
-            order_info = {
-                'order_id': order.get('orderId'),
-                'order_type': order.get('orderType'),
-                'status': None,
-                'symbol': None,
-                'action': None,
-                'quantity': None,
-                'price_type': None,
-                'limit_price': None
-            }
-
-            if 'OrderDetail' in order:
-                for detail in order['OrderDetail']:
-                    order_info['status'] = detail.get('status')
-                    order_info['price_type'] = detail.get('priceType')
-                    order_info['limit_price'] = detail.get('limitPrice')
-
-                    if 'Instrument' in detail:
-                        for inst in detail['Instrument']:
-                            order_info['symbol'] = inst.get('Product', {}).get('symbol')
-                            order_info['action'] = inst.get('orderAction')
-                            order_info['quantity'] = inst.get('orderedQuantity')
-
-            result.append(order_info)
+        result = [order.to_dict() for order in orders]
 
         return jsonify({'success': True, 'orders': result})
 
@@ -904,6 +1046,15 @@ def get_orders(account_id_key):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/orders/<order_id>/timeline')
+def order_timeline(order_id):
+    """Latency timeline of an opening order: request, preview/place, fill polls, exit, SSE delivery"""
+    timeline = get_order_timeline().to_dict(order_id)
+    if timeline is None:
+        return jsonify({'success': False, 'error': f'No timeline recorded for order {order_id}'}), 404
+    return jsonify({'success': True, 'timeline': timeline})
+
+
 @app.route('/api/orders/<account_id_key>/<order_id>/cancel', methods=['POST'])
 def cancel_order(account_id_key, order_id):
     """Cancel an order"""
@@ -1016,12 +1167,13 @@ def check_single_order_fill(account_id_key, order_id):
         all_orders = []
 
         try:
-            all_orders = client.get_orders(account_id_key, status=None)
+            all_orders = client.get_orders(account_id_key, status=None, incremental=True,
+                                           order_ids=[order_id], symbol=profit_order['symbol'])
             orders_checked.append(f"ALL:{len(all_orders)}")
             logger.info(f"Fetched {len(all_orders)} orders without status filter")
         except Exception as api_error:
             error_msg = str(api_error)
-            if '500' in error_msg or 'not currently available' in error_msg:
+            if is_transient(api_error):
                 logger.warning(f"E*TRADE API temporarily unavailable: {error_msg}")
                 return jsonify({
                     'success': True,
@@ -1031,39 +1183,17 @@ def check_single_order_fill(account_id_key, order_id):
                 })
             raise
 
-        for order in all_orders:
-            logger.debug(f"Checking order {order.get('orderId')} against {order_id}")
-            if str(order.get('orderId')) == str(order_id):
-                logger.info(f"Found order {order_id} in response")
-
-                if 'OrderDetail' in order:
-                    for detail in order['OrderDetail']:
-                        order_status = detail.get('status', '')
-                        logger.info(f"Order {order_id} status: {order_status}")
-
-                        if 'Instrument' in detail:
-                            for inst in detail['Instrument']:
-                                filled_qty = int(inst.get('filledQuantity', 0))
-                                ordered_qty = int(inst.get('orderedQuantity', 0))
-
-                                logger.info(f"Order {order_id}: filled_qty={filled_qty}, ordered_qty={ordered_qty}")
-
-                                # Only consider filled if FULLY filled (not partial)
-                                if filled_qty > 0 and filled_qty >= ordered_qty:
-                                    order_filled = True
-                                    logger.info(f"Order {order_id} FULLY filled!")
-
-                                    # Get fill price
-                                    if inst.get('averageExecutionPrice'):
-                                        fill_price = float(inst.get('averageExecutionPrice'))
-                                        logger.info(f"Fill price: {fill_price}")
-                                    elif inst.get('executedPrice'):
-                                        fill_price = float(inst.get('executedPrice'))
-                                        logger.info(f"Fill price: {fill_price}")
-                                    break
-                            if order_filled:
-                                break
-                break
+        order = find_order(all_orders, order_id)
+        if order is not None:
+            logger.info(f"Order {order_id} status: {order.status}")
+            for leg in order.legs:
+                logger.info(f"Order {order_id}: filled_qty={leg.filled_quantity}, ordered_qty={leg.ordered_quantity}")
+
+            # Only consider filled if FULLY filled (not partial)
+            if order.is_filled:
+                order_filled = True
+                fill_price = order.fill_price
+                logger.info(f"Order {order_id} FULLY filled! Fill price: {fill_price}")
 
         if not order_filled:
             return jsonify({
@@ -1122,7 +1252,8 @@ def check_single_order_fill(account_id_key, order_id):
 
         try:
             # Preview first
-            preview_result = client.preview_order(account_id_key, profit_order_data)
+            preview_result = client.preview_order(account_id_key, profit_order_data,
+                                                  intent=f'exit:{order_id}:profit')
             preview_id = preview_result.get('preview_id')
 
             if preview_id:
@@ -1191,7 +1322,7 @@ def check_fills_and_place_profits():
 
         # Get all orders (EXECUTED status to find fills)
         try:
-            executed_orders = client.get_orders(account_id_key, status='EXECUTED')
+            executed_orders = client.get_orders(account_id_key, status='EXECUTED', as_model=True)
         except Exception as e:
             logger.warning(f"Could not fetch executed orders: {e}")
             executed_orders = []
@@ -1211,18 +1342,9 @@ def check_fills_and_place_profits():
             checked_count += 1
 
             # Check if the opening order has been executed
-            order_filled = False
-            fill_price = None
-            for executed in executed_orders:
-                if str(executed.get('orderId')) == str(order_id):
-                    order_filled = True
-                    # Get fill price from OrderDetail
-                    if 'OrderDetail' in executed:
-                        for detail in executed['OrderDetail']:
-                            if detail.get('executedPrice'):
-                                fill_price = float(detail.get('executedPrice'))
-                                break
-                    break
+            executed = find_order(executed_orders, order_id)
+            order_filled = executed is not None
+            fill_price = executed.fill_price if executed is not None else None
 
             if order_filled:
                 # Calculate profit price from fill price + offset
@@ -1264,7 +1386,8 @@ def check_fills_and_place_profits():
 
                 try:
                     # Preview first
-                    preview_result = client.preview_order(account_id_key, profit_order_data)
+                    preview_result = client.preview_order(account_id_key, profit_order_data,
+                                                          intent=f'exit:{order_id}:profit')
                     preview_id = preview_result.get('preview_id')
 
                     if preview_id:
@@ -1377,7 +1500,8 @@ def check_trailing_stop_fill(opening_order_id):
 
         # First try without status filter (gets all recent orders)
         try:
-            all_orders = client.get_orders(ts.account_id_key, status=None)
+            all_orders = client.get_orders(ts.account_id_key, status=None, incremental=True,
+                                           order_ids=[opening_order_id], symbol=ts.symbol)
             orders_checked.append(f"ALL:{len(all_orders)}")
             logger.info(f"Fetched {len(all_orders)} orders without status filter")
         except Exception as api_error:
@@ -1385,10 +1509,10 @@ def check_trailing_stop_fill(opening_order_id):
             logger.warning(f"Failed to fetch orders without filter: {error_msg}")
             # Fall back to EXECUTED only
             try:
-                all_orders = client.get_orders(ts.account_id_key, status='EXECUTED')
+                all_orders = client.get_orders(ts.account_id_key, status='EXECUTED', as_model=True)
                 orders_checked.append(f"EXECUTED:{len(all_orders)}")
             except Exception as e2:
-                if '500' in str(e2) or 'not currently available' in str(e2):
+                if is_transient(e2):
                     return jsonify({
                         'success': True,
                         'filled': False,
@@ -1398,34 +1522,16 @@ def check_trailing_stop_fill(opening_order_id):
                     })
                 raise
 
-        for order in all_orders:
-            order_id = order.get('orderId')
-            logger.debug(f"Checking order {order_id} against {opening_order_id}")
-
-            if str(order_id) == str(opening_order_id):
-                logger.info(f"Found order {opening_order_id} in response")
-
-                if 'OrderDetail' in order:
-                    for detail in order['OrderDetail']:
-                        order_status = detail.get('status', '')
-                        logger.info(f"Order {opening_order_id} status: {order_status}")
-
-                        if 'Instrument' in detail:
-                            for inst in detail['Instrument']:
-                                filled_qty = int(inst.get('filledQuantity', 0))
-                                ordered_qty = int(inst.get('orderedQuantity', 0))
-
-                                logger.info(f"Order {opening_order_id}: filled_qty={filled_qty}, ordered_qty={ordered_qty}")
-
-                                # Only consider filled if FULLY filled (not partial)
-                                if filled_qty > 0 and filled_qty >= ordered_qty:
-                                    if inst.get('averageExecutionPrice'):
-                                        fill_price = float(inst.get('averageExecutionPrice'))
-                                        logger.info(f"Order {opening_order_id} FULLY filled at {fill_price}")
-                                        break
-                            if fill_price:
-                                break
-                break
+        order = find_order(all_orders, opening_order_id)
+        if order is not None:
+            logger.info(f"Order {opening_order_id} status: {order.status}")
+            for leg in order.legs:
+                logger.info(f"Order {opening_order_id}: filled_qty={leg.filled_quantity}, ordered_qty={leg.ordered_quantity}")
+
+            # Only consider filled if FULLY filled (not partial)
+            if order.is_filled:
+                fill_price = order.fill_price
+                logger.info(f"Order {opening_order_id} FULLY filled at {fill_price}")
 
         if fill_price:
             trailing_stop_manager.mark_filled(opening_order_id, fill_price)
@@ -1494,10 +1600,9 @@ def check_trailing_stop_confirmation(opening_order_id):
         client = _get_authenticated_client()
 
         # Get current price
-        quote = client.get_quote(ts.symbol)
-        current_price = None
-        if quote and 'All' in quote:
-            current_price = quote['All'].get('lastTrade')
+        quote = get_quote_cache().get(client, ts.symbol, QUOTE_MAX_AGE_TRIGGER, 'trigger',
+                                     QUOTE_DETAIL_INTRADAY)
+        current_price = quote.last_price if quote else None
 
         if not current_price:
             return jsonify({
@@ -1527,7 +1632,8 @@ def check_trailing_stop_confirmation(opening_order_id):
                     'limitPrice': str(stop_limit_price)
                 }
 
-                stop_preview = client.preview_order(ts.account_id_key, stop_order_data)
+                stop_preview = client.preview_order(ts.account_id_key, stop_order_data,
+                                                    intent=f'exit:{opening_order_id}:stop')
                 stop_result = client.place_order(
                     ts.account_id_key,
                     stop_order_data,
@@ -1607,14 +1713,8 @@ def check_trailing_stop_order(opening_order_id):
         client = _get_authenticated_client()
 
         # Check if stop order filled
-        orders = client.get_orders(ts.account_id_key, status='EXECUTED')
-        stop_filled = False
-
-        for order in orders:
-            order_id = order.get('orderId')
-            if str(order_id) == str(ts.stop_order_id):
-                stop_filled = True
-                break
+        orders = client.get_orders(ts.account_id_key, status='EXECUTED', as_model=True)
+        stop_filled = find_order(orders, ts.stop_order_id) is not None
 
         if stop_filled:
             trailing_stop_manager.mark_stop_filled(opening_order_id)
@@ -1719,12 +1819,13 @@ def check_trailing_stop_limit_fill(order_id):
         # Fetch ALL orders (no status filter) to find the order
         # Same pattern as working confirmation stop
         try:
-            all_orders = client.get_orders(tsl['account_id_key'], status=None)
+            all_orders = client.get_orders(tsl['account_id_key'], status=None, incremental=True,
+                                           order_ids=[order_id], symbol=tsl['symbol'])
             logger.info(f"TSL check-fill: Fetched {len(all_orders)} orders")
         except Exception as api_error:
             error_msg = str(api_error)
             logger.warning(f"TSL check-fill: API error fetching orders: {error_msg}")
-            if '500' in error_msg or 'not currently available' in error_msg:
+            if is_transient(api_error):
                 return jsonify({
                     'filled': False,
                     'api_error': True,
@@ -1734,48 +1835,22 @@ def check_trailing_stop_limit_fill(order_id):
 
         fill_price = None
         order_filled = False
-        found_order = False
 
         logger.info(f"TSL check-fill: Looking for order {order_id} in {len(all_orders)} orders")
 
-        for order in all_orders:
-            # Handle nested Orders structure
-            if 'Orders' in order:
-                order = order['Orders']
-
-            order_id_from_api = order.get('orderId')
-            if str(order_id_from_api) != str(order_id):
-                continue
-
-            found_order = True
-            logger.info(f"TSL check-fill: Found order {order_id}")
-
-            # Check OrderDetail -> Instrument for fill info (same structure as working confirmation stop)
-            if 'OrderDetail' in order:
-                for detail in order['OrderDetail']:
-                    status = detail.get('status', 'UNKNOWN')
-                    logger.info(f"TSL check-fill: Order {order_id} status={status}")
-
-                    if 'Instrument' in detail:
-                        for inst in detail['Instrument']:
-                            filled_qty = int(inst.get('filledQuantity', 0))
-                            ordered_qty = int(inst.get('orderedQuantity', 0))
-
-                            logger.info(f"TSL check-fill: Order {order_id} - ordered={ordered_qty}, filled={filled_qty}")
-
-                            # Only consider filled if FULLY filled (not partial)
-                            if filled_qty > 0 and filled_qty >= ordered_qty:
-                                order_filled = True
-                                if inst.get('averageExecutionPrice'):
-                                    fill_price = float(inst.get('averageExecutionPrice'))
-                                    logger.info(f"TSL check-fill: Order {order_id} FULLY filled at {fill_price}")
-                                    break
-                        if order_filled:
-                            break
-            break
-
-        if not found_order:
+        order = find_order(all_orders, order_id)
+        if order is None:
             logger.warning(f"TSL check-fill: Order {order_id} not found in orders list")
+        else:
+            logger.info(f"TSL check-fill: Order {order_id} status={order.status}")
+            for leg in order.legs:
+                logger.info(f"TSL check-fill: Order {order_id} - ordered={leg.ordered_quantity}, filled={leg.filled_quantity}")
+
+            # Only consider filled if FULLY filled (not partial)
+            if order.is_filled:
+                order_filled = True
+                fill_price = order.fill_price
+                logger.info(f"TSL check-fill: Order {order_id} FULLY filled at {fill_price}")
 
         if not order_filled:
             return jsonify({'filled': False})
@@ -1845,16 +1920,13 @@ def check_trailing_stop_limit_trigger(order_id):
 
         # Get current price from quote
         try:
-            quote = client.get_quote(tsl['symbol'])
-            current_price = None
-            if 'All' in quote:
-                current_price = float(quote['All'].get('lastTrade', 0))
-                if current_price == 0:
-                    current_price = float(quote['All'].get('bid', 0))
+            quote = get_quote_cache().get(client, tsl['symbol'], QUOTE_MAX_AGE_TRIGGER, 'trigger',
+                                         QUOTE_DETAIL_INTRADAY)
+            current_price = quote.price if quote else None
         except Exception as api_error:
             error_msg = str(api_error)
             logger.warning(f"TSL check-trigger: API error getting quote: {error_msg}")
-            if '500' in error_msg or 'not currently available' in error_msg:
+            if is_transient(api_error):
                 return jsonify({
                     'triggered': False,
                     'api_error': True,
@@ -1902,7 +1974,8 @@ def check_trailing_stop_limit_trigger(order_id):
         }
 
         try:
-            stop_preview = client.preview_order(tsl['account_id_key'], stop_order_data)
+            stop_preview = client.preview_order(tsl['account_id_key'], stop_order_data,
+                                                intent=f'exit:{order_id}:tsl')
             stop_result = client.place_order(
                 tsl['account_id_key'],
                 stop_order_data,
@@ -1990,14 +2063,18 @@ def cancel_trailing_stop_limit(order_id):
 
 def _get_authenticated_client():
     """Get an authenticated E*TRADE client"""
+    start = time.perf_counter()
     token_manager = get_token_manager()
     tokens = token_manager.get_tokens()
+    server_timing.record('token', time.perf_counter() - start)
 
     if not tokens:
         raise Exception('Not authenticated. Please login first.')
 
+    start = time.perf_counter()
     client = ETradeClient()
     client.set_session(tokens['access_token'], tokens['access_token_secret'])
+    server_timing.record('client', time.perf_counter() - start)
 
     return client
 
@@ -2014,6 +2091,57 @@ def health():
     })
 
 
+# ==================== METRICS ====================
+
+def _register_metric_collectors():
+    """Scrape-time gauges for state owned by the monitor and token cache."""
+    registry = get_metrics()
+    monitor = get_order_monitor()
+
+    def sse_queue_depth():
+        stats = monitor.get_sse_stats()
+        return {('max',): stats['queue_depth_max'], ('total',): stats['queue_depth_total']}
+
+    def token_cache_hit_ratio():
+        hits = TOKEN_CACHE_LOOKUPS.value(('hit',))
+        total = hits + TOKEN_CACHE_LOOKUPS.value(('miss',))
+        return {(): hits / total if total else 0.0}
+
+    registry.gauge('order_monitors_active', 'Running monitors by type and state',
+                   ('type', 'state'), fn=monitor.get_monitor_counts)
+    registry.gauge('sse_clients', 'Connected SSE clients',
+                   fn=lambda: {(): monitor.get_sse_stats()['clients']})
+    registry.gauge('sse_queue_depth', 'Queued SSE frames across clients (largest single queue and total)',
+                   ('stat',), fn=sse_queue_depth)
+    registry.gauge('sse_clients_evicted', 'SSE clients dropped because their queue was full',
+                   fn=lambda: {(): monitor.get_sse_stats()['evicted']})
+    registry.gauge('etrade_token_cache_hit_ratio', 'Share of token lookups served from memory',
+                   fn=token_cache_hit_ratio)
+    registry.gauge('process_resident_memory_bytes', 'Resident set size',
+                   fn=lambda: {(): _current_rss_bytes() or 0})
+    registry.gauge('order_monitors_health', 'Running monitors by watchdog health',
+                   ('health',), fn=get_monitor_watchdog().health_counts)
+    registry.gauge('etrade_rate_limit_tokens', 'Spare E*TRADE request budget (negative while in debt)',
+                   fn=lambda: {(): round(get_rate_limiter().tokens(), 2)})
+    registry.gauge('quote_hub_symbols', 'Symbols the quote hub polls each tick',
+                   fn=lambda: {(): len(get_quote_hub().subscriptions())})
+    registry.gauge('quote_hub_subscribers', 'Quote hub subscriptions (UI watches and monitors) across symbols',
+                   fn=lambda: {(): sum(get_quote_hub().subscriptions().values())})
+    registry.gauge('etrade_hedge_win_ratio', 'Share of fired hedged requests that answered first',
+                   ('endpoint',), fn=lambda: {(label,): entry['win_ratio']
+                                              for label, entry in request_policy.hedge_stats().items()})
+
+
+_register_metric_collectors()
+
+
+@app.route('/metrics')
+@require_admin
+def metrics():
+    """Prometheus text exposition of latency histograms, monitor and SSE gauges"""
+    return Response(get_metrics().render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/api/debug/test')
 def debug_test():
     """Debug endpoint to test API connection"""
@@ -2051,6 +2179,161 @@ def debug_test():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/debug/sse-stats')
+@require_admin
+def debug_sse_stats():
+    """SSE fan-out state plus process RSS/CPU, sampled by loadtest_sse.py"""
+    monitor = get_order_monitor()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return jsonify({
+        'success': True,
+        'timestamp': time.time(),
+        'sse': monitor.get_sse_stats(),
+        'process': {
+            'rss_bytes': _current_rss_bytes(),
+            'max_rss_bytes': usage.ru_maxrss * 1024,  # ru_maxrss is KiB on Linux
+            'cpu_user_seconds': usage.ru_utime,
+            'cpu_system_seconds': usage.ru_stime
+        }
+    })
+
+
+@app.route('/api/debug/monitors')
+@require_admin
+def debug_monitors():
+    """Running monitors with heartbeat age and watchdog health"""
+    watchdog = get_monitor_watchdog()
+    hub = get_quote_hub()
+    return jsonify({
+        'success': True,
+        'scheduler_lag_seconds': round(watchdog.scheduler_lag, 3),
+        'restart_enabled': watchdog.restart,
+        'monitors': watchdog.snapshot(),
+        'quote_hub': {'interval': hub.interval, 'subscriptions': hub.subscriptions(), **hub.stats}
+    })
+
+
+@app.route('/api/debug/sse-load', methods=['POST'])
+@require_admin
+def debug_sse_load():
+    """Start emitting synthetic SSE events: {rate, duration, payload_bytes}"""
+    data = request.get_json(silent=True) or {}
+    try:
+        rate = float(data.get('rate', 10))
+        duration = float(data.get('duration', 30))
+        payload_bytes = int(data.get('payload_bytes', 0))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'rate, duration and payload_bytes must be numeric'}), 400
+
+    if rate <= 0 or duration <= 0 or payload_bytes < 0:
+        return jsonify({'success': False, 'error': 'rate and duration must be positive'}), 400
+    if rate > SSE_LOAD_MAX_RATE or duration > SSE_LOAD_MAX_DURATION or payload_bytes > SSE_LOAD_MAX_PAYLOAD_BYTES:
+        return jsonify({
+            'success': False,
+            'error': f'Limits: rate <= {SSE_LOAD_MAX_RATE:g}/s, duration <= {SSE_LOAD_MAX_DURATION:g}s, '
+                     f'payload_bytes <= {SSE_LOAD_MAX_PAYLOAD_BYTES}'
+        }), 400
+
+    if not get_order_monitor().run_sse_load(rate, duration, payload_bytes):
+        return jsonify({'success': False, 'error': 'An SSE load run is already in progress'}), 409
+    return jsonify({'success': True, 'rate': rate, 'duration': duration, 'payload_bytes': payload_bytes})
+
+
+@app.route('/api/debug/wire-trace', methods=['GET', 'DELETE'])
+@require_admin
+def debug_wire_trace():
+    """
+    Recent E*TRADE request/response exchanges, newest first.
+
+    Query params: limit (default 50), errors=1 (failed exchanges only),
+    path (substring filter). DELETE clears the buffer.
+    """
+    trace = get_wire_trace()
+    if request.method == 'DELETE':
+        trace.clear()
+        return jsonify({'success': True})
+
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit must be an integer'}), 400
+    errors_only = request.args.get('errors', '').lower() in ('1', 'true', 'yes')
+
+    return jsonify({
+        'success': True,
+        'stats': trace.stats(),
+        'entries': trace.snapshot(limit=limit, errors_only=errors_only,
+                                  path_contains=request.args.get('path'))
+    })
+
+
+@app.route('/api/debug/order-journal')
+@require_admin
+def debug_order_journal():
+    """
+    Recent order placements from the order journal, newest first.
+
+    Query params: limit (default 50), status (pending, placed, failed, unknown).
+    """
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit must be an integer'}), 400
+    entries = get_order_journal().recent(limit=limit)
+    status = request.args.get('status')
+    if status:
+        entries = [e for e in entries if e['status'] == status]
+    return jsonify({'success': True, 'entries': entries})
+
+
+@app.route('/api/debug/profile')
+@require_admin
+def debug_profile():
+    """
+    Sample every thread's stack for N seconds and return the profile.
+
+    Query params: seconds (default 10, max 60), interval_ms (default 10),
+    format=collapsed (default, flamegraph.pl / speedscope input) or speedscope.
+    """
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval = float(request.args.get('interval_ms', profiler.DEFAULT_INTERVAL * 1000)) / 1000
+    except ValueError:
+        return jsonify({'success': False, 'error': 'seconds and interval_ms must be numeric'}), 400
+    fmt = request.args.get('format', 'collapsed')
+    if fmt not in ('collapsed', 'speedscope'):
+        return jsonify({'success': False, 'error': 'format must be collapsed or speedscope'}), 400
+    if seconds <= 0 or interval <= 0:
+        return jsonify({'success': False, 'error': 'seconds and interval_ms must be positive'}), 400
+
+    result = profiler.capture(seconds, interval)
+    if result is None:
+        return jsonify({'success': False, 'error': 'A profile capture is already running'}), 409
+    stats = result.stats()
+    logger.info(f"[Profiler] Captured {stats['samples']} samples over {stats['seconds']}s")
+
+    stamp = datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+    if fmt == 'speedscope':
+        body = codec.dumps(result.speedscope(name=f'etrade-trading {stamp}'))
+        mimetype, filename = 'application/json', f'profile-{stamp}.speedscope.json'
+    else:
+        body = result.collapsed()
+        mimetype, filename = 'text/plain', f'profile-{stamp}.collapsed.txt'
+    return Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}',
+        'X-Profile-Samples': str(stats['samples'])
+    })
+
+
+def _current_rss_bytes():
+    """Current resident set size (Linux /proc), or None if unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_DEBUG', 'false').lower() == 'true'
@@ -2058,4 +2341,7 @@ if __name__ == '__main__':
     logger.info(f"Starting E*TRADE Trading System on port {port}")
     logger.info(f"Environment: {'SANDBOX' if USE_SANDBOX else 'PRODUCTION'}")
 
+    # Under gunicorn this is gunicorn.conf.py's post_worker_init
+    get_monitor_watchdog().start()
+
     app.run(host='0.0.0.0', port=port, debug=debug, threaded=True)
@@ -0,0 +1,100 @@
+"""
+Server-Timing for API Responses
+
+Every Flask response carries a Server-Timing header that breaks the
+request down into the work done on its behalf:
+
+    Server-Timing: token;dur=0.4, client;dur=1.2,
+                   etrade_quote;dur=181.6;desc="GET 200",
+                   etrade_preview;dur=402.3;desc="POST 200",
+                   etrade_place;dur=377.9;desc="POST 200",
+                   upstream;dur=961.8;desc="3 calls", serialize;dur=0.1, app;dur=968.2
+
+Browser devtools (Network -> Timing) and load tests can then see where a
+request's latency went without server-side log diving.
+
+The current request's timing lives in a ContextVar, so ETradeClient can
+record its calls without knowing about Flask. Monitor threads (and
+greenlets under gevent) start with an empty context: calls they make after
+the request returned are not attributed to it.
+"""
+import contextvars
+import time
+
+_current = contextvars.ContextVar('server_timing', default=None)
+
+
+class RequestTiming:
+    """Timed steps of one request, in the order they finished."""
+
+    __slots__ = ('start', 'entries')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.entries = []  # (name, seconds, desc, upstream)
+
+    def add(self, name, seconds, desc=None, upstream=False):
+        self.entries.append((name, seconds, desc, upstream))
+
+    @property
+    def upstream_calls(self):
+        return sum(1 for entry in self.entries if entry[3])
+
+    def header(self):
+        """Server-Timing header value (durations in ms)."""
+        parts = []
+        seen = {}
+        upstream_count = 0
+        upstream_seconds = 0.0
+        for name, seconds, desc, upstream in self.entries:
+            # Repeated steps (two quotes, ...) get distinct names
+            seen[name] = seen.get(name, 0) + 1
+            if seen[name] > 1:
+                name = f'{name}_{seen[name]}'
+            part = f'{name};dur={seconds * 1000:.1f}'
+            if desc:
+                part += f';desc="{desc}"'
+            parts.append(part)
+            if upstream:
+                upstream_count += 1
+                upstream_seconds += seconds
+        parts.append(f'upstream;dur={upstream_seconds * 1000:.1f};desc="{upstream_count} calls"')
+        parts.append(f'app;dur={(time.perf_counter() - self.start) * 1000:.1f}')
+        return ', '.join(parts)
+
+
+def begin():
+    """Start timing the current request."""
+    timing = RequestTiming()
+    _current.set(timing)
+    return timing
+
+
+def finish():
+    """Stop timing the current request and return its RequestTiming (or None)."""
+    timing = _current.get()
+    _current.set(None)
+    return timing
+
+
+def record(name, seconds, desc=None, upstream=False):
+    """Add a step to the current request's timing (no-op outside a request)."""
+    timing = _current.get()
+    if timing is not None:
+        timing.add(name, seconds, desc, upstream)
+
+
+def upstream_name(endpoint):
+    """
+    Short Server-Timing name for an E*TRADE endpoint label, e.g.
+        /v1/accounts/{account}/orders/preview.json -> etrade_preview
+        /v1/market/quote/{symbols}.json            -> etrade_quote
+    """
+    if endpoint.startswith('/v1/market/quote/'):
+        return 'etrade_quote'
+    name = endpoint.rsplit('/', 1)[-1]
+    if name.endswith('.json'):
+        name = name[:-5]
+    if endpoint == '/v1/accounts/list.json':
+        name = 'accounts'
+    return f'etrade_{name}'
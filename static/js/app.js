@@ -117,6 +117,18 @@ function handleSSEEvent(data) {
             disconnectSSE();
             break;
 
+        // Watchdog: the server-side monitor for this order stopped making progress
+        case 'monitor_health':
+            if (data.health === 'lagging' || data.health === 'stalled') {
+                updateOrderStatus(
+                    `Monitor ${data.health}: no progress for ${data.seconds_since_progress}s (${data.state}). Check E*TRADE.`,
+                    'warning'
+                );
+            } else if (data.health === 'restarted') {
+                updateOrderStatus('Monitor restarted after a stall', 'warning');
+            }
+            break;
+
         // Trailing stop events
         case 'ts_status':
             if (data.state === 'waiting_fill') {
@@ -408,13 +420,26 @@ async function loadAccountInfo() {
         return;
     }
 
-    // Load balance
-    loadBalance(currentAccountIdKey);
+    // Balance, positions and open orders in one request, fetched concurrently
+    // by the server; fall back to the separate endpoints if it fails
+    try {
+        const accountIdKey = currentAccountIdKey;
+        const response = await fetch(`/api/dashboard/${accountIdKey}`);
+        const data = await response.json();
 
-    // Load positions
-    loadPositions(currentAccountIdKey);
+        if (data.success) {
+            const errors = data.errors || {};
+            if (errors.balance) loadBalance(accountIdKey); else renderBalance(data.balance);
+            if (errors.positions) loadPositions(accountIdKey); else renderPositions(data.positions);
+            if (errors.orders) loadOrders(accountIdKey); else renderOrders(accountIdKey, data.orders);
+            return;
+        }
+    } catch (error) {
+        console.error('Load dashboard failed:', error);
+    }
 
-    // Load open orders
+    loadBalance(currentAccountIdKey);
+    loadPositions(currentAccountIdKey);
     loadOrders(currentAccountIdKey);
 }
 
@@ -424,87 +449,102 @@ async function loadBalance(accountIdKey) {
         const data = await response.json();
 
         if (data.success) {
-            const balance = data.balance;
-            document.getElementById('net-value').textContent = formatCurrency(balance.net_account_value);
-            document.getElementById('cash-available').textContent = formatCurrency(balance.cash_available);
-            document.getElementById('buying-power').textContent = formatCurrency(balance.margin_buying_power);
-            document.getElementById('account-balance').style.display = 'block';
+            renderBalance(data.balance);
         }
     } catch (error) {
         console.error('Load balance failed:', error);
     }
 }
 
+function renderBalance(balance) {
+    document.getElementById('net-value').textContent = formatCurrency(balance.net_account_value);
+    document.getElementById('cash-available').textContent = formatCurrency(balance.cash_available);
+    document.getElementById('buying-power').textContent = formatCurrency(balance.margin_buying_power);
+    document.getElementById('account-balance').style.display = 'block';
+}
+
 async function loadPositions(accountIdKey) {
     try {
         const response = await fetch(`/api/accounts/${accountIdKey}/portfolio`);
         const data = await response.json();
 
-        const container = document.getElementById('positions-list');
-
-        if (data.success && data.positions.length > 0) {
-            container.innerHTML = data.positions.map(pos => `
-                <div class="position-item">
-                    <div class="pos-main">
-                        <span class="position-symbol">${pos.symbol || 'N/A'}</span>
-                        <span class="position-qty">${pos.quantity || 0} shares</span>
-                    </div>
-                    <div class="pos-details">
-                        <span class="pos-cost">Cost: ${formatCurrency(pos.cost_per_share)}</span>
-                        <span class="pos-value">Value: ${formatCurrency(pos.market_value)}</span>
-                    </div>
-                    <div class="position-pnl ${pos.total_gain >= 0 ? 'positive' : 'negative'}">
-                        ${formatCurrency(pos.total_gain)}
-                    </div>
-                </div>
-            `).join('');
+        if (data.success) {
+            renderPositions(data.positions);
         } else {
-            container.innerHTML = '<p class="placeholder-text">No positions</p>';
+            renderPositions([]);
         }
     } catch (error) {
         console.error('Load positions failed:', error);
     }
 }
 
+function renderPositions(positions) {
+    const container = document.getElementById('positions-list');
+
+    if (positions && positions.length > 0) {
+        container.innerHTML = positions.map(pos => `
+            <div class="position-item">
+                <div class="pos-main">
+                    <span class="position-symbol">${pos.symbol || 'N/A'}</span>
+                    <span class="position-qty">${pos.quantity || 0} shares</span>
+                </div>
+                <div class="pos-details">
+                    <span class="pos-cost">Cost: ${formatCurrency(pos.cost_per_share)}</span>
+                    <span class="pos-value">Value: ${formatCurrency(pos.market_value)}</span>
+                </div>
+                <div class="position-pnl ${pos.total_gain >= 0 ? 'positive' : 'negative'}">
+                    ${formatCurrency(pos.total_gain)}
+                </div>
+            </div>
+        `).join('');
+    } else {
+        container.innerHTML = '<p class="placeholder-text">No positions</p>';
+    }
+}
+
 async function loadOrders(accountIdKey) {
     try {
         const response = await fetch(`/api/orders/${accountIdKey}?status=OPEN`);
         const data = await response.json();
 
-        const container = document.getElementById('orders-list');
-
         if (!data.success) {
-            container.innerHTML = '<p class="placeholder-text error-text">API error - E*TRADE orders service unavailable</p>';
+            document.getElementById('orders-list').innerHTML = '<p class="placeholder-text error-text">API error - E*TRADE orders service unavailable</p>';
             return;
         }
 
-        if (data.orders && data.orders.length > 0) {
-            container.innerHTML = data.orders.map(order => `
-                <div class="order-item">
-                    <div class="order-main">
-                        <span class="order-symbol">${order.symbol || 'N/A'}</span>
-                        <span class="order-action ${order.action}">${order.action || ''}</span>
-                        <span class="order-qty">${order.quantity || 0}</span>
-                    </div>
-                    <div class="order-details">
-                        <span class="order-type">${order.price_type || 'MKT'}</span>
-                        <span class="order-price">@ ${order.limit_price ? formatCurrency(order.limit_price) : 'MKT'}</span>
-                        <span class="order-status">${order.status || ''}</span>
-                    </div>
-                    <div class="order-actions">
-                        <button class="btn btn-small btn-danger" onclick="cancelOrder('${accountIdKey}', '${order.order_id}')">✕</button>
-                    </div>
-                </div>
-            `).join('');
-        } else {
-            container.innerHTML = '<p class="placeholder-text">No open orders</p>';
-        }
+        renderOrders(accountIdKey, data.orders);
     } catch (error) {
         console.error('Load orders failed:', error);
         document.getElementById('orders-list').innerHTML = '<p class="placeholder-text error-text">E*TRADE API error</p>';
     }
 }
 
+function renderOrders(accountIdKey, orders) {
+    const container = document.getElementById('orders-list');
+
+    if (orders && orders.length > 0) {
+        container.innerHTML = orders.map(order => `
+            <div class="order-item">
+                <div class="order-main">
+                    <span class="order-symbol">${order.symbol || 'N/A'}</span>
+                    <span class="order-action ${order.action}">${order.action || ''}</span>
+                    <span class="order-qty">${order.quantity || 0}</span>
+                </div>
+                <div class="order-details">
+                    <span class="order-type">${order.price_type || 'MKT'}</span>
+                    <span class="order-price">@ ${order.limit_price ? formatCurrency(order.limit_price) : 'MKT'}</span>
+                    <span class="order-status">${order.status || ''}</span>
+                </div>
+                <div class="order-actions">
+                    <button class="btn btn-small btn-danger" onclick="cancelOrder('${accountIdKey}', '${order.order_id}')">✕</button>
+                </div>
+            </div>
+        `).join('');
+    } else {
+        container.innerHTML = '<p class="placeholder-text">No open orders</p>';
+    }
+}
+
 async function cancelOrder(accountIdKey, orderId) {
     if (!confirm('Are you sure you want to cancel this order?')) {
         return;
@@ -0,0 +1,119 @@
+"""Account cache: TTL, stale-while-revalidate, invalidation and failed refreshes"""
+import threading
+import time
+
+import pytest
+
+import request_policy
+from account_cache import AccountCache
+
+ACCOUNT = 'KEY'
+KEY = ('balance', ACCOUNT)
+
+
+class FakeClient:
+    """get_account_balance returns 1, 2, 3, ... or raises client.error."""
+
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+        self.gate = None         # Event the next call waits on
+        self.deadlines = []      # time left on the deadline during each call
+
+    def get_account_balance(self, account_id_key, as_model=False):
+        self.deadlines.append(request_policy.remaining())
+        if self.gate is not None:
+            self.gate.wait(2)
+        if self.error is not None:
+            raise self.error
+        self.calls += 1
+        return self.calls
+
+
+@pytest.fixture
+def cache():
+    return AccountCache(ttls={'accounts': 10, 'balance': 10, 'portfolio': 10},
+                        stale_seconds=30, refresh_deadline=5)
+
+
+def age(cache, seconds):
+    """Make the cached balance `seconds` old."""
+    cache._entries[KEY] = (time.monotonic() - seconds, cache._entries[KEY][1])
+
+
+def wait_for(condition, seconds=2):
+    expires = time.monotonic() + seconds
+    while not condition():
+        if time.monotonic() > expires:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_fresh_reads_are_served_from_memory(cache):
+    client = FakeClient()
+    assert cache.balance(client, ACCOUNT) == 1
+    assert cache.balance(client, ACCOUNT) == 1
+    assert client.calls == 1
+
+
+def test_stale_read_is_served_while_refreshing(cache):
+    client = FakeClient()
+    cache.balance(client, ACCOUNT)
+    age(cache, 15)
+    assert cache.balance(client, ACCOUNT) == 1
+    assert wait_for(lambda: cache._entries[KEY][1] == 2)
+    assert cache.balance(client, ACCOUNT) == 2
+    # The background refresh runs under its own deadline
+    assert client.deadlines[0] is None and 0 < client.deadlines[1] <= 5
+
+
+def test_too_stale_read_fetches_before_answering(cache):
+    client = FakeClient()
+    cache.balance(client, ACCOUNT)
+    age(cache, 41)
+    assert cache.balance(client, ACCOUNT) == 2
+
+
+def test_refresh_started_before_an_invalidation_is_dropped(cache):
+    client = FakeClient()
+    cache.balance(client, ACCOUNT)
+    age(cache, 15)
+    client.gate = threading.Event()
+    assert cache.balance(client, ACCOUNT) == 1  # refresh now in flight
+
+    cache.invalidate(ACCOUNT)
+    client.gate.set()
+    assert wait_for(lambda: not cache._refreshing)
+    # The refresh's value may predate the order that invalidated it
+    assert KEY not in cache._entries
+    client.gate = None
+    assert cache.balance(client, ACCOUNT) == 3
+
+
+def test_failed_refresh_surfaces_on_the_next_read(cache):
+    client = FakeClient()
+    cache.balance(client, ACCOUNT)
+    age(cache, 15)
+    client.error = Exception('API Error (503): busy')
+    assert cache.balance(client, ACCOUNT) == 1
+    assert wait_for(lambda: KEY in cache._failed)
+
+    # Not served stale again: the caller sees E*TRADE's error...
+    with pytest.raises(Exception, match='503'):
+        cache.balance(client, ACCOUNT)
+    # ...until a fetch succeeds
+    client.error = None
+    assert cache.balance(client, ACCOUNT) == 2
+    assert KEY not in cache._failed
+    age(cache, 15)
+    assert cache.balance(client, ACCOUNT) == 2
+
+
+def test_order_activity_invalidates_only_that_account(cache):
+    client = FakeClient()
+    cache.balance(client, ACCOUNT)
+    cache.balance(client, 'OTHER')
+    cache._on_orders_changed(ACCOUNT, [])
+    assert KEY not in cache._entries
+    assert ('balance', 'OTHER') in cache._entries
@@ -0,0 +1,43 @@
+"""Response models: Quote projection from All / Intraday sections"""
+from etrade_models import Quote
+
+ALL = {
+    'lastTrade': 227.51, 'bid': 227.5, 'ask': 227.52, 'bidSize': 200, 'askSize': 300,
+    'changeClose': 1.23, 'changeClosePercentage': 0.54, 'totalVolume': 48211000,
+    'high': 228.9, 'low': 225.3, 'open': 226.0, 'previousClose': 226.28, 'companyName': 'APPLE INC COM',
+}
+INTRADAY = {
+    'lastTrade': 227.51, 'bid': 227.5, 'ask': 227.52, 'changeClose': 1.23,
+    'changeClosePercentage': 0.54, 'totalVolume': 48211000, 'high': 228.9, 'low': 225.3,
+}
+DICT_KEYS = ['symbol', 'last_price', 'bid', 'ask', 'bid_size', 'ask_size', 'change',
+             'change_percent', 'volume', 'high', 'low', 'open', 'previous_close']
+
+
+def test_all_section():
+    quote = Quote.from_api({'Product': {'symbol': 'AAPL'}, 'All': ALL}, 'aapl')
+    assert quote == ('AAPL', 227.51, 227.5, 227.52, 200, 300, 1.23, 0.54, 48211000,
+                     228.9, 225.3, 226.0, 226.28)
+    assert list(quote.to_dict()) == DICT_KEYS
+    assert quote.to_dict() == dict(zip(Quote._fields, quote))
+
+
+def test_intraday_section_has_no_sizes_open_or_close():
+    quote = Quote.from_api({'Product': {'symbol': 'AAPL'}, 'Intraday': INTRADAY})
+    assert (quote.last_price, quote.volume, quote.low) == (227.51, 48211000, 225.3)
+    assert (quote.bid_size, quote.ask_size, quote.open, quote.previous_close) == (None,) * 4
+
+
+def test_missing_keys_are_none():
+    quote = Quote.from_api({'All': {'bid': 1.5}}, 'msft')
+    assert quote.symbol == 'MSFT'
+    assert quote.bid == 1.5
+    assert quote.last_price is None and quote.previous_close is None
+    assert Quote.from_api({'Intraday': {'ask': 2}}).ask == 2
+
+
+def test_symbol_falls_back_to_the_requested_one():
+    assert Quote.from_api({'Product': None, 'All': ALL}, 'aapl').symbol == 'AAPL'
+    assert Quote.from_api({'Product': {}, 'All': ALL}, 'aapl').symbol == 'AAPL'
+    assert Quote.from_api(None, 'aapl') == ('AAPL',) + (None,) * 12
+    assert Quote.from_api({}).symbol is None
@@ -0,0 +1,104 @@
+"""Fan-out: concurrency, per-part errors, context and never waiting forever"""
+import threading
+import time
+
+import pytest
+
+import request_policy
+import server_timing
+from fanout import PartResult, fan_out
+from request_policy import DeadlineExceeded, deadline
+
+# A killed part's worker thread re-raises once its result is posted
+pytestmark = pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+
+
+class Killed(BaseException):
+    """Stands in for gevent's GreenletExit."""
+
+
+def test_parts_run_concurrently_and_keep_their_order():
+    barrier = threading.Barrier(3, timeout=2)
+
+    def part(value):
+        return lambda: barrier.wait() is not None and value
+
+    results = fan_out({'c': part(3), 'a': part(1), 'b': part(2)}, workers=3)
+    assert list(results) == ['c', 'a', 'b']
+    assert [r.value for r in results.values()] == [3, 1, 2]
+    assert all(isinstance(r, PartResult) and r.error is None for r in results.values())
+
+
+def test_failing_part_does_not_fail_the_others():
+    def broken():
+        raise ValueError('API Error (500): boom')
+
+    results = fan_out({'ok': lambda: 'fine', 'broken': broken}, workers=2)
+    assert results['ok'].value == 'fine'
+    assert isinstance(results['broken'].error, ValueError)
+    assert results['broken'].value is None
+
+
+def test_no_tasks():
+    assert fan_out({}) == {}
+
+
+def test_parts_share_the_request_deadline_and_timing():
+    timing = server_timing.begin()
+    try:
+        with deadline(5):
+            results = fan_out({
+                'left': request_policy.remaining,
+                'timed': lambda: server_timing.record('step', 0.01),
+            }, workers=2)
+    finally:
+        server_timing.finish()
+    assert 0 < results['left'].value <= 5
+    assert [entry[0] for entry in timing.entries] == ['step']
+
+
+def test_killed_part_still_posts_a_result():
+    caller = threading.current_thread()
+    killed = threading.Event()
+
+    def part():
+        if threading.current_thread() is caller:
+            killed.wait(2)  # the worker thread took the other part
+            return 1
+        killed.set()
+        raise Killed()
+
+    results = fan_out({'a': part, 'b': part}, workers=2)
+    assert sorted(str(r.value) for r in results.values()) == ['1', 'None']
+    assert any(isinstance(r.error, Killed) for r in results.values())
+
+
+def test_killed_caller_part_is_raised():
+    # The caller runs parts too; a kill aimed at it is not swallowed
+    with pytest.raises(Killed):
+        fan_out({'killed': lambda: (_ for _ in ()).throw(Killed())}, workers=1)
+
+
+def test_part_running_past_the_deadline_is_given_up(monkeypatch):
+    monkeypatch.setattr('fanout.DEADLINE_GRACE', 0.05)
+    caller = threading.current_thread()
+    picked, release = threading.Event(), threading.Event()
+
+    def part():
+        if threading.current_thread() is caller:
+            picked.wait(2)  # the worker thread holds the other part
+            return 'caller'
+        picked.set()
+        release.wait(5)
+        return 'late'
+
+    try:
+        with deadline(0.1):
+            started = time.monotonic()
+            results = fan_out({'a': part, 'b': part}, workers=2)
+        assert time.monotonic() - started < 1
+    finally:
+        release.set()
+    values = sorted(str(r.value) for r in results.values())
+    assert values == ['None', 'caller']
+    assert any(isinstance(r.error, DeadlineExceeded) for r in results.values())
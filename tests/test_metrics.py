@@ -0,0 +1,105 @@
+"""Metrics: instruments, Prometheus text rendering and endpoint labels"""
+import pytest
+
+from metrics import ETRADE_REQUEST_SECONDS, MetricsRegistry, endpoint_label
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+def test_counter(registry):
+    counter = registry.counter('hits_total', 'Hits', ('route',))
+    counter.inc(('/a',))
+    counter.inc(('/a',), 2)
+    assert counter.value(('/a',)) == 3
+    assert counter.value(('/b',)) == 0
+    # Registering the same name again returns the existing instrument
+    assert registry.counter('hits_total', 'Hits', ('route',)) is counter
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    histogram = registry.histogram('latency_seconds', 'Latency', ('endpoint',), buckets=(0.1, 0.5, 1.0))
+    for value in (0.05, 0.1, 0.3, 0.7, 2.0):
+        histogram.observe(value, ('/q',))
+    snapshot = histogram.snapshot(('/q',))
+    assert snapshot['count'] == 5
+    assert snapshot['sum'] == pytest.approx(3.15)
+    # A value on a bound falls in that bucket (le is "less than or equal")
+    assert snapshot['buckets'] == {0.1: 2, 0.5: 3, 1.0: 4, float('inf'): 5}
+    assert histogram.snapshot(('/none',))['count'] == 0
+
+
+def test_render(registry):
+    registry.counter('hits_total', 'Hits', ('route',)).inc(('/a"b\\',))
+    registry.gauge('clients', 'Clients', fn=lambda: {(): 3})
+    registry.histogram('latency_seconds', 'Latency', buckets=(0.5,)).observe(0.25)
+    assert registry.render().splitlines() == [
+        '# HELP hits_total Hits',
+        '# TYPE hits_total counter',
+        'hits_total{route="/a\\"b\\\\"} 1',
+        '# HELP clients Clients',
+        '# TYPE clients gauge',
+        'clients 3',
+        '# HELP latency_seconds Latency',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{le="0.5"} 1',
+        'latency_seconds_bucket{le="+Inf"} 1',
+        'latency_seconds_sum 0.25',
+        'latency_seconds_count 1',
+    ]
+
+
+def test_failing_gauge_callback_does_not_break_the_scrape(registry):
+    def broken():
+        raise RuntimeError('monitor list unavailable')
+
+    registry.gauge('monitors', 'Monitors', fn=broken)
+    registry.counter('hits_total', 'Hits').inc()
+    text = registry.render()
+    assert '# monitors collection failed: monitor list unavailable' in text
+    assert 'hits_total 1' in text
+
+
+@pytest.mark.parametrize('path, label', [
+    ('/v1/accounts/abc123/orders/place.json', '/v1/accounts/{account}/orders/place.json'),
+    ('/v1/accounts/abc123/balance.json', '/v1/accounts/{account}/balance.json'),
+    ('/v1/accounts/list.json', '/v1/accounts/list.json'),
+    ('/v1/market/quote/AAPL,MSFT.json', '/v1/market/quote/{symbols}.json'),
+    ('/v1/market/quote/AAPL', '/v1/market/quote/{symbols}'),
+])
+def test_endpoint_label(path, label):
+    assert endpoint_label(path) == label
+
+
+def test_etrade_calls_are_timed():
+    from etrade_client import ETradeClient
+
+    class Response:
+        status_code = 200
+        content = b'{"ok": true}'
+        text = '{"ok": true}'
+
+    class Session:
+        def get(self, url, **kwargs):
+            return Response()
+
+    client = ETradeClient()
+    client._oauth = object()
+    client.session = Session()
+    labels = ('GET', '/v1/accounts/{account}/balance.json', '200')
+    before = ETRADE_REQUEST_SECONDS.snapshot(labels)['count']
+    client._make_request('GET', '/v1/accounts/XYZ/balance.json')
+    assert ETRADE_REQUEST_SECONDS.snapshot(labels)['count'] == before + 1
+
+
+def test_metrics_endpoint_requires_the_admin_token(monkeypatch):
+    import server
+    monkeypatch.setattr(server, 'ADMIN_TOKEN', 'secret')
+    http = server.app.test_client()
+    assert http.get('/metrics').status_code == 403
+    response = http.get('/metrics', headers={'X-Admin-Token': 'secret'})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert '# TYPE etrade_request_duration_seconds histogram' in response.get_data(as_text=True)
@@ -0,0 +1,125 @@
+"""Monitor watchdog: heartbeat classification, health transitions and restarts"""
+import pytest
+
+from monitor_watchdog import MONITOR_ALERTS, MonitorWatchdog
+
+NOW = 1000.0
+
+
+class FakeMonitor:
+    """Running monitors as {key: flag}; records emitted events and restarts."""
+
+    def __init__(self, **flags):
+        self.flags = flags
+        self.events = []
+        self.restarts = []
+        self.restart_ok = True
+
+    def get_monitor_flags(self):
+        return list(self.flags.items())
+
+    def restart_monitor(self, key):
+        self.restarts.append(key)
+        if self.restart_ok:
+            self.flags[key] = dict(self.flags[key], progress=NOW)
+        return self.restart_ok
+
+    def _emit(self, event):
+        self.events.append(event)
+
+
+def flag(age, cadence=2, monitor_type='profit'):
+    return {'progress': NOW - age, 'cadence': cadence, 'type': monitor_type, 'state': 'waiting_fill'}
+
+
+def healths(monitor):
+    return [(e['monitor'], e['health']) for e in monitor.events]
+
+
+@pytest.fixture
+def watchdog():
+    def make(monitor, restart=False):
+        return MonitorWatchdog(monitor, interval=1, lag_factor=5, stall_seconds=60, restart=restart)
+    return make
+
+
+@pytest.mark.parametrize('age, cadence, health', [
+    (0, 2, 'ok'),
+    (9.9, 2, 'ok'),
+    (10, 2, 'lagging'),     # 5 cadences
+    (30, 10, 'ok'),
+    (59, 2, 'lagging'),
+    (60, 2, 'stalled'),
+    (60, 100, 'stalled'),   # stall_seconds wins over a long cadence
+])
+def test_classify(watchdog, age, cadence, health):
+    assert watchdog(FakeMonitor()).classify(flag(age, cadence), NOW) == (health, pytest.approx(age))
+
+
+def test_transitions_are_reported_once(watchdog):
+    monitor = FakeMonitor(**{'101': flag(0)})
+    dog = watchdog(monitor)
+    dog.check(NOW)
+    assert monitor.events == []
+
+    monitor.flags['101'] = flag(12)
+    dog.check(NOW)
+    dog.check(NOW)
+    assert healths(monitor) == [('101', 'lagging')]
+    assert monitor.events[0]['order_id'] == '101'
+    assert monitor.events[0]['seconds_since_progress'] == 12
+
+    monitor.flags['101'] = flag(1)
+    dog.check(NOW)
+    assert healths(monitor) == [('101', 'lagging'), ('101', 'ok')]
+
+
+def test_stalled_monitor_is_left_alone_without_restart(watchdog):
+    monitor = FakeMonitor(**{'quote:AAPL': flag(90, monitor_type='tsl')})
+    watchdog(monitor).check(NOW)
+    assert healths(monitor) == [('quote:AAPL', 'stalled')]
+    assert monitor.events[0]['order_id'] is None
+    assert monitor.restarts == []
+
+
+def test_stalled_monitor_is_marked_then_restarted(watchdog):
+    monitor = FakeMonitor(**{'101': flag(90)})
+    dog = watchdog(monitor, restart=True)
+    before = MONITOR_ALERTS.value(('restarted', 'profit'))
+    dog.check(NOW)
+    assert healths(monitor) == [('101', 'stalled'), ('101', 'restarted')]
+    assert monitor.restarts == ['101']
+    assert MONITOR_ALERTS.value(('restarted', 'profit')) == before + 1
+
+    # The restarted monitor makes progress again: no further alerts
+    dog.check(NOW)
+    assert len(monitor.events) == 2
+
+
+def test_failed_restart_is_reported_and_not_retried_each_check(watchdog):
+    monitor = FakeMonitor(**{'101': flag(90)})
+    monitor.restart_ok = False
+    dog = watchdog(monitor, restart=True)
+    dog.check(NOW)
+    dog.check(NOW)
+    assert healths(monitor) == [('101', 'stalled'), ('101', 'restart_failed')]
+    assert monitor.restarts == ['101']
+
+
+def test_finished_monitors_are_forgotten(watchdog):
+    monitor = FakeMonitor(**{'101': flag(12)})
+    dog = watchdog(monitor)
+    dog.check(NOW)
+    del monitor.flags['101']
+    dog.check(NOW)
+    assert dog._health == {}
+    # Back again, the same lag is a new transition
+    monitor.flags['101'] = flag(12)
+    dog.check(NOW)
+    assert healths(monitor) == [('101', 'lagging'), ('101', 'lagging')]
+
+
+def test_health_counts(watchdog, monkeypatch):
+    monkeypatch.setattr('monitor_watchdog.time.monotonic', lambda: NOW)
+    monitor = FakeMonitor(a=flag(0), b=flag(12), c=flag(90), d=flag(1))
+    assert watchdog(monitor).health_counts() == {('ok',): 2, ('lagging',): 1, ('stalled',): 1}
@@ -0,0 +1,126 @@
+"""Order book: incremental fetch, terminal caching, and order list pages"""
+import pytest
+
+from etrade_client import ETradeClient
+from order_book import OrderBook
+from order_stream import OrderFill
+
+ACCOUNT = 'KEY'
+
+
+def fill(order_id, status='OPEN', symbol='AAPL', filled=0, ordered=10):
+    return OrderFill(order_id, status, symbol, filled, ordered, None, None)
+
+
+class FakeClient:
+    """Serves get_order_fills from a dict of order_id -> OrderFill, recording each call."""
+
+    def __init__(self, *fills):
+        self.server = {f.order_id: f for f in fills}
+        self.calls = []
+
+    def get_order_fills(self, account_id_key, status=None, from_date=None, to_date=None,
+                        symbol=None, order_ids=None, hedge=False):
+        self.calls.append({'status': status, 'symbol': symbol, 'order_ids': order_ids})
+        fills = [f for f in self.server.values()
+                 if (status is None or f.status == status) and (symbol is None or f.symbol == symbol)]
+        if order_ids is not None:
+            fills = [f for f in fills if str(f.order_id) in order_ids]
+        return fills
+
+
+@pytest.fixture
+def book():
+    return OrderBook()
+
+
+def test_open_orders_need_one_fetch(book):
+    client = FakeClient(fill(1), fill(2, symbol='MSFT'))
+    orders = book.sync(client, ACCOUNT)
+    assert sorted(o.order_id for o in orders) == [1, 2]
+    assert [c['status'] for c in client.calls] == ['OPEN']
+
+
+def test_order_that_left_open_is_resolved_once(book):
+    client = FakeClient(fill(1), fill(2))
+    book.sync(client, ACCOUNT)
+
+    client.server[1] = fill(1, status='EXECUTED', filled=10)
+    book.sync(client, ACCOUNT)
+    assert client.calls[-1] == {'status': None, 'symbol': 'AAPL', 'order_ids': ['1']}
+    assert book.get(ACCOUNT, 1).status == 'EXECUTED'
+    assert book.get(ACCOUNT, '1').legs[0].is_filled
+
+    # Terminal now: served from the book, never fetched again
+    client.calls.clear()
+    book.sync(client, ACCOUNT, order_ids=[1])
+    assert [c['status'] for c in client.calls] == ['OPEN']
+    assert book.stats['recent_fetches'] == 1
+
+
+def test_unseen_watched_order_is_fetched(book):
+    client = FakeClient(fill(7, status='CANCELLED', symbol='NVDA'))
+    book.sync(client, ACCOUNT, order_ids=[7], symbol='nvda')
+    assert client.calls[-1] == {'status': None, 'symbol': 'NVDA', 'order_ids': ['7']}
+    assert book.get(ACCOUNT, 7).status == 'CANCELLED'
+
+
+def test_listeners_see_only_changed_orders(book):
+    seen = []
+    book.add_listener(lambda account, orders: seen.append([o.order_id for o in orders]))
+    client = FakeClient(fill(1), fill(2))
+    book.sync(client, ACCOUNT)
+    book.sync(client, ACCOUNT)
+    client.server[2] = fill(2, filled=4)
+    book.sync(client, ACCOUNT)
+    assert seen == [[1, 2], [2]]
+
+
+def test_terminal_orders_are_pruned_first(book, monkeypatch):
+    monkeypatch.setattr(OrderBook, 'MAX_ORDERS_PER_ACCOUNT', 2)
+    book.merge(ACCOUNT, [fill(1, status='EXECUTED', filled=10), fill(2), fill(3)])
+    assert book.get(ACCOUNT, 1) is None
+    assert book.get(ACCOUNT, 2) and book.get(ACCOUNT, 3)
+
+
+# ==================== Order list pages ====================
+
+def order(order_id, status='OPEN'):
+    return {'orderId': order_id, 'orderType': 'EQ', 'OrderDetail': [{
+        'status': status,
+        'Instrument': [{'Product': {'symbol': 'AAPL'}, 'orderedQuantity': 10, 'filledQuantity': 0}],
+    }]}
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    """An ETradeClient whose orders endpoint serves the queued responses in order."""
+    client = ETradeClient()
+    responses = []
+    monkeypatch.setattr(client, '_make_request', lambda *args, **kwargs: responses.pop(0))
+    return client, responses
+
+
+def test_single_order_page_is_a_list(pages):
+    client, responses = pages
+    responses.append({'OrdersResponse': {'marker': '', 'Order': order(601)}})
+    orders, marker = client.get_orders_page(ACCOUNT)
+    assert orders == [order(601)]
+    assert marker is None
+
+
+def test_pages_are_followed_by_marker(pages):
+    client, responses = pages
+    responses.extend([
+        {'OrdersResponse': {'marker': 'M2', 'Order': [order(1), order(2)]}},
+        {'OrdersResponse': {'Order': order(3, 'EXECUTED')}},
+    ])
+    orders = client.get_orders(ACCOUNT, as_model=True)
+    assert [o.order_id for o in orders] == [1, 2, 3]
+    assert orders[2].status == 'EXECUTED'
+
+
+def test_page_without_orders(pages):
+    client, responses = pages
+    responses.append({'OrdersResponse': {'marker': ''}})
+    assert client.get_orders_page(ACCOUNT) == ([], None)
@@ -0,0 +1,121 @@
+"""Order encoder: validation rules, escaping and the encoded-order cache"""
+import json
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from order_encoder import OrderRequest, OrderValidationError, encode_order
+
+CLIENT_ORDER_ID = '1234567890'
+
+
+def limit(price, **fields):
+    return {'symbol': 'AAPL', 'quantity': 10, 'orderAction': 'BUY', 'priceType': 'LIMIT',
+            'orderTerm': 'GOOD_FOR_DAY', 'limitPrice': price, **fields}
+
+
+@pytest.mark.parametrize('price, expected', [
+    ('227.50', '227.50'),
+    ('227.5', '227.5'),
+    (227.5, '227.5'),
+    ('1.25', '1.25'),
+    (1, '1'),
+    ('0.1234', '0.1234'),
+    (0.0005, '0.0005'),
+    ('0.12', '0.12'),
+])
+def test_valid_prices(price, expected):
+    assert OrderRequest.from_dict(limit(price)).limit_price == expected
+
+
+@pytest.mark.parametrize('price', [
+    '227.501',    # 3 decimals at $1 and up
+    '1.001',
+    1.005,
+    '0.12345',    # 5 decimals below $1
+    0.00001,
+    '0', '0.0000', '-1.00', '1e3', '12,50', 'abc',
+])
+def test_invalid_prices(price):
+    with pytest.raises(OrderValidationError):
+        OrderRequest.from_dict(limit(price))
+
+
+def test_trailing_stop_prices_follow_the_same_rules():
+    tsl = {'symbol': 'AAPL', 'quantity': 10, 'orderAction': 'SELL', 'priceType': 'TRAILING_STOP_CNST',
+           'stopPrice': '0.50', 'stopLimitPrice': '0.0001'}
+    order = OrderRequest.from_dict(tsl)
+    assert (order.stop_price, order.stop_limit_price) == ('0.50', '0.0001')
+    with pytest.raises(OrderValidationError):
+        OrderRequest.from_dict({**tsl, 'stopPrice': '1.505'})
+
+
+@pytest.mark.parametrize('quantity, expected', [(10, 10), ('10', 10), (10.0, 10), ('1000000', 1000000)])
+def test_valid_quantities(quantity, expected):
+    assert OrderRequest.from_dict(limit('1.00', quantity=quantity)).quantity == expected
+
+
+@pytest.mark.parametrize('quantity', [0, -5, 1.5, '2.5', '', 'ten', None, 1000001])
+def test_invalid_quantities(quantity):
+    with pytest.raises(OrderValidationError):
+        OrderRequest.from_dict(limit('1.00', quantity=quantity))
+
+
+@pytest.mark.parametrize('fields', [
+    {'symbol': 'AAPL</symbol><symbol>MSFT'},
+    {'symbol': 'A&B'},
+    {'symbol': '"AAPL"'},
+    {'orderAction': 'BUY</orderAction>'},
+    {'orderTerm': 'GOOD_FOR_DAY<x/>'},
+    {'limitPrice': '1.00<'},
+])
+def test_markup_in_fields_is_rejected(fields):
+    with pytest.raises(OrderValidationError):
+        encode_order(limit('1.00', **fields), 'place', CLIENT_ORDER_ID, '987654321')
+
+
+@pytest.mark.parametrize('client_order_id, preview_id', [
+    ('abc<def>', None), ('a&b', None), ('x' * 21, None), ('', None), ('１２３', None),
+    (CLIENT_ORDER_ID, '98765</previewId>'), (CLIENT_ORDER_ID, '１２'),
+])
+def test_markup_in_ids_is_rejected(client_order_id, preview_id):
+    with pytest.raises(OrderValidationError):
+        encode_order(limit('1.00'), 'place', client_order_id, preview_id)
+
+
+def test_xml_body_is_well_formed():
+    body = encode_order(limit('227.50', symbol='brk.b'), 'place', CLIENT_ORDER_ID, '987654321')
+    root = ET.fromstring(body)
+    assert root.tag == 'PlaceOrderRequest'
+    assert root.findtext('PreviewIds/previewId') == '987654321'
+    assert root.findtext('clientOrderId') == CLIENT_ORDER_ID
+    assert root.findtext('Order/limitPrice') == '227.50'
+    assert root.findtext('Order/Instrument/Product/symbol') == 'BRK.B'
+    assert root.findtext('Order/Instrument/quantity') == '10'
+
+
+def test_json_body_decodes():
+    body = encode_order(limit('0.1234'), 'preview', CLIENT_ORDER_ID, fmt='json')
+    request = json.loads(body)['PreviewOrderRequest']
+    assert request['clientOrderId'] == CLIENT_ORDER_ID
+    assert 'PreviewIds' not in request
+    assert request['Order'][0]['limitPrice'] == 0.1234
+
+
+def test_cached_order_encodes_like_a_fresh_one():
+    order = limit('12.34', symbol='CACHE')
+    first = encode_order(order, 'place', CLIENT_ORDER_ID, '1')
+    # Served from the cache: only the IDs differ
+    assert encode_order(order, 'place', 'abc', '2') == first.replace(
+        b'>1</previewId>', b'>2</previewId>').replace(CLIENT_ORDER_ID.encode(), b'abc')
+    assert encode_order(OrderRequest.from_dict(order), 'place', CLIENT_ORDER_ID, '1') == first
+    # Each request type and format has its own entry
+    assert encode_order(order, 'preview', CLIENT_ORDER_ID).startswith(b'<?xml')
+    assert encode_order(order, 'place', CLIENT_ORDER_ID, '1', 'json').startswith(b'{"PlaceOrderRequest"')
+
+
+def test_invalid_order_is_never_cached():
+    order = limit('1.001', symbol='NOCACHE')
+    for _ in range(2):
+        with pytest.raises(OrderValidationError):
+            encode_order(order, 'place', CLIENT_ORDER_ID)
@@ -0,0 +1,96 @@
+"""Order journal: duplicate-place detection and attempt IDs after a failed place"""
+import pytest
+
+from etrade_client import ETradeAPIError
+from order_journal import OrderJournal, is_duplicate_error
+
+ACCOUNT = 'KEY'
+ORDER = {'symbol': 'AAPL', 'quantity': 10, 'orderAction': 'SELL', 'priceType': 'LIMIT', 'limitPrice': 190.5}
+INTENT = 'exit:123:profit'
+
+
+@pytest.fixture
+def journal(monkeypatch):
+    monkeypatch.setattr(OrderJournal, '_connect_redis', lambda self: None)
+    return OrderJournal()
+
+
+def test_duplicate_is_decided_by_error_code(monkeypatch):
+    monkeypatch.setattr('order_journal.ETRADE_DUPLICATE_ORDER_CODES', frozenset({1063}))
+    assert is_duplicate_error(ETradeAPIError(400, 'Order rejected', code=1063))
+    assert is_duplicate_error(ETradeAPIError(400, 'Order rejected', code='1063'))
+
+
+def test_message_mentioning_duplicate_is_not_a_duplicate_place(monkeypatch):
+    monkeypatch.setattr('order_journal.ETRADE_DUPLICATE_ORDER_CODES', frozenset({1063}))
+    assert not is_duplicate_error(ETradeAPIError(400, 'Duplicate symbol in request', code=1012))
+    assert not is_duplicate_error(ETradeAPIError(400, 'duplicate', code=None))
+    assert not is_duplicate_error(Exception('API Error (400): duplicate clientOrderId'))
+
+
+def test_intent_keeps_its_id(journal):
+    first = journal.client_order_id(ACCOUNT, INTENT)
+    assert journal.client_order_id(ACCOUNT, INTENT) == first
+    assert len(first) == 20
+    assert journal.client_order_id(ACCOUNT, None) != journal.client_order_id(ACCOUNT, None)
+
+
+def test_failed_intent_gets_a_new_attempt_id(journal):
+    first = journal.client_order_id(ACCOUNT, INTENT)
+    journal.begin(first, ACCOUNT, ORDER, INTENT)
+    journal.failed(first, 'API Error (400): Insufficient shares')
+
+    second = journal.client_order_id(ACCOUNT, INTENT)
+    assert second != first
+    # Stable until that attempt fails too
+    assert journal.client_order_id(ACCOUNT, INTENT) == second
+    journal.begin(second, ACCOUNT, ORDER, INTENT)
+    journal.failed(second, 'API Error (400): Insufficient shares')
+    assert journal.client_order_id(ACCOUNT, INTENT) not in (first, second)
+
+
+def test_unknown_intent_keeps_its_id(journal):
+    # An ambiguous failure may have created the order: never a second ID
+    first = journal.client_order_id(ACCOUNT, INTENT)
+    journal.begin(first, ACCOUNT, ORDER, INTENT)
+    journal.failed(first, 'timed out', ambiguous=True)
+    assert journal.client_order_id(ACCOUNT, INTENT) == first
+
+
+def test_placed_attempt_is_found_for_its_intent(journal):
+    first = journal.client_order_id(ACCOUNT, INTENT)
+    journal.begin(first, ACCOUNT, ORDER, INTENT)
+    journal.failed(first, 'API Error (400): Insufficient shares')
+    second = journal.client_order_id(ACCOUNT, INTENT)
+    journal.begin(second, ACCOUNT, ORDER, INTENT)
+    journal.placed(second, 555)
+
+    entry = journal.placed_entry(ACCOUNT, INTENT)
+    assert entry['client_order_id'] == second
+    assert entry['order_id'] == 555
+
+
+def test_failed_place_is_sent_again_only_after_a_lookup(journal, monkeypatch):
+    from etrade_client import ETradeClient
+    import etrade_client
+    import request_policy
+    from request_policy import RetryPolicy
+
+    monkeypatch.setattr(etrade_client, 'get_order_journal', lambda: journal)
+    monkeypatch.setattr(request_policy, '_policy', RetryPolicy(attempts=3, base_delay=0, max_delay=0))
+    client = ETradeClient()
+    client._oauth = object()
+    sent, lookups = [], []
+
+    def send(*args, **kwargs):
+        sent.append(args[0])
+        raise ETradeAPIError(503, 'Service unavailable')
+
+    monkeypatch.setattr(client, '_send_request', send)
+    monkeypatch.setattr(client, 'find_placed_order', lambda account, entry: lookups.append(entry) and None)
+
+    with pytest.raises(ETradeAPIError):
+        client.place_order(ACCOUNT, ORDER, preview_id='1', intent=INTENT)
+    # One POST per lookup, never the inner retry loop's attempts on top
+    assert sent == ['POST'] * 3
+    assert len(lookups) == 3
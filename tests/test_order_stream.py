@@ -0,0 +1,113 @@
+"""Streaming OrdersResponse parser: same fills as json.loads, chunked any way"""
+import json
+
+import pytest
+
+from order_stream import OrdersStreamParser, fill_from_order, parse_order_fills
+
+
+def order(order_id, symbol='AAPL', status='OPEN', filled=0, ordered=10, price=None):
+    inst = {
+        'Product': {'symbol': symbol, 'securityType': 'EQ'},
+        'symbolDescription': f'{symbol} COMMON STOCK "CL A" \\ {{[}}]',
+        'orderAction': 'BUY',
+        'quantityType': 'QUANTITY',
+        'orderedQuantity': ordered,
+        'filledQuantity': filled,
+    }
+    if price is not None:
+        inst['averageExecutionPrice'] = price
+    return {
+        'orderId': order_id,
+        'details': f'https://api.etrade.com/v1/accounts/KEY/orders/{order_id}',
+        'orderType': 'EQ',
+        'OrderDetail': [{
+            'placedTime': 1772726400000,
+            'executedTime': 1772726460000 if filled else None,
+            'status': 'EXECUTED' if filled == ordered else status,
+            'priceType': 'LIMIT',
+            'limitPrice': 227.5,
+            'Instrument': [inst],
+        }],
+    }
+
+
+ORDERS = [
+    order(501, 'AAPL'),
+    order(502, 'msft', filled=10, price=411.02),
+    order(503, 'BRK.B', filled=4, price=455.5),      # partial
+    {'Orders': order(504, 'NVDA', filled=5, ordered=5, price=120.0)},
+]
+
+SAMPLES = {
+    'list': {'OrdersResponse': {'marker': 'M2', 'next': 'https://next', 'Order': ORDERS}},
+    'marker_after_orders': {'OrdersResponse': {'Order': ORDERS, 'marker': 'M2'}},
+    'single_order_object': {'OrdersResponse': {'marker': '', 'Order': order(601, 'TSLA', filled=3, ordered=3, price=250.25)}},
+    'single_order_list': {'OrdersResponse': {'Order': [order(602, 'AMD')]}},
+    'empty_list': {'OrdersResponse': {'marker': '', 'next': '', 'Order': []}},
+    'no_orders': {'OrdersResponse': {'marker': ''}},
+    'empty_response': {'OrdersResponse': {}},
+    'empty_object': {},
+}
+
+
+def expected(body, order_ids=None):
+    """What json.loads gives: the fills and the next marker."""
+    response = json.loads(body).get('OrdersResponse') or {}
+    orders = response.get('Order') or []
+    if isinstance(orders, dict):
+        orders = [orders]
+    fills = [fill_from_order(o) for o in orders]
+    if order_ids is not None:
+        fills = [f for f in fills if str(f.order_id) in {str(i) for i in order_ids}]
+    return fills, response.get('marker') or None
+
+
+def chunked(body, size):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize('name', sorted(SAMPLES))
+@pytest.mark.parametrize('indent', [None, 2])
+@pytest.mark.parametrize('size', [1, 7, 64, 1 << 20])
+def test_matches_json_loads(name, indent, size):
+    body = json.dumps(SAMPLES[name], indent=indent).encode()
+    assert parse_order_fills(chunked(body, size)) == expected(body)
+
+
+@pytest.mark.parametrize('name', ['list', 'single_order_object'])
+def test_order_id_filter_matches_json_loads(name):
+    body = json.dumps(SAMPLES[name]).encode()
+    for order_ids in ([502, '504'], [601], [999]):
+        assert parse_order_fills(chunked(body, 5), order_ids) == expected(body, order_ids)
+
+
+def test_empty_body():
+    assert parse_order_fills([]) == ([], None)
+    assert parse_order_fills([b'']) == ([], None)
+
+
+def test_multibyte_characters_split_across_chunks():
+    sample = {'OrdersResponse': {'Order': [order(701, 'AAPL')], 'marker': 'é✓'}}
+    sample['OrdersResponse']['Order'][0]['OrderDetail'][0]['Instrument'][0]['symbolDescription'] = 'Société ✓'
+    body = json.dumps(sample, ensure_ascii=False).encode('utf-8')
+    assert parse_order_fills(chunked(body, 1)) == expected(body)
+
+
+def test_fills():
+    fills, marker = parse_order_fills([json.dumps(SAMPLES['list'])])
+    assert marker == 'M2'
+    by_id = {f.order_id: f for f in fills}
+    assert not by_id[501].is_filled
+    assert by_id[502].is_filled and by_id[502].symbol == 'MSFT' and by_id[502].average_execution_price == 411.02
+    assert not by_id[503].is_filled and by_id[503].filled_quantity == 4
+    assert by_id[504].is_filled
+
+
+@pytest.mark.parametrize('name', ['list', 'single_order_object'])
+def test_truncated_body_is_an_error(name):
+    body = json.dumps(SAMPLES[name])
+    parser = OrdersStreamParser()
+    parser.feed(body[:body.index('"orderId"') + 40])
+    with pytest.raises(ValueError):
+        parser.close()
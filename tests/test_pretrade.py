@@ -0,0 +1,87 @@
+"""Pre-trade checks: snapshot invalidation races and exit orders"""
+import pytest
+
+from etrade_models import Balance, Position, Quote
+from pretrade import PretradeChecker, PretradeRejected
+
+ACCOUNT = 'KEY'
+
+
+def make_checker():
+    return PretradeChecker(snapshot_max_age=60, quote_max_age=5, enabled=True)
+
+
+def position(symbol, quantity):
+    return Position(symbol, '', quantity, 'LONG', None, None, None, None, None)
+
+
+def sell(quantity, price_type='MARKET', stop_price=None):
+    order = {'symbol': 'AAPL', 'quantity': quantity, 'orderAction': 'SELL',
+             'priceType': price_type, 'orderTerm': 'GOOD_FOR_DAY'}
+    if stop_price is not None:
+        order['stopPrice'] = stop_price
+        order['limitPrice'] = stop_price
+    return order
+
+
+def test_position_rule_rejects_oversell():
+    checker = make_checker()
+    checker.observe_positions(ACCOUNT, [position('AAPL', 5)])
+    with pytest.raises(PretradeRejected) as e:
+        checker.check(ACCOUNT, sell(10))
+    assert e.value.rule == 'position'
+
+
+def test_portfolio_fetched_before_invalidation_is_discarded():
+    # get_portfolio starts, the opening order fills (invalidate), then the
+    # pre-fill portfolio (no shares) comes back
+    checker = make_checker()
+    version = checker.version(ACCOUNT)
+    checker.invalidate(ACCOUNT)
+    checker.observe_positions(ACCOUNT, [], version)
+    checker.check(ACCOUNT, sell(10))
+    assert checker.stats['discarded'] == 1
+
+
+def test_balance_fetched_before_invalidation_is_discarded():
+    checker = make_checker()
+    version = checker.version(ACCOUNT)
+    checker.invalidate(ACCOUNT)
+    checker.observe_balance(ACCOUNT, Balance(None, None, None, 1.0, None), version)
+    checker.check(ACCOUNT, {'symbol': 'AAPL', 'quantity': 10, 'orderAction': 'BUY',
+                            'priceType': 'LIMIT', 'limitPrice': '100'})
+
+
+def test_portfolio_fetched_after_invalidation_is_kept():
+    checker = make_checker()
+    checker.invalidate(ACCOUNT)
+    version = checker.version(ACCOUNT)
+    checker.observe_positions(ACCOUNT, [], version)
+    with pytest.raises(PretradeRejected):
+        checker.check(ACCOUNT, sell(10))
+
+
+def test_lagging_portfolio_does_not_block_exit():
+    # E*TRADE's portfolio can lag the fill: no shares yet, exit goes out anyway
+    checker = make_checker()
+    checker.observe_positions(ACCOUNT, [])
+    checker.check(ACCOUNT, sell(10), intent='exit:123:stop')
+    assert checker.stats['advisory'] == 1
+
+
+def test_gapped_stop_does_not_block_protective_exit():
+    checker = make_checker()
+    checker.observe_positions(ACCOUNT, [position('AAPL', 10)])
+    checker.observe_quote(Quote('AAPL', 95.0, 94.99, 95.01, None, None, None, None, None, None, None, None, None))
+    order = sell(10, 'STOP_LIMIT', '100')
+    with pytest.raises(PretradeRejected) as e:
+        checker.check(ACCOUNT, order)
+    assert e.value.rule == 'stop_side'
+    checker.check(ACCOUNT, order, intent='exit:123:tsl')
+
+
+def test_exit_still_gets_format_checks():
+    checker = make_checker()
+    with pytest.raises(PretradeRejected) as e:
+        checker.check(ACCOUNT, sell(0), intent='exit:123:profit')
+    assert e.value.rule == 'format'
@@ -0,0 +1,98 @@
+"""Quote cache: per-read max-age, detail levels and shared misses"""
+import threading
+import time
+
+import pytest
+
+from etrade_models import QUOTE_DETAIL_ALL, QUOTE_DETAIL_INTRADAY
+from quote_cache import QUOTE_CACHE_LOOKUPS, QuoteCache
+
+
+class FakeClient:
+    """get_quote returns (symbol, detail, call number)."""
+
+    def __init__(self):
+        self.calls = []
+        self.gate = None
+
+    def get_quote(self, symbol, as_model=False, detail=QUOTE_DETAIL_ALL):
+        self.calls.append((symbol, detail))
+        if self.gate is not None:
+            self.gate.wait(2)
+        return (symbol, detail, len(self.calls))
+
+
+@pytest.fixture
+def cache():
+    return QuoteCache()
+
+
+def age(cache, symbol, seconds):
+    at, quote, detail = cache._entries[symbol]
+    cache._entries[symbol] = (at - seconds, quote, detail)
+
+
+def test_young_enough_quote_is_served_from_memory(cache):
+    client = FakeClient()
+    before = QUOTE_CACHE_LOOKUPS.value(('ui', 'hit'))
+    assert cache.get(client, 'aapl', max_age=5, consumer='ui') == ('AAPL', 'ALL', 1)
+    age(cache, 'AAPL', 3)
+    assert cache.get(client, 'AAPL', max_age=5, consumer='ui') == ('AAPL', 'ALL', 1)
+    assert len(client.calls) == 1
+    assert QUOTE_CACHE_LOOKUPS.value(('ui', 'hit')) == before + 1
+
+
+def test_each_read_states_its_own_max_age(cache):
+    client = FakeClient()
+    cache.get(client, 'AAPL', max_age=5, consumer='ui')
+    age(cache, 'AAPL', 3)
+    # A trigger check accepts less staleness than the UI
+    assert cache.get(client, 'AAPL', max_age=1, consumer='trigger') == ('AAPL', 'ALL', 2)
+    assert cache.get(client, 'AAPL', max_age=1, consumer='trigger') == ('AAPL', 'ALL', 2)
+    assert cache.get(client, 'AAPL', max_age=0, consumer='order') == ('AAPL', 'ALL', 3)
+
+
+def test_all_quote_serves_intraday_but_not_the_reverse(cache):
+    client = FakeClient()
+    cache.get(client, 'AAPL', max_age=5, consumer='ui', detail=QUOTE_DETAIL_INTRADAY)
+    assert cache.get(client, 'AAPL', max_age=5, consumer='ui') == ('AAPL', 'ALL', 2)
+    assert cache.get(client, 'AAPL', max_age=5, consumer='trigger',
+                     detail=QUOTE_DETAIL_INTRADAY) == ('AAPL', 'ALL', 2)
+    assert len(client.calls) == 2
+
+
+def test_put_never_replaces_a_newer_quote(cache):
+    now = time.monotonic()
+    cache.put('aapl', 'new', at=now)
+    cache.put('AAPL', 'old', at=now - 1)
+    cache.put('AAPL', None)
+    assert cache.get(FakeClient(), 'AAPL', max_age=5, consumer='ui') == 'new'
+
+
+def test_age_counts_from_when_the_call_was_sent(cache):
+    client = FakeClient()
+
+    def slow_quote(symbol, as_model=False, detail=QUOTE_DETAIL_ALL):
+        time.sleep(0.1)
+        return 'slow'
+
+    client.get_quote = slow_quote
+    cache.get(client, 'AAPL', max_age=5, consumer='ui')
+    at = cache._entries['AAPL'][0]
+    assert time.monotonic() - at >= 0.1
+
+
+def test_concurrent_misses_share_one_call(cache):
+    client = FakeClient()
+    client.gate = threading.Event()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        cache.get(client, 'AAPL', max_age=5, consumer='ui'))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    client.gate.set()
+    for thread in threads:
+        thread.join(2)
+    assert results == [('AAPL', 'ALL', 1)] * 4
+    assert len(client.calls) == 1
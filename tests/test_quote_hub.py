@@ -0,0 +1,37 @@
+"""Quote hub: quotes are filed under the symbol E*TRADE returned"""
+import time
+
+from etrade_models import Quote
+from quote_hub import QuoteHub
+
+
+def quote(symbol, price):
+    return Quote(symbol, price, None, None, None, None, None, None, None, None, None, None, None)
+
+
+def make_hub():
+    hub = QuoteHub(interval=60)
+    # Subscriptions without starting the poller
+    hub._subscribers = {'AAPL': {'a': (None, 'INTRADAY')}, 'MSFT': {'m': (None, 'INTRADAY')}}
+    return hub
+
+
+def test_reordered_response_keyed_by_returned_symbol():
+    hub = make_hub()
+    hub._publish(['AAPL', 'MSFT'], [quote('MSFT', 400.0), quote('AAPL', 200.0)], time.monotonic(), 'INTRADAY')
+    assert hub.latest('AAPL').last_price == 200.0
+    assert hub.latest('MSFT').last_price == 400.0
+
+
+def test_substituted_symbol_is_not_renamed():
+    hub = make_hub()
+    hub._publish(['AAPL', 'MSFT'], [quote('AAPL', 200.0), quote('GOOG', 150.0)], time.monotonic(), 'INTRADAY')
+    assert hub.latest('AAPL').last_price == 200.0
+    assert hub.latest('MSFT') is None
+
+
+def test_quote_without_symbol_matched_by_position():
+    hub = make_hub()
+    hub._publish(['AAPL', 'MSFT'], [quote('AAPL', 200.0), quote(None, 400.0)], time.monotonic(), 'INTRADAY')
+    assert hub.latest('MSFT').last_price == 400.0
+    assert hub.latest('MSFT').symbol == 'MSFT'
@@ -0,0 +1,263 @@
+"""Request policy: deadlines, retries and hedged reads"""
+import functools
+import threading
+import time
+
+import pytest
+
+import rate_limiter
+import request_policy
+from metrics import endpoint_label
+from rate_limiter import RateLimiter
+from request_policy import DeadlineExceeded, LatencyTracker, RetryPolicy, deadline, hedged
+
+LABEL = 'test_endpoint'
+
+
+@pytest.fixture
+def hedging(monkeypatch):
+    """Hedge delay of about 50ms for LABEL, and a budget with a single spare token."""
+    tracker = LatencyTracker(percentile=0.9, min_delay=0.01)
+    for _ in range(2 * LatencyTracker.MIN_SAMPLES):
+        tracker.observe(LABEL, 0.05)
+    monkeypatch.setattr(request_policy, '_latency', tracker)
+    limiter = RateLimiter(rate=0.001, burst=1)
+    monkeypatch.setattr(rate_limiter, '_rate_limiter', limiter)
+    return limiter
+
+
+def wait_for(condition, seconds=2):
+    expires = time.monotonic() + seconds
+    while not condition():
+        if time.monotonic() > expires:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+# ==================== Deadlines and retries ====================
+
+def test_deadlines_nest_and_only_shorten():
+    with deadline(10):
+        with deadline(60):
+            assert request_policy.remaining() <= 10
+        with deadline(0.5):
+            assert request_policy.remaining() <= 0.5
+    assert request_policy.remaining() is None
+
+
+def test_timeouts_are_cut_to_the_deadline():
+    with deadline(1):
+        connect, read = request_policy.timeout()
+        assert connect <= 1 and read <= 1
+    with deadline(0.01):
+        with pytest.raises(DeadlineExceeded):
+            request_policy.timeout()
+
+
+def test_only_transient_errors_are_retried():
+    policy = RetryPolicy(attempts=3)
+    assert policy.should_retry(Exception('API Error (503): busy'), 1, idempotent=True)
+    assert not policy.should_retry(Exception('API Error (400): bad symbol'), 1, idempotent=True)
+    assert not policy.should_retry(Exception('API Error (503): busy'), 3, idempotent=True)
+    # A POST that reached E*TRADE is not resent unless it is idempotent
+    assert not policy.should_retry(Exception('API Error (503): busy'), 1, idempotent=False)
+
+
+def test_backoff_never_sleeps_past_the_deadline():
+    policy = RetryPolicy(base_delay=5, max_delay=5)
+    policy.backoff = lambda attempt: 5
+    with deadline(0.2):
+        started = time.monotonic()
+        assert not policy.sleep_before(1)
+        assert time.monotonic() - started < 0.1
+
+
+# ==================== Hedging ====================
+
+def test_no_hedge_without_latency_samples():
+    calls = []
+    assert hedged(lambda hedge: calls.append(hedge) or 'ok', 'unseen', enabled=True) == 'ok'
+    assert calls == [False]
+
+
+def test_hedge_fires_after_the_delay_and_the_loser_is_discarded(hedging):
+    release = threading.Event()
+    discarded = []
+
+    def call(hedge):
+        if hedge:
+            return 'hedge'
+        release.wait(2)
+        return 'primary'
+
+    started = time.monotonic()
+    assert hedged(call, LABEL, discard=discarded.append, enabled=True) == 'hedge'
+    assert time.monotonic() - started >= 0.04
+    release.set()
+    assert wait_for(lambda: discarded == ['primary'])
+    # The hedge spent the one spare token
+    assert hedging.stats['acquired'] == 1
+
+
+def test_fast_primary_sends_no_hedge(hedging):
+    calls = []
+    assert hedged(lambda hedge: calls.append(hedge) or 'primary', LABEL, enabled=True) == 'primary'
+    time.sleep(0.1)
+    assert calls == [False]
+    assert hedging.stats['acquired'] == 0
+
+
+def test_hedge_denied_without_spare_budget(hedging):
+    hedging.consume()  # no spare token left
+    calls = []
+
+    def call(hedge):
+        calls.append(hedge)
+        time.sleep(0.1)
+        return 'primary'
+
+    assert hedged(call, LABEL, enabled=True) == 'primary'
+    assert calls == [False]
+    assert hedging.stats['denied'] == 1
+
+
+def test_failed_hedge_falls_back_to_the_primary(hedging):
+    def call(hedge):
+        if hedge:
+            raise ConnectionError('reset')
+        time.sleep(0.1)
+        return 'primary'
+
+    assert hedged(call, LABEL, enabled=True) == 'primary'
+
+
+def test_worker_threads_are_reused(hedging):
+    pool = request_policy._workers
+    hedged(lambda hedge: 'one', LABEL, enabled=True)
+    assert wait_for(lambda: pool._idle)
+    started = pool.stats['started']
+    hedged(lambda hedge: 'two', LABEL, enabled=True)
+    assert pool.stats['started'] == started
+
+
+def test_fired_hedge_is_charged_once(hedging, monkeypatch):
+    from etrade_client import ETradeClient
+
+    class Response:
+        status_code = 200
+        content = b'{"ok": true}'
+        text = '{"ok": true}'
+
+    class Session:
+        calls = 0
+
+        def get(self, url, **kwargs):
+            Session.calls += 1
+            if Session.calls == 1:
+                time.sleep(0.2)  # slow primary: the hedge fires
+            return Response()
+
+    endpoint = '/v1/market/quote/AAPL.json'
+    for _ in range(2 * LatencyTracker.MIN_SAMPLES):
+        request_policy._latency.observe(endpoint_label(endpoint), 0.05)
+    monkeypatch.setattr(request_policy, 'hedged', functools.partial(hedged, enabled=True))
+    limiter = RateLimiter(rate=0.001, burst=10)
+    monkeypatch.setattr(rate_limiter, '_rate_limiter', limiter)
+    client = ETradeClient()
+    client._oauth = object()
+    client.session = Session()
+
+    assert client._make_request('GET', endpoint, hedge=True) == {'ok': True}
+    assert wait_for(lambda: Session.calls == 2)
+    # The primary is consumed, the hedge acquired - one token each
+    assert limiter.stats == {'consumed': 1, 'acquired': 1, 'denied': 0}
+
+
+# ==================== Retries in the client ====================
+
+class Response:
+    def __init__(self, status, body=b'{"ok": true}'):
+        self.status_code = status
+        self.content = body
+        self.text = body.decode()
+
+
+class ScriptedSession:
+    """Answers with the scripted Responses / raises the scripted exceptions, in order."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.calls = []
+
+    def _next(self, method, url):
+        self.calls.append(method)
+        step = self.script.pop(0)
+        if isinstance(step, BaseException):
+            raise step
+        return step
+
+    def get(self, url, **kwargs):
+        return self._next('GET', url)
+
+    def post(self, url, data=None, **kwargs):
+        return self._next('POST', url)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from etrade_client import ETradeClient
+    monkeypatch.setattr(request_policy, '_policy', RetryPolicy(attempts=3, base_delay=0, max_delay=0))
+    monkeypatch.setattr(rate_limiter, '_rate_limiter', RateLimiter(rate=1000, burst=1000))
+    client = ETradeClient()
+    client._oauth = object()
+    return client
+
+
+def test_transient_read_is_retried(client):
+    from metrics import ETRADE_REQUEST_RETRIES
+    labels = ('GET', '/v1/accounts/{account}/balance.json', '503')
+    before = ETRADE_REQUEST_RETRIES.value(labels)
+    client.session = ScriptedSession(Response(503, b'{"Error": {"message": "busy"}}'), Response(200))
+    assert client._make_request('GET', '/v1/accounts/K/balance.json') == {'ok': True}
+    assert client.session.calls == ['GET', 'GET']
+    assert ETRADE_REQUEST_RETRIES.value(labels) == before + 1
+
+
+def test_client_error_is_not_retried(client):
+    from etrade_client import ETradeAPIError
+    client.session = ScriptedSession(Response(400, b'{"Error": {"code": 10033, "message": "bad symbol"}}'))
+    with pytest.raises(ETradeAPIError) as error:
+        client._make_request('GET', '/v1/market/quote/ZZZZ.json')
+    assert error.value.code == 10033
+    assert client.session.calls == ['GET']
+
+
+def test_sent_post_is_not_retried_but_an_unsent_one_is(client):
+    from requests.exceptions import ConnectionError, ReadTimeout
+    client.session = ScriptedSession(ReadTimeout('read timed out'))
+    with pytest.raises(ReadTimeout):
+        client._make_request('POST', '/v1/accounts/K/orders/place.json', data=b'<x/>')
+    assert client.session.calls == ['POST']
+
+    client.session = ScriptedSession(ConnectionError('NewConnectionError: refused'), Response(200))
+    assert client._make_request('POST', '/v1/accounts/K/orders/place.json', data=b'<x/>') == {'ok': True}
+    assert client.session.calls == ['POST', 'POST']
+
+
+def test_retries_stop_at_the_deadline(client):
+    calls = []
+
+    def slow_failure(url, **kwargs):
+        calls.append(kwargs['timeout'])
+        time.sleep(0.06)
+        return Response(503, b'{}')
+
+    client.session = ScriptedSession()
+    client.session.get = slow_failure
+    with deadline(0.1):
+        with pytest.raises(Exception, match='503|Deadline'):
+            client._make_request('GET', '/v1/accounts/K/balance.json')
+    # Three attempts are allowed, but the deadline leaves room for one
+    assert len(calls) == 1
+    assert calls[0][1] <= 0.1
@@ -0,0 +1,84 @@
+"""Server-Timing: per-request steps, the header format and upstream call names"""
+import re
+
+import pytest
+
+import server_timing
+from server_timing import RequestTiming
+
+
+def test_header_lists_steps_then_upstream_and_app_totals():
+    timing = RequestTiming()
+    timing.add('token', 0.0004)
+    timing.add('etrade_quote', 0.1816, 'GET 200', upstream=True)
+    timing.add('etrade_place', 0.3779, 'POST 200', upstream=True)
+    header = timing.header()
+    parts = header.split(', ')
+    assert parts[:3] == ['token;dur=0.4', 'etrade_quote;dur=181.6;desc="GET 200"',
+                         'etrade_place;dur=377.9;desc="POST 200"']
+    assert parts[3] == 'upstream;dur=559.5;desc="2 calls"'
+    assert re.fullmatch(r'app;dur=\d+\.\d', parts[4])
+    assert timing.upstream_calls == 2
+
+
+def test_repeated_steps_get_distinct_names():
+    timing = RequestTiming()
+    for _ in range(3):
+        timing.add('etrade_quote', 0.1, upstream=True)
+    names = [part.split(';')[0] for part in timing.header().split(', ')]
+    assert names[:3] == ['etrade_quote', 'etrade_quote_2', 'etrade_quote_3']
+
+
+def test_record_outside_a_request_is_a_no_op():
+    server_timing.finish()
+    server_timing.record('orphan', 1.0)
+    timing = server_timing.begin()
+    server_timing.record('step', 0.002)
+    assert server_timing.finish() is timing
+    assert timing.entries == [('step', 0.002, None, False)]
+    assert server_timing.finish() is None
+
+
+@pytest.mark.parametrize('label, name', [
+    ('/v1/market/quote/{symbols}.json', 'etrade_quote'),
+    ('/v1/accounts/{account}/orders/preview.json', 'etrade_preview'),
+    ('/v1/accounts/{account}/orders/place.json', 'etrade_place'),
+    ('/v1/accounts/list.json', 'etrade_accounts'),
+    ('/v1/accounts/{account}/portfolio', 'etrade_portfolio'),
+])
+def test_upstream_name(label, name):
+    assert server_timing.upstream_name(label) == name
+
+
+def test_every_response_carries_the_header():
+    import server
+    response = server.app.test_client().get('/health')
+    assert response.status_code == 200
+    header = response.headers['Server-Timing']
+    assert 'serialize;dur=' in header
+    assert 'upstream;dur=0.0;desc="0 calls"' in header
+    assert header.split(', ')[-1].startswith('app;dur=')
+
+
+def test_etrade_calls_are_recorded_in_the_request():
+    from etrade_client import ETradeClient
+
+    class Response:
+        status_code = 200
+        content = b'{"ok": true}'
+        text = '{"ok": true}'
+
+    class Session:
+        def get(self, url, **kwargs):
+            return Response()
+
+    client = ETradeClient()
+    client._oauth = object()
+    client.session = Session()
+    timing = server_timing.begin()
+    try:
+        client._make_request('GET', '/v1/market/quote/AAPL.json')
+    finally:
+        server_timing.finish()
+    assert [(name, desc, upstream) for name, _, desc, upstream in timing.entries] == [
+        ('etrade_quote', 'GET 200', True)]
@@ -0,0 +1,69 @@
+"""Wire trace: account identifiers and OAuth parameters are masked when read out"""
+from wire_trace import WireTrace
+
+
+def record(**kwargs):
+    trace = WireTrace(capacity=10, body_bytes=4096)
+    entry = trace.record('GET', kwargs.pop('path', '/v1/market/quote/AAPL.json'), **kwargs)
+    return trace.to_dict(entry)
+
+
+def test_account_key_masked_in_path():
+    entry = record(path='/v1/accounts/ajPzzppKg8pyOORwqnRE6w/orders.json')
+    assert entry['path'] == '/v1/accounts/***/orders.json'
+
+
+def test_account_fields_masked_in_json_body():
+    body = b'{"Account": [{"accountId": "84512345", "accountIdKey": "ajPz", "accountName": "Mine", ' \
+           b'"accountNo": 1, "instNo": 1}], "n": {"accountId": 84512345}}'
+    entry = record(response_body=body)
+    assert b'84512345' not in entry['response_body'].encode()
+    assert 'ajPz' not in entry['response_body']
+    assert 'Mine' not in entry['response_body']
+    assert '"accountNo": 1' in entry['response_body']
+
+
+def test_account_fields_masked_in_xml_body():
+    body = '<PlaceOrderRequest><accountId>84512345</accountId><orderType>EQ</orderType></PlaceOrderRequest>'
+    entry = record(request_body=body)
+    assert entry['request_body'] == ('<PlaceOrderRequest><accountId>***</accountId>'
+                                     '<orderType>EQ</orderType></PlaceOrderRequest>')
+
+
+def test_oauth_parameters_masked():
+    entry = record(params={'oauth_token': 'tok', 'oauth_verifier': 'v', 'count': 25},
+                   response_body=b'oauth_token=abc%2B&oauth_token_secret=def&oauth_callback_confirmed=true',
+                   error='API Error (401): oauth_problem=token_rejected')
+    assert entry['params'] == {'oauth_token': '***', 'oauth_verifier': '***', 'count': 25}
+    assert 'abc' not in entry['response_body'] and 'def' not in entry['response_body']
+    assert 'token_rejected' not in entry['error']
+
+
+def test_account_key_masked_in_orders_details_links():
+    body = b'{"OrdersResponse": {"Order": [{"orderId": 7, ' \
+           b'"details": "https://api.etrade.com/v1/accounts/ajPzzppKg8pyOORwqnRE6w/orders/7"}]}}'
+    entry = record(response_body=body)
+    assert 'ajPzzppKg8pyOORwqnRE6w' not in entry['response_body']
+    assert '/v1/accounts/***/orders/7' in entry['response_body']
+
+
+def test_recorded_raw_and_masked_in_snapshot():
+    trace = WireTrace(capacity=10, body_bytes=4096)
+    path = '/v1/accounts/ajPzzppKg8pyOORwqnRE6w/orders.json'
+    entry = trace.record('GET', path, {'count': 25}, 200, 0.05, None, b'{"accountIdKey": "ajPz"}')
+    # Recording only truncates; masking happens on the way out
+    assert entry[3] == path
+    [shown] = trace.snapshot()
+    assert shown['path'] == '/v1/accounts/***/orders.json'
+    assert shown['response_body'] == '{"accountIdKey": "***"}'
+    assert trace.snapshot(path_contains='ajPzzppKg8pyOORwqnRE6w') == []
+    assert len(trace.snapshot(path_contains='/orders.json')) == 1
+
+
+def test_value_cut_by_truncation_is_masked():
+    trace = WireTrace(capacity=10, body_bytes=16)
+    xml = trace.record('POST', '/v1/x', response_body=b'<accountId>84512345</accountId>')
+    json = trace.record('POST', '/v1/x', response_body=b'{"accountId": "84512345"}')
+    assert xml[8] == b'<accountId>84512'
+    assert '845' not in trace.to_dict(xml)['response_body']
+    assert '845' not in trace.to_dict(json)['response_body']
@@ -14,7 +14,9 @@ import time
 import logging
 from datetime import datetime, timedelta, timezone
 import redis
-from config import REDIS_URL, TOKEN_KEY_PREFIX, TOKEN_EXPIRY_HOURS
+from config import REDIS_URL, TOKEN_KEY_PREFIX, TOKEN_EXPIRY_HOURS, TOKEN_CACHE_SECONDS
+import codec
+from metrics import TOKEN_CACHE_LOOKUPS
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +38,9 @@ class TokenManager:
         self.user_id = user_id
         self.redis_key = f"{TOKEN_KEY_PREFIX}{user_id}"
         self.redis = self._connect_redis()
+        # Every API call asks for tokens; keep them in memory briefly so
+        # monitor polls don't each cost a Redis GET + SETEX
+        self._cached = None  # (tokens, expires_at, cache_until)
 
     def _connect_redis(self):
         """Connect to Redis"""
@@ -67,13 +72,14 @@ class TokenManager:
             'expires_at': self._calculate_expiry().isoformat(),
             'last_used': datetime.utcnow().isoformat()
         }
+        self._cached = None
 
         if self.redis:
             try:
                 self.redis.setex(
                     self.redis_key,
                     timedelta(hours=TOKEN_EXPIRY_HOURS),
-                    json.dumps(token_data)
+                    codec.dumps(token_data)
                 )
                 logger.info(f"Tokens saved to Redis for user {self.user_id}")
                 return True
@@ -101,13 +107,21 @@ class TokenManager:
         Returns:
             dict with access_token and access_token_secret, or None if not found/expired
         """
+        cached = self._cached
+        if cached is not None:
+            tokens, expires_at, cache_until = cached
+            if time.monotonic() < cache_until and datetime.utcnow() <= expires_at:
+                TOKEN_CACHE_LOOKUPS.inc(('hit',))
+                return dict(tokens)
+        TOKEN_CACHE_LOOKUPS.inc(('miss',))
+
         token_data = None
 
         if self.redis:
             try:
                 data = self.redis.get(self.redis_key)
                 if data:
-                    token_data = json.loads(data)
+                    token_data = codec.loads(data)
             except Exception as e:
                 logger.error(f"Failed to get tokens from Redis: {e}")
 
@@ -122,13 +136,16 @@ class TokenManager:
                 logger.warning("Tokens have expired")
                 return None
 
-            # Update last used timestamp
+            # Update last used timestamp (at most once per cache period)
             self._update_last_used(token_data)
 
-            return {
+            tokens = {
                 'access_token': token_data['access_token'],
                 'access_token_secret': token_data['access_token_secret']
             }
+            if TOKEN_CACHE_SECONDS > 0:
+                self._cached = (tokens, expires_at, time.monotonic() + TOKEN_CACHE_SECONDS)
+            return dict(tokens)
 
         return None
 
@@ -151,7 +168,7 @@ class TokenManager:
                 self.redis.setex(
                     self.redis_key,
                     timedelta(hours=TOKEN_EXPIRY_HOURS),
-                    json.dumps(token_data)
+                    codec.dumps(token_data)
                 )
             except:
                 pass
@@ -171,6 +188,7 @@ class TokenManager:
 
     def delete_tokens(self):
         """Delete stored tokens (logout)"""
+        self._cached = None
         if self.redis:
             try:
                 self.redis.delete(self.redis_key)
@@ -193,7 +211,7 @@ class TokenManager:
             try:
                 data = self.redis.get(self.redis_key)
                 if data:
-                    token_data = json.loads(data)
+                    token_data = codec.loads(data)
             except:
                 pass
 
@@ -12,11 +12,12 @@ we implement this as a single exit order that gets placed after confirmation.
 
 All times in CST (Central Standard Time)
 """
-import json
 import logging
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 
+import codec
+
 logger = logging.getLogger(__name__)
 
 
@@ -352,11 +353,11 @@ class TrailingStopManager:
     def to_json(self) -> str:
         """Serialize all trailing stops to JSON for storage"""
         data = {str(k): v.to_dict() for k, v in self._trailing_stops.items()}
-        return json.dumps(data)
+        return codec.dumps_str(data)
 
     def from_json(self, json_str: str) -> None:
         """Load trailing stops from JSON"""
-        data = json.loads(json_str)
+        data = codec.loads(json_str)
         self._trailing_stops = {
             int(k): PendingTrailingStop.from_dict(v)
             for k, v in data.items()
@@ -0,0 +1,185 @@
+"""
+Wire Trace Ring Buffer for E*TRADE API Calls
+
+_make_request used to log every response body at INFO, and quote/account/
+order calls logged whole response dicts and XML payloads. At a 2-second
+poll across many monitors that formatting and log I/O dominated CPU.
+
+Instead, every request/response exchange is recorded into a bounded
+in-memory ring buffer: method, path, params, status, duration and the
+first few KB of the request and response bodies. Recording only slices
+bytes and appends to a deque - nothing is decoded or formatted until
+someone asks for it:
+
+- GET /api/debug/wire-trace dumps the buffer (admin only)
+- A failed request logs its own trace entry at ERROR
+
+Account identifiers (the accountIdKey in paths and in the links inside
+orders responses, accountId / accountIdKey / accountName / accountDesc
+fields in JSON and XML bodies) and OAuth parameters (oauth_token,
+oauth_verifier, ...) are masked when an entry is read out (to_dict, which
+the endpoint and the ERROR log both go through), so neither ever shows
+them. Masking costs a few regex passes over the truncated bodies, paid by
+whoever reads the trace rather than by every API call.
+
+Configuration (environment):
+    WIRE_TRACE_SIZE        - exchanges kept (default 200, 0 disables)
+    WIRE_TRACE_BODY_BYTES  - bytes of each body kept (default 2048)
+"""
+import os
+import re
+import time
+import threading
+import itertools
+from collections import deque
+
+WIRE_TRACE_SIZE = int(os.environ.get('WIRE_TRACE_SIZE', '200'))
+WIRE_TRACE_BODY_BYTES = int(os.environ.get('WIRE_TRACE_BODY_BYTES', '2048'))
+
+
+REDACTED = '***'
+
+_ACCOUNT_FIELDS = rb'account(?:IdKey|Id|Name|Description|Desc)'
+# Every pattern starts with a literal, so the regex engine skips ahead to
+# candidate positions instead of trying each byte
+_BODY_PATTERNS = (
+    # "accountId": "123" / "accountId": 123 (closing quote optional: the body
+    # may be truncated inside the value)
+    (re.compile(rb'"(' + _ACCOUNT_FIELDS + rb')"\s*:\s*(?:"[^"]*"?|[^,}\]\s]+)'), rb'"\1": "***"'),
+    # <accountId>123</accountId> (or cut off before the closing tag)
+    (re.compile(rb'<(' + _ACCOUNT_FIELDS + rb')>[^<]*(?:</\1>)?'), rb'<\1>***</\1>'),
+    # .../v1/accounts/<accountIdKey>/orders/123 (the details links in orders responses)
+    (re.compile(rb'/accounts/[^/?"<\s]+'), rb'/accounts/***'),
+    # oauth_token=...&oauth_verifier=... (form bodies, OAuth errors)
+    (re.compile(rb'oauth_([a-z_]+)=[^&\s",]*'), rb'oauth_\1=***'),
+)
+_PATH_ACCOUNT = re.compile(r'/accounts/[^/?]+')
+
+
+def _redact_body(body):
+    """Mask account identifiers and OAuth parameters in a (truncated) body."""
+    text = isinstance(body, str)
+    data = body.encode('utf-8') if text else bytes(body)
+    for pattern, replacement in _BODY_PATTERNS:
+        data = pattern.sub(replacement, data)
+    return data.decode('utf-8', 'replace') if text else data
+
+
+def _redact_path(path):
+    return _PATH_ACCOUNT.sub('/accounts/' + REDACTED, path)
+
+
+def _redact_params(params):
+    return {key: REDACTED if key.startswith('oauth_') or key in ('accountId', 'accountIdKey') else value
+            for key, value in params.items()}
+
+
+def _text(body):
+    if body is None:
+        return None
+    if isinstance(body, bytes):
+        return body.decode('utf-8', 'replace')
+    return str(body)
+
+
+class WireTrace:
+    """Bounded buffer of recent API exchanges (oldest dropped first)."""
+
+    def __init__(self, capacity=WIRE_TRACE_SIZE, body_bytes=WIRE_TRACE_BODY_BYTES):
+        self.capacity = capacity
+        self.body_bytes = body_bytes
+        self._entries = deque(maxlen=capacity or 1)
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.capacity > 0
+
+    def record(self, method, path, params=None, status=None, duration=None,
+               request_body=None, response_body=None, error=None):
+        """
+        Record one exchange. Bodies are truncated, never decoded or masked here.
+
+        Returns:
+            the recorded entry (tuple), or None when tracing is disabled
+        """
+        if not self.enabled:
+            return None
+        limit = self.body_bytes
+        entry = (
+            next(self._seq),
+            time.time(),
+            method,
+            path,
+            dict(params) if params else None,
+            status,
+            duration,
+            request_body[:limit] if request_body else None,
+            response_body[:limit] if response_body else None,
+            error
+        )
+        with self._lock:
+            self._entries.append(entry)
+        return entry
+
+    @staticmethod
+    def to_dict(entry):
+        """Decode a recorded entry for display, with account identifiers and OAuth parameters masked."""
+        seq, ts, method, path, params, status, duration, req, resp, error = entry
+        return {
+            'seq': seq,
+            'timestamp': ts,
+            'method': method,
+            'path': _redact_path(path),
+            'params': _redact_params(params) if params else None,
+            'status': status,
+            'duration_ms': round(duration * 1000, 1) if duration is not None else None,
+            'request_body': _text(_redact_body(req)) if req else None,
+            'response_body': _text(_redact_body(resp)) if resp else None,
+            'error': _redact_body(str(error)) if error else None
+        }
+
+    def snapshot(self, limit=None, errors_only=False, path_contains=None):
+        """
+        Recent exchanges, newest first.
+
+        Args:
+            limit: Max entries to return
+            errors_only: Only failed exchanges (exception or HTTP >= 400)
+            path_contains: Only paths containing this substring
+        """
+        with self._lock:
+            entries = list(self._entries)
+        result = []
+        for entry in reversed(entries):
+            status, error = entry[5], entry[9]
+            if errors_only and not error and (status is None or status < 400):
+                continue
+            if path_contains and path_contains not in _redact_path(entry[3]):
+                continue
+            result.append(self.to_dict(entry))
+            if limit and len(result) >= limit:
+                break
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'capacity': self.capacity, 'body_bytes': self.body_bytes,
+                    'entries': len(self._entries)}
+
+
+# Singleton instance
+_wire_trace = None
+
+
+def get_wire_trace():
+    """Get or create the singleton WireTrace instance."""
+    global _wire_trace
+    if _wire_trace is None:
+        _wire_trace = WireTrace()
+    return _wire_trace